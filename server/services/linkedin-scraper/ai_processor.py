@@ -1,11 +1,16 @@
 # ai_processor.py
 import json
 import os
-import httpx
-from openai import OpenAI
+import time
+from concurrent.futures import ThreadPoolExecutor
 from random import randint, sample, choice
 from flask import current_app
 
+from llm_client import get_llm_client_manager
+from llm_cache import get_llm_cache
+from llm_guard import get_llm_guard, BudgetExceededError
+
+_dotenv_loaded = False
 
 def configure_openai():
     """Initialize OpenAI client"""
@@ -22,8 +27,10 @@ def configure_openai():
     if not api_key or api_key == 'your-openai-api-key-here':
         api_key = os.environ.get('OPENAI_API_KEY')
     
-    # 3. If still not found, check for a .env file in the current directory
-    if not api_key:
+    # 3. If still not found, check for a .env file in the current directory (once per process)
+    global _dotenv_loaded
+    if not api_key and not _dotenv_loaded:
+        _dotenv_loaded = True
         try:
             from dotenv import load_dotenv
             # Try loading from .env file in current directory
@@ -36,20 +43,54 @@ def configure_openai():
     if not api_key or api_key == 'your-openai-api-key-here':
         print("WARNING: No valid OpenAI API key found! Using fallback methods.")
         
-    # Create a custom HTTP client without proxies
-    http_client = httpx.Client()
-    
-    # Create the OpenAI client with the custom HTTP client
-    return OpenAI(
-        api_key=api_key,
-        http_client=http_client
+    # Reuse the process-wide client so calls share pooled keep-alive connections
+    return get_configured_llm_client_manager().client(api_key)
+
+def get_configured_llm_client_manager():
+    """The process-wide OpenAI client manager, sized from the app config."""
+    try:
+        config = current_app.config
+    except RuntimeError:
+        config = {}
+    return get_llm_client_manager(
+        max_connections=config.get('OPENAI_POOL_MAX_CONNECTIONS', 20),
+        max_keepalive=config.get('OPENAI_POOL_MAX_KEEPALIVE', 10),
+        keepalive_expiry=config.get('OPENAI_KEEPALIVE_EXPIRY', 60),
+        connect_timeout=config.get('OPENAI_CONNECT_TIMEOUT', 10),
+        read_timeout=config.get('OPENAI_TIMEOUT', 60),
+        http2=config.get('OPENAI_HTTP2', True),
+        max_retries=config.get('OPENAI_MAX_RETRIES', 2)
+    )
+
+def get_configured_llm_cache():
+    """The model response cache, or None when LLM_CACHE is disabled."""
+    config = current_app.config
+    if not config.get('LLM_CACHE', True):
+        return None
+    return get_llm_cache(
+        config['DATA_DIR'],
+        ttl=config.get('LLM_CACHE_TTL', 604800),
+        max_entries=config.get('LLM_CACHE_MAX_ENTRIES', 5000),
+        max_bytes=config.get('LLM_CACHE_MAX_BYTES', 50000000)
+    )
+
+def get_configured_llm_guard():
+    """The latency budget/retry/circuit breaker guard for outreach calls, or None when LLM_GUARD is disabled."""
+    config = current_app.config
+    if not config.get('LLM_GUARD', True):
+        return None
+    return get_llm_guard(
+        budget=config.get('LLM_LATENCY_BUDGET', 20),
+        max_attempts=config.get('LLM_MAX_ATTEMPTS', 3),
+        backoff=config.get('LLM_RETRY_BACKOFF', 0.5),
+        failure_threshold=config.get('LLM_CIRCUIT_FAILURES', 5),
+        reset_after=config.get('LLM_CIRCUIT_RESET', 30),
+        hedging=config.get('LLM_HEDGING', False),
+        hedge_percentile=config.get('LLM_HEDGE_PERCENTILE', 95)
     )
 
-def generate_icp_and_personas(product_description):
+def generate_icp_and_personas(product_description, use_cache=True):
     """Generate Ideal Customer Profile and Buyer/User Personas using AI"""
-    # Use the configure_openai function to create the client
-    client = configure_openai()
-    
     prompt = f"""
     Based on this product description, generate an Ideal Customer Profile (ICP) and Buyer/User Personas:
     
@@ -79,11 +120,21 @@ def generate_icp_and_personas(product_description):
     }}
     """
     
+    # Same product description and model settings: reuse the earlier answer
+    settings = {'model': current_app.config['GPT_MODEL'], 'temperature': current_app.config['TEMPERATURE']}
+    cache = get_configured_llm_cache()
+    cached = cache.get('icp', prompt, settings) if cache and use_cache else None
+    if cached is not None:
+        return cached
+    
+    # Use the configure_openai function to create the client
+    client = configure_openai()
+    
     try:
         response = client.chat.completions.create(
-            model=current_app.config['GPT_MODEL'],
+            model=settings['model'],
             messages=[{"role": "user", "content": prompt}],
-            temperature=current_app.config['TEMPERATURE']
+            temperature=settings['temperature']
         )
         
         result_text = response.choices[0].message.content.strip()
@@ -94,8 +145,12 @@ def generate_icp_and_personas(product_description):
             json_match = re.search(r'{.*}', result_text, re.DOTALL)
             if json_match:
                 json_str = json_match.group(0)
-                return json.loads(json_str)
-            return json.loads(result_text)
+                icp_data = json.loads(json_str)
+            else:
+                icp_data = json.loads(result_text)
+            if cache:
+                cache.put('icp', prompt, settings, icp_data)
+            return icp_data
         except Exception as e:
             print(f"Error parsing JSON: {e}")
             return {
@@ -201,8 +256,8 @@ def find_mutual_connections(profile_list, trusted_network):
         )
     )
 
-def generate_outreach_message(profile, product_description=None, connection_path=None):
-    """Generate a hyper-personalized outreach message based on the profile"""
+def prepare_outreach_message(profile, connection_path=None):
+    """Recipient details, message type and model prompt for an outreach message"""
     # Extract name
     full_name = profile.get('name', '')
     first_name = full_name.split(' ')[0] if full_name else "there"
@@ -238,111 +293,261 @@ def generate_outreach_message(profile, product_description=None, connection_path
     else:
         message_type = "cold_outreach"
     
-    # Try to use OpenAI for message generation
-    try:
-        # Use the configure_openai function to create the client
-        client = configure_openai()
-        
-        # Create base prompt with profile research instructions
-        base_prompt = f"""
-        Create a hyper-personalized LinkedIn message for {full_name}, who works as {role} {f"at {company}" if company else ""}.
-        
-        PROFILE CONTEXT:
-        - Role: {role}
-        - Company: {company if company else "Not specified"}
-        - Industry: {profile.get('industry', 'Not specified')}
-        - Seniority: SVP Level
-        - Focus Area: Marketing, Category & Communications
-        - Connection Level: {profile.get('connection_level', 'Not specified')}
-        
-        PERSONALIZATION FOCUS:
-        1. Their specific role in marketing and communications leadership
-        2. Their responsibility for category and brand strategy
-        3. Their experience with multi-channel marketing
-        4. Their position as an SVP-level decision maker
-        5. Their specific company's marketing initiatives
-        
-        PERSONALIZATION REQUIREMENTS:
-        1. Reference a specific aspect of their marketing leadership role
-        2. Mention their specific achievements or initiatives at {company}
-        3. Connect our video AI tool to their specific marketing category/communications needs
-        4. Show understanding of their unique marketing challenges at their company
-        5. Acknowledge their strategic decision-making position
-        6. Keep it concise and impactful
-        7. Include ONE specific benefit that addresses their unique needs
-        8. End with a clear but non-pushy call to action
-        
-        MESSAGE STRUCTURE:
-        1. Opening: Reference specific aspect of their work
-        2. Bridge: Connect to their unique challenges
-        3. Value: ONE targeted benefit for their role
-        4. Close: Simple next step
-        
-        TONE REQUIREMENTS:
-        - Executive-level communication
-        - Strategic rather than tactical
-        - Show understanding of their specific market
-        - Focus on their unique needs, not generic industry challenges
-        - Be concise and respectful of their time
+    # Create base prompt with profile research instructions
+    base_prompt = f"""
+    Create a hyper-personalized LinkedIn message for {full_name}, who works as {role} {f"at {company}" if company else ""}.
+    
+    PROFILE CONTEXT:
+    - Role: {role}
+    - Company: {company if company else "Not specified"}
+    - Industry: {profile.get('industry', 'Not specified')}
+    - Seniority: SVP Level
+    - Focus Area: Marketing, Category & Communications
+    - Connection Level: {profile.get('connection_level', 'Not specified')}
+    
+    PERSONALIZATION FOCUS:
+    1. Their specific role in marketing and communications leadership
+    2. Their responsibility for category and brand strategy
+    3. Their experience with multi-channel marketing
+    4. Their position as an SVP-level decision maker
+    5. Their specific company's marketing initiatives
+    
+    PERSONALIZATION REQUIREMENTS:
+    1. Reference a specific aspect of their marketing leadership role
+    2. Mention their specific achievements or initiatives at {company}
+    3. Connect our video AI tool to their specific marketing category/communications needs
+    4. Show understanding of their unique marketing challenges at their company
+    5. Acknowledge their strategic decision-making position
+    6. Keep it concise and impactful
+    7. Include ONE specific benefit that addresses their unique needs
+    8. End with a clear but non-pushy call to action
+    
+    MESSAGE STRUCTURE:
+    1. Opening: Reference specific aspect of their work
+    2. Bridge: Connect to their unique challenges
+    3. Value: ONE targeted benefit for their role
+    4. Close: Simple next step
+    
+    TONE REQUIREMENTS:
+    - Executive-level communication
+    - Strategic rather than tactical
+    - Show understanding of their specific market
+    - Focus on their unique needs, not generic industry challenges
+    - Be concise and respectful of their time
+    """
+    
+    # Add message type specific instructions
+    if message_type == "direct_existing":
+        prompt = base_prompt + """
+        ADDITIONAL REQUIREMENTS:
+        1. Reference their specific marketing initiatives
+        2. Acknowledge their leadership in category management
+        3. Focus on strategic marketing innovation
+        4. Keep it under 2000 characters
+        5. Emphasize their potential impact on product direction
         """
+    elif message_type == "intro_request":
+        connection_name = profile["mutual_connections"][0]["name"] if profile["mutual_connections"] else "our mutual connection"
+        prompt = base_prompt + f"""
+        ADDITIONAL REQUIREMENTS:
+        1. Write to {connection_name} highlighting {full_name}'s specific achievements
+        2. Reference their unique position to influence marketing innovation
+        3. Focus on mutual value in marketing technology
+        4. Keep it under 2000 characters
+        5. Highlight specific benefits of their expertise
+        """
+    else:
+        prompt = base_prompt + """
+        ADDITIONAL REQUIREMENTS:
+        1. Reference their specific marketing leadership achievements
+        2. Focus on their unique challenges
+        3. Keep it under 280 characters
+        4. Create interest based on their specific needs
+        """
+    
+    return {
+        "full_name": full_name,
+        "first_name": first_name,
+        "role": role,
+        "company": company,
+        "message_type": message_type,
+        "prompt": prompt,
+        "recipient": full_name if message_type != "intro_request" else profile["mutual_connections"][0]["name"] if profile.get("mutual_connections") else "Mutual Connection"
+    }
+
+def outreach_settings():
+    """Model settings for outreach messages; part of the response cache key"""
+    return {'model': current_app.config.get('GPT_MODEL', 'gpt-4'), 'temperature': 0.7, 'max_tokens': 800}
+
+def clean_outreach_message(message, message_type):
+    """Strip wrapping quotes and fit cold outreach into LinkedIn's connection request limit"""
+    message = message.strip()
+    
+    # Clean up formatting
+    if message.startswith('"') and message.endswith('"'):
+        message = message[1:-1]
         
-        # Add message type specific instructions
-        if message_type == "direct_existing":
-            prompt = base_prompt + """
-            ADDITIONAL REQUIREMENTS:
-            1. Reference their specific marketing initiatives
-            2. Acknowledge their leadership in category management
-            3. Focus on strategic marketing innovation
-            4. Keep it under 2000 characters
-            5. Emphasize their potential impact on product direction
-            """
-        elif message_type == "intro_request":
-            connection_name = profile["mutual_connections"][0]["name"] if profile["mutual_connections"] else "our mutual connection"
-            prompt = base_prompt + f"""
-            ADDITIONAL REQUIREMENTS:
-            1. Write to {connection_name} highlighting {full_name}'s specific achievements
-            2. Reference their unique position to influence marketing innovation
-            3. Focus on mutual value in marketing technology
-            4. Keep it under 2000 characters
-            5. Highlight specific benefits of their expertise
-            """
-        else:
-            prompt = base_prompt + """
-            ADDITIONAL REQUIREMENTS:
-            1. Reference their specific marketing leadership achievements
-            2. Focus on their unique challenges
-            3. Keep it under 280 characters
-            4. Create interest based on their specific needs
-            """
-        
-        response = client.chat.completions.create(
-            model=current_app.config.get('GPT_MODEL', 'gpt-4'),
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=800
-        )
-        
-        message = response.choices[0].message.content.strip()
+    # Ensure message fits LinkedIn character limit for connection requests
+    if message_type == "cold_outreach" and len(message) > 300:
+        message = message[:297] + "..."
+    return message
+
+def generate_outreach_message(profile, product_description=None, connection_path=None, use_cache=True):
+    """Generate a hyper-personalized outreach message based on the profile"""
+    outreach = prepare_outreach_message(profile, connection_path)
+    message_type = outreach["message_type"]
+    
+    # Try to use OpenAI for message generation
+    fallback = False
+    try:
+        # Same prompt and model settings: reuse the earlier message
+        settings = outreach_settings()
+        cache = get_configured_llm_cache()
+        message = cache.get('outreach', outreach["prompt"], settings) if cache and use_cache else None
         
-        # Clean up formatting
-        if message.startswith('"') and message.endswith('"'):
-            message = message[1:-1]
+        if message is None:
+            # Use the configure_openai function to create the client
+            client = configure_openai()
             
-        # Ensure message fits LinkedIn character limit for connection requests
-        if message_type == "cold_outreach" and len(message) > 300:
-            message = message[:297] + "..."
+            request = {
+                "model": settings['model'],
+                "messages": [{"role": "user", "content": outreach["prompt"]}],
+                "temperature": settings['temperature'],
+                "max_tokens": settings['max_tokens']
+            }
+            
+            # Bounded by the latency budget; past it the template fallback below is used.
+            # The guard does the retrying, each attempt getting what is left of the budget.
+            guard = get_configured_llm_guard()
+            if guard:
+                response = guard.call(lambda timeout: client.with_options(timeout=timeout, max_retries=0)
+                                      .chat.completions.create(**request))
+            else:
+                response = client.chat.completions.create(**request)
+            
+            message = clean_outreach_message(response.choices[0].message.content, message_type)
+            
+            if cache:
+                cache.put('outreach', outreach["prompt"], settings, message)
             
     except Exception as e:
         print(f"Error generating message: {e}")
         # Fallback message generation without API
-        message = create_fallback_message(first_name, role, company, profile, message_type, connection_path)
+        message = create_fallback_message(outreach["first_name"], outreach["role"], outreach["company"], profile,
+                                          message_type, connection_path)
+        fallback = True
     
     return {
         "message": message,
         "type": message_type,
-        "recipient": full_name if message_type != "intro_request" else profile["mutual_connections"][0]["name"] if profile.get("mutual_connections") else "Mutual Connection"
+        "recipient": outreach["recipient"],
+        "fallback": fallback
+    }
+
+def stream_outreach_message(profile, product_description=None, connection_path=None, use_cache=True):
+    """
+    Streaming form of generate_outreach_message. Yields {"event": "token", "text": ...}
+    as the model writes, then {"event": "done", ...} with the fields
+    generate_outreach_message returns. Quote stripping and the cold outreach
+    length limit apply to the message in the done event, which replaces the
+    streamed text; so does the fallback message if the model fails mid-stream.
+    """
+    outreach = prepare_outreach_message(profile, connection_path)
+    message_type = outreach["message_type"]
+    
+    fallback = False
+    try:
+        settings = outreach_settings()
+        cache = get_configured_llm_cache()
+        message = cache.get('outreach', outreach["prompt"], settings) if cache and use_cache else None
+        
+        if message is not None:
+            yield {"event": "token", "text": message}
+        else:
+            client = configure_openai()
+            
+            request = {
+                "model": settings['model'],
+                "messages": [{"role": "user", "content": outreach["prompt"]}],
+                "temperature": settings['temperature'],
+                "max_tokens": settings['max_tokens'],
+                "stream": True
+            }
+            
+            # Opening the stream is retried within the budget but never hedged,
+            # and a stream still running when the budget is spent is abandoned
+            guard = get_configured_llm_guard()
+            started = time.monotonic()
+            if guard:
+                stream = guard.call(lambda timeout: client.with_options(timeout=timeout, max_retries=0)
+                                    .chat.completions.create(**request), hedge=False)
+            else:
+                stream = client.chat.completions.create(**request)
+            parts = []
+            try:
+                for chunk in stream:
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if text:
+                        parts.append(text)
+                        yield {"event": "token", "text": text}
+                    if guard and guard.remaining(started) <= 0:
+                        raise BudgetExceededError(f"Message stream exceeded its {guard.budget}s budget")
+            finally:
+                # Release the connection if the client went away mid-stream
+                stream.close()
+            
+            message = clean_outreach_message("".join(parts), message_type)
+            
+            if cache:
+                cache.put('outreach', outreach["prompt"], settings, message)
+            
+    except Exception as e:
+        print(f"Error streaming message: {e}")
+        message = create_fallback_message(outreach["first_name"], outreach["role"], outreach["company"], profile,
+                                          message_type, connection_path)
+        fallback = True
+    
+    yield {
+        "event": "done",
+        "message": message,
+        "type": message_type,
+        "recipient": outreach["recipient"],
+        "fallback": fallback
     }
 
+def best_connection_path(profile):
+    """The mutual connection to mention: the highest scored TNL connection, else the first one"""
+    mutual_connections = profile.get('mutual_connections') or []
+    tnl_connections = [c for c in mutual_connections if c.get('in_tnl', False)]
+    if tnl_connections:
+        return max(tnl_connections, key=lambda c: c.get('tnl_score', 0))
+    return mutual_connections[0] if mutual_connections else None
+
+def generate_outreach_messages(profiles, product_description=None, max_workers=8, use_cache=True):
+    """
+    Generate outreach messages for many profiles with up to max_workers model
+    calls in flight. Results come back in the order of `profiles`; a profile
+    that fails outright gets status 'error' instead of failing the batch.
+    """
+    app = current_app._get_current_object()
+
+    def generate(item):
+        index, profile = item
+        with app.app_context():
+            try:
+                message_data = generate_outreach_message(profile, product_description, best_connection_path(profile),
+                                                         use_cache=use_cache)
+                return dict(message_data, index=index, status="success")
+            except Exception as e:
+                print(f"Error generating message for profile {index}: {e}")
+                return {"index": index, "status": "error", "error": str(e), "fallback": True}
+
+    if not profiles:
+        return []
+    workers = max(1, min(max_workers, len(profiles)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="outreach") as executor:
+        return list(executor.map(generate, enumerate(profiles)))
+
 def create_fallback_message(first_name, role, company, profile, message_type, connection_path=None):
     """Generate fallback message templates when API is unavailable"""
     if message_type == "direct_existing":
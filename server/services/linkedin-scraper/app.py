@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context
 import os
 from werkzeug.utils import secure_filename
 import json
@@ -9,14 +9,24 @@ import pandas as pd
 from functools import wraps
 import io
 import csv
+import queue
 from flask_cors import CORS
 
 # Import utility modules
 from utils import allowed_file, extract_text_from_file, ensure_data_dir
-from linkedin_scraper import linkedin_search, save_cookies, load_cookies, create_sample_profiles
-from ai_processor import generate_icp_and_personas, find_mutual_connections, generate_outreach_message
+from linkedin_scraper import (save_cookies, load_cookies, create_sample_profiles,
+                              get_configured_contacted_screen, get_configured_selector_stats)
+from async_scraper import search_profiles, get_configured_search_cache, linkedin_search_states
+from ai_processor import (generate_icp_and_personas, find_mutual_connections, generate_outreach_message,
+                          generate_outreach_messages, stream_outreach_message, best_connection_path,
+                          get_configured_llm_cache, get_configured_llm_guard)
 from data_manager import save_trusted_network, load_trusted_network, import_trusted_network_from_csv, clear_trusted_network
 from message_tracker import MessageTracker, MessageStatus
+from search_jobs import get_job_queue, FINISHED_STATUSES
+from rate_limiter import get_scheduler
+from session_store import get_session_store
+from profile_index import get_profile_index
+from search_predicates import SearchPredicates
 
 # Import US states
 from us_states import US_STATES
@@ -32,9 +42,111 @@ class Config:
     # Pull LinkedIn credentials from environment variables or use fallback
     LINKEDIN_EMAIL = os.getenv('LINKEDIN_EMAIL', 'your-linkedin-email')
     LINKEDIN_PASSWORD = os.getenv('LINKEDIN_PASSWORD', 'your-linkedin-password')
+    # Extra accounts for the session pool, as JSON: [{"email": "...", "password": "..."}]
+    LINKEDIN_ACCOUNTS = json.loads(os.getenv('LINKEDIN_ACCOUNTS', '[]'))
+    # Log accounts in again in the background when their session expires within the margin
+    SESSION_BACKGROUND_REFRESH = os.getenv('SESSION_BACKGROUND_REFRESH', 'True').lower() == 'true'
+    SESSION_REFRESH_INTERVAL = int(os.getenv('SESSION_REFRESH_INTERVAL', '900'))
+    SESSION_REFRESH_MARGIN = int(os.getenv('SESSION_REFRESH_MARGIN', '86400'))
 
     GPT_MODEL = 'gpt-4'
     TEMPERATURE = 0.7
+    # Pooled OpenAI client shared by all model calls (HTTP/2 when the h2 package is installed)
+    OPENAI_POOL_MAX_CONNECTIONS = int(os.getenv('OPENAI_POOL_MAX_CONNECTIONS', '20'))
+    OPENAI_POOL_MAX_KEEPALIVE = int(os.getenv('OPENAI_POOL_MAX_KEEPALIVE', '10'))
+    OPENAI_KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', '60'))
+    OPENAI_CONNECT_TIMEOUT = float(os.getenv('OPENAI_CONNECT_TIMEOUT', '10'))
+    OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '60'))
+    OPENAI_HTTP2 = os.getenv('OPENAI_HTTP2', 'True').lower() == 'true'
+    OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '2'))
+    # Cache of model responses keyed on prompt and model settings (data/llm_cache);
+    # pass refresh to the generation routes to skip it
+    LLM_CACHE = os.getenv('LLM_CACHE', 'True').lower() == 'true'
+    LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', '604800'))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000'))
+    LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', '50000000'))
+    # Outreach model calls: give up and use the template message after LLM_LATENCY_BUDGET
+    # seconds, retrying with jittered backoff meanwhile; after LLM_CIRCUIT_FAILURES failed calls
+    # in a row skip the API for LLM_CIRCUIT_RESET seconds. LLM_HEDGING sends a second
+    # request once a call is slower than the LLM_HEDGE_PERCENTILE of recent calls.
+    LLM_GUARD = os.getenv('LLM_GUARD', 'True').lower() == 'true'
+    LLM_LATENCY_BUDGET = float(os.getenv('LLM_LATENCY_BUDGET', '20'))
+    LLM_MAX_ATTEMPTS = int(os.getenv('LLM_MAX_ATTEMPTS', '3'))
+    LLM_RETRY_BACKOFF = float(os.getenv('LLM_RETRY_BACKOFF', '0.5'))
+    LLM_CIRCUIT_FAILURES = int(os.getenv('LLM_CIRCUIT_FAILURES', '5'))
+    LLM_CIRCUIT_RESET = float(os.getenv('LLM_CIRCUIT_RESET', '30'))
+    LLM_HEDGING = os.getenv('LLM_HEDGING', 'False').lower() == 'true'
+    LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', '95'))
+    # Batch message generation: model calls in flight at once, and profiles per request
+    MESSAGE_BATCH_CONCURRENCY = int(os.getenv('MESSAGE_BATCH_CONCURRENCY', '8'))
+    MESSAGE_BATCH_MAX_PROFILES = int(os.getenv('MESSAGE_BATCH_MAX_PROFILES', '500'))
+
+    # Search engine: 'async' runs the concurrent page pool, 'sync' the original scraper
+    SEARCH_ENGINE = os.getenv('SEARCH_ENGINE', 'async')
+    SEARCH_CONCURRENCY = int(os.getenv('SEARCH_CONCURRENCY', '3'))
+    SEARCH_MAX_PAGES = int(os.getenv('SEARCH_MAX_PAGES', '10'))
+    BROWSER_HEADLESS = os.getenv('BROWSER_HEADLESS', 'False').lower() == 'true'
+    # 'bulk' reads each results page with one page.evaluate, 'element' queries card by card
+    EXTRACTION_MODE = os.getenv('EXTRACTION_MODE', 'bulk')
+    # Read Sales Navigator results from its search API responses when available
+    CAPTURE_SEARCH_API = os.getenv('CAPTURE_SEARCH_API', 'True').lower() == 'true'
+    # Abort images, media, fonts and analytics requests in scraping sessions.
+    # RESOURCE_BLOCKING_PROFILES may override resource_blocking.BLOCKING_PROFILES.
+    RESOURCE_BLOCKING = os.getenv('RESOURCE_BLOCKING', 'True').lower() == 'true'
+    RESOURCE_BLOCKING_PROFILES = None
+
+    # Warm browser pool: authenticated contexts kept alive between searches
+    BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', '2'))
+    BROWSER_POOL_MAX_USES = int(os.getenv('BROWSER_POOL_MAX_USES', '20'))
+
+    # Search result cache: fresh for SEARCH_CACHE_TTL seconds, then served for
+    # SEARCH_CACHE_STALE_TTL more seconds while it is refreshed in the background
+    SEARCH_CACHE = os.getenv('SEARCH_CACHE', 'True').lower() == 'true'
+    SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', '3600'))
+    SEARCH_CACHE_STALE_TTL = int(os.getenv('SEARCH_CACHE_STALE_TTL', '0'))
+    SEARCH_CACHE_MAX_ENTRIES = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '200'))
+
+    # Per-page checkpoints in data/checkpoints let a failed search resume where it stopped
+    SEARCH_CHECKPOINTS = os.getenv('SEARCH_CHECKPOINTS', 'True').lower() == 'true'
+    SEARCH_CHECKPOINT_MAX_AGE = int(os.getenv('SEARCH_CHECKPOINT_MAX_AGE', '86400'))
+
+    # Cross-run profile identity index (data/profile_index.jsonl); with
+    # PROFILE_INDEX_SKIP_SEEN, leads returned by an earlier search are left out
+    PROFILE_INDEX = os.getenv('PROFILE_INDEX', 'True').lower() == 'true'
+    PROFILE_INDEX_SKIP_SEEN = os.getenv('PROFILE_INDEX_SKIP_SEEN', 'False').lower() == 'true'
+
+    # Open Sales Navigator searches with geography/company size encoded in the results URL
+    # (region ids are learned from the first UI-filtered search per state)
+    SEARCH_FILTER_URLS = os.getenv('SEARCH_FILTER_URLS', 'True').lower() == 'true'
+
+    # Try the card/popup/next-button selector that matched last first; selectors that miss
+    # SELECTOR_DEMOTE_AFTER times in a row are tried last (data/selector_stats.json)
+    SELECTOR_LEARNING = os.getenv('SELECTOR_LEARNING', 'True').lower() == 'true'
+    SELECTOR_DEMOTE_AFTER = int(os.getenv('SELECTOR_DEMOTE_AFTER', '5'))
+
+    # Apply the location (selected state) and title filters to each results page as it
+    # is extracted, so pagination stops only once max_results profiles have passed them
+    SEARCH_PUSHDOWN = os.getenv('SEARCH_PUSHDOWN', 'True').lower() == 'true'
+
+    # Bloom filter of profiles in message_tracking.json; searches skip them while paging
+    CONTACTED_SCREEN = os.getenv('CONTACTED_SCREEN', 'True').lower() == 'true'
+    CONTACTED_SCREEN_CAPACITY = int(os.getenv('CONTACTED_SCREEN_CAPACITY', '1000000'))
+    CONTACTED_SCREEN_ERROR_RATE = float(os.getenv('CONTACTED_SCREEN_ERROR_RATE', '0.001'))
+    CONTACTED_SCREEN_SAVE_INTERVAL = int(os.getenv('CONTACTED_SCREEN_SAVE_INTERVAL', '30'))
+
+    # Background search jobs: how many searches run at once per process
+    SEARCH_JOB_WORKERS = int(os.getenv('SEARCH_JOB_WORKERS', '2'))
+    # Seconds between keep-alive events on streaming search responses
+    SEARCH_STREAM_HEARTBEAT = int(os.getenv('SEARCH_STREAM_HEARTBEAT', '15'))
+
+    # Token-bucket pacing of every LinkedIn navigation, pagination and filter action,
+    # across all concurrent searches (global) and per LinkedIn account
+    RATE_LIMIT = os.getenv('RATE_LIMIT', 'True').lower() == 'true'
+    RATE_LIMIT_GLOBAL_PER_MIN = float(os.getenv('RATE_LIMIT_GLOBAL_PER_MIN', '60'))
+    RATE_LIMIT_GLOBAL_BURST = float(os.getenv('RATE_LIMIT_GLOBAL_BURST', '10'))
+    RATE_LIMIT_ACCOUNT_PER_MIN = float(os.getenv('RATE_LIMIT_ACCOUNT_PER_MIN', '30'))
+    RATE_LIMIT_ACCOUNT_BURST = float(os.getenv('RATE_LIMIT_ACCOUNT_BURST', '6'))
+    RATE_LIMIT_JITTER = float(os.getenv('RATE_LIMIT_JITTER', '0.5'))
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -48,6 +160,35 @@ os.makedirs(app.config['DATA_DIR'], exist_ok=True)
 # Initialize message tracker
 message_tracker = MessageTracker(os.path.join(os.path.dirname(__file__), 'data'))
 
+def get_search_jobs():
+    return get_job_queue(app, app.config['DATA_DIR'], max_workers=app.config.get('SEARCH_JOB_WORKERS', 2))
+
+def submit_search_job(data, listener=None):
+    """Queue a search described by an API request body and return the job record."""
+    search_query = data.get('search_query', '')
+    company_size = data.get('company_size', '')
+    max_results = int(data.get('max_results', 20))
+
+    if data.get('states'):
+        per_state_results = data.get('per_state_results')
+        params = {
+            'search_query': search_query,
+            'states': data['states'],
+            'max_results': max_results,
+            'company_size': company_size,
+            'per_state_results': int(per_state_results) if per_state_results else None
+        }
+        return get_search_jobs().submit('states', params, linkedin_search_states, listener)
+
+    params = {
+        'search_query': search_query,
+        'max_results': max_results,
+        'selected_state': data.get('location', ''),
+        'company_size': company_size,
+        'use_cache': not data.get('refresh', False)
+    }
+    return get_search_jobs().submit('search', params, search_profiles, listener)
+
 def credentials_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -89,7 +230,7 @@ def upload_product():
             f.write(product_text)
         
         # Generate ICP and Personas
-        icp_data = generate_icp_and_personas(product_text)
+        icp_data = generate_icp_and_personas(product_text, use_cache=not request.form.get('refresh'))
         
         if icp_data:
             with open(os.path.join(app.config['DATA_DIR'], 'icp_and_personas.json'), 'w') as f:
@@ -311,11 +452,12 @@ def search():
     session['company_size'] = company_size
     
     # Perform LinkedIn search with location and company size filters
-    profiles = linkedin_search(
+    profiles = search_profiles(
         search_query=search_query,
         max_results=max_results,
         selected_state=selected_state,
-        company_size=company_size
+        company_size=company_size,
+        use_cache=not request.form.get('refresh')
     )
     
     if profiles:
@@ -398,17 +540,11 @@ def generate_message_route():
             product_description = None
         
         # Determine best connection path for message
-        connection_path = None
-        if profile.get('mutual_connections'):
-            # Get highest scored TNL connection if available
-            tnl_connections = [c for c in profile['mutual_connections'] if c.get('in_tnl', False)]
-            if tnl_connections:
-                connection_path = max(tnl_connections, key=lambda c: c.get('tnl_score', 0))
-            else:
-                connection_path = profile['mutual_connections'][0]
+        connection_path = best_connection_path(profile)
         
         # Generate message
-        message_data = generate_outreach_message(profile, product_description, connection_path)
+        message_data = generate_outreach_message(profile, product_description, connection_path,
+                                                 use_cache=not request.form.get('refresh'))
         
         # Store generated message in the session
         session['generated_message'] = message_data
@@ -622,17 +758,27 @@ def linkedin_search_api():
         user_persona = data.get('user_persona', '')
         industry = data.get('industry', '')
 
+        # Long searches can run as a background job instead of inside this request
+        if data.get('async'):
+            job = submit_search_job(data)
+            return jsonify({
+                'status': 'success',
+                'job': job
+            }), 202
+
         # Use the real LinkedIn search function
-        profiles = linkedin_search(
+        profiles = search_profiles(
             search_query=search_query,
             max_results=max_results,
             selected_state=location,
-            company_size=company_size
+            company_size=company_size,
+            use_cache=not data.get('refresh', False)
         )
 
-        # Filter profiles by location if specified
-        if location and location != 'All Locations':
-            profiles = [p for p in profiles if location.lower() in p.get('location', '').lower()]
+        # With SEARCH_PUSHDOWN each page was already filtered by location as it was scraped;
+        # otherwise apply the same state match here
+        if not app.config.get('SEARCH_PUSHDOWN', True):
+            profiles = SearchPredicates(location=location).apply(profiles)
 
         # Ensure all required fields are present
         for profile in profiles:
@@ -668,6 +814,248 @@ def linkedin_search_api():
             'message': str(e)
         }), 500
 
+@app.route('/api/linkedin/search/states', methods=['POST'])
+def linkedin_search_states_api():
+    """Search a set of US states in parallel (states: list of names or "all") and merge the results."""
+    try:
+        data = request.get_json()
+        search_query = data.get('search_query', '')
+        states = data.get('states', 'all')
+        company_size = data.get('company_size', '')
+        max_results = int(data.get('max_results', 100))
+        per_state_results = data.get('per_state_results')
+
+        if not search_query:
+            return jsonify({'status': 'error', 'message': 'search_query is required'}), 400
+
+        profiles = linkedin_search_states(
+            search_query=search_query,
+            states=states,
+            max_results=max_results,
+            company_size=company_size,
+            per_state_results=int(per_state_results) if per_state_results else None
+        )
+
+        print(f"Sending {len(profiles)} profiles from state fan-out")
+        return jsonify({
+            'status': 'success',
+            'profiles': profiles
+        })
+
+    except Exception as e:
+        print(f"Error in state fan-out search: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/linkedin/search/stream', methods=['GET', 'POST'])
+def stream_search():
+    """
+    Run a search and stream its progress: one event per parsed results page
+    (with that page's profiles), then a summary with the final deduplicated list.
+    Sends Server-Sent Events when asked for text/event-stream or format=sse,
+    newline-delimited JSON otherwise. The search keeps running as a job if the
+    client disconnects.
+    """
+    data = request.get_json(silent=True) if request.method == 'POST' else None
+    data = data or request.args.to_dict()
+    if not data.get('search_query'):
+        return jsonify({'status': 'error', 'message': 'search_query is required'}), 400
+    if isinstance(data.get('states'), str) and data['states'].lower() != 'all':
+        data['states'] = data['states'].split(';')
+
+    use_sse = data.get('format') == 'sse' or request.accept_mimetypes.best == 'text/event-stream'
+    heartbeat = app.config.get('SEARCH_STREAM_HEARTBEAT', 15)
+    events = queue.Queue()
+    job = submit_search_job(data, listener=events.put)
+    jobs = get_search_jobs()
+
+    def encode(event):
+        if use_sse:
+            return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        return json.dumps(event) + "\n"
+
+    def generate():
+        try:
+            yield encode({'event': 'job', 'job_id': job['id'], 'status': job['status']})
+            while True:
+                try:
+                    event = events.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield encode({'event': 'heartbeat'})
+                    continue
+
+                if event['event'] != 'done':
+                    yield encode(event)
+                    continue
+
+                finished = jobs.get(job['id'], include_result=True)
+                profiles = finished['result'] or []
+                yield encode({
+                    'event': 'summary',
+                    'job_id': job['id'],
+                    'status': finished['status'],
+                    'error': finished['error'],
+                    'profile_count': len(profiles),
+                    'profiles': profiles
+                })
+                break
+        finally:
+            jobs.unsubscribe(job['id'], events.put)
+
+    response = Response(stream_with_context(generate()),
+                        mimetype='text/event-stream' if use_sse else 'application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/linkedin/search/jobs', methods=['POST'])
+def create_search_job():
+    """Queue a search and return its job id right away."""
+    data = request.get_json()
+    if not data or not data.get('search_query'):
+        return jsonify({'status': 'error', 'message': 'search_query is required'}), 400
+
+    job = submit_search_job(data)
+    return jsonify({
+        'status': 'success',
+        'job': job
+    }), 202
+
+@app.route('/api/linkedin/search/jobs', methods=['GET'])
+def list_search_jobs():
+    limit = request.args.get('limit', type=int, default=50)
+    return jsonify({
+        'status': 'success',
+        'jobs': get_search_jobs().list(limit=limit)
+    })
+
+@app.route('/api/linkedin/search/jobs/<job_id>', methods=['GET'])
+def get_search_job(job_id):
+    job = get_search_jobs().get(job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+
+    return jsonify({
+        'status': 'success',
+        'job': job
+    })
+
+@app.route('/api/linkedin/search/jobs/<job_id>/result', methods=['GET'])
+def get_search_job_result(job_id):
+    job = get_search_jobs().get(job_id, include_result=True)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    if job['status'] not in FINISHED_STATUSES:
+        return jsonify({'status': 'error', 'message': f"Job is {job['status']}"}), 409
+
+    return jsonify({
+        'status': 'success',
+        'job_status': job['status'],
+        'profiles': job['result'] or [],
+        'error': job['error']
+    })
+
+@app.route('/api/linkedin/search/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_search_job(job_id):
+    job = get_search_jobs().cancel(job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+
+    return jsonify({
+        'status': 'success',
+        'job': job
+    })
+
+@app.route('/api/linkedin/sessions', methods=['GET'])
+def linkedin_sessions():
+    """Saved LinkedIn sessions with expiry and how many searches hold each one."""
+    return jsonify({
+        'status': 'success',
+        **get_session_store().summary()
+    })
+
+@app.route('/api/linkedin/rate_limit', methods=['GET'])
+def rate_limit_stats():
+    """Scheduler budgets and per-lane wait times."""
+    scheduler = get_scheduler()
+    return jsonify({
+        'status': 'success',
+        'enabled': scheduler is not None,
+        'stats': scheduler.get_stats() if scheduler else None
+    })
+
+@app.route('/api/linkedin/search/cache', methods=['GET', 'DELETE'])
+def search_cache_api():
+    """Search cache hit/miss counters; DELETE empties the cache."""
+    cache = get_configured_search_cache()
+    if request.method == 'DELETE':
+        cache.clear()
+    return jsonify({
+        'status': 'success',
+        'stats': cache.get_stats()
+    })
+
+@app.route('/api/linkedin/profiles/index', methods=['GET', 'DELETE'])
+def profile_index_api():
+    """Size and new/seen counters of the cross-run profile index; DELETE forgets every profile."""
+    index = get_profile_index(app.config['DATA_DIR'])
+    if request.method == 'DELETE':
+        index.clear()
+    return jsonify({
+        'status': 'success',
+        'stats': index.get_stats()
+    })
+
+@app.route('/api/linkedin/contacted', methods=['GET'])
+def contacted_screen_api():
+    """Size and hit counters of the already-contacted screen applied during searches."""
+    contacted = get_configured_contacted_screen()
+    if not contacted:
+        return jsonify({'status': 'error', 'message': 'CONTACTED_SCREEN is disabled'}), 404
+    return jsonify({
+        'status': 'success',
+        'stats': contacted.get_stats()
+    })
+
+@app.route('/api/linkedin/selectors', methods=['GET', 'DELETE'])
+def selector_stats_api():
+    """Per-selector hit/miss counts and the groups flagged as drifted; DELETE forgets them."""
+    selector_stats = get_configured_selector_stats()
+    if request.method == 'DELETE':
+        selector_stats.reset()
+    return jsonify({
+        'status': 'success',
+        'drift': selector_stats.drifted(),
+        'stats': selector_stats.get_stats()
+    })
+
+@app.route('/api/linkedin/llm/cache', methods=['GET', 'DELETE'])
+def llm_cache_api():
+    """Model response cache hit/miss counters; DELETE empties the cache."""
+    cache = get_configured_llm_cache()
+    if not cache:
+        return jsonify({'status': 'error', 'message': 'LLM_CACHE is disabled'}), 404
+    if request.method == 'DELETE':
+        cache.clear()
+    return jsonify({
+        'status': 'success',
+        'stats': cache.get_stats()
+    })
+
+@app.route('/api/linkedin/llm/guard', methods=['GET'])
+def llm_guard_api():
+    """Latency percentiles, retry/hedge counters and circuit state of outreach model calls."""
+    guard = get_configured_llm_guard()
+    if not guard:
+        return jsonify({'status': 'error', 'message': 'LLM_GUARD is disabled'}), 404
+    return jsonify({
+        'status': 'success',
+        'stats': guard.get_stats()
+    })
+
 @app.route('/api/linkedin/generate_message', methods=['POST'])
 def generate_message_api():
     """API endpoint to generate personalized outreach messages."""
@@ -683,13 +1071,15 @@ def generate_message_api():
             }), 400
             
         # Generate personalized message
-        message_data = generate_outreach_message(profile, product_description)
+        message_data = generate_outreach_message(profile, product_description,
+                                                 use_cache=not data.get('refresh', False))
         
         return jsonify({
             'status': 'success',
             'message': message_data['message'],
             'type': message_data['type'],
-            'recipient': message_data['recipient']
+            'recipient': message_data['recipient'],
+            'fallback': message_data['fallback']
         })
         
     except Exception as e:
@@ -699,6 +1089,84 @@ def generate_message_api():
             'message': str(e)
         }), 500
 
+@app.route('/api/linkedin/generate_message/stream', methods=['POST'])
+def stream_message_api():
+    """
+    Generate an outreach message and stream it as Server-Sent Events: 'token'
+    events with text as the model writes it, then 'done' with the final
+    message (quotes stripped, cold outreach cut to 300 characters), type,
+    recipient and fallback flag. The done message replaces the streamed text.
+    """
+    data = request.get_json(silent=True) or {}
+    profile = data.get('profile')
+    if not profile:
+        return jsonify({
+            'status': 'error',
+            'message': 'Profile data is required'
+        }), 400
+
+    events = stream_outreach_message(profile, data.get('product_description', ''), best_connection_path(profile),
+                                     use_cache=not data.get('refresh', False))
+
+    def generate():
+        for event in events:
+            yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/linkedin/generate_messages', methods=['POST'])
+def generate_messages_api():
+    """API endpoint to generate outreach messages for many profiles at once."""
+    try:
+        data = request.get_json() or {}
+        profiles = data.get('profiles')
+        product_description = data.get('product_description', '')
+
+        if not profiles or not isinstance(profiles, list):
+            return jsonify({
+                'status': 'error',
+                'message': 'A list of profiles is required'
+            }), 400
+
+        max_profiles = app.config.get('MESSAGE_BATCH_MAX_PROFILES', 500)
+        if len(profiles) > max_profiles:
+            return jsonify({
+                'status': 'error',
+                'message': f'At most {max_profiles} profiles per request'
+            }), 400
+
+        concurrency = app.config.get('MESSAGE_BATCH_CONCURRENCY', 8)
+        if data.get('concurrency'):
+            concurrency = max(1, min(int(data['concurrency']), concurrency))
+
+        start_time = time.time()
+        results = generate_outreach_messages(profiles, product_description, max_workers=concurrency,
+                                             use_cache=not data.get('refresh', False))
+
+        return jsonify({
+            'status': 'success',
+            'results': results,
+            'stats': {
+                'total': len(results),
+                'generated': sum(1 for r in results if r['status'] == 'success' and not r['fallback']),
+                'fallback': sum(1 for r in results if r['status'] == 'success' and r['fallback']),
+                'errors': sum(1 for r in results if r['status'] == 'error'),
+                'concurrency': concurrency,
+                'elapsed_seconds': round(time.time() - start_time, 2)
+            }
+        })
+
+    except Exception as e:
+        print(f"Error generating messages: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 @app.route('/api/messages/track', methods=['POST'])
 def track_new_message():
     data = request.get_json()
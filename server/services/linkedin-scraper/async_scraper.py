@@ -0,0 +1,853 @@
+# async_scraper.py - Concurrent LinkedIn search engine built on playwright.async_api
+
+import asyncio
+import functools
+import json
+import os
+import re
+import urllib.parse
+from contextlib import asynccontextmanager
+from flask import current_app
+
+from browser_pool import get_browser_pool, SessionUnavailable
+from wait_strategies import async_wait_for_results_settled, async_count_elements
+from card_extraction import extract_cards_bulk_async, placeholder_image, parse_connection_level
+from search_api_capture import SearchResponseCollector
+from search_cache import get_search_cache
+from search_checkpoint import SearchCheckpoint, has_pending_checkpoint
+from us_states import US_STATES
+from rate_limiter import get_scheduler, current_lane, current_account
+from session_store import get_session_store
+from search_predicates import SearchPredicates
+
+from linkedin_scraper import (
+    linkedin_search,
+    create_sample_profiles,
+    merge_profiles_by_best_connection,
+    index_profiles,
+    get_configured_contacted_screen,
+    get_configured_filter_encoder,
+    get_configured_selector_stats,
+    filter_profiles_by_title,
+    extract_profiles_from_html,
+    with_page_param,
+    report_progress,
+    ProgressTracker,
+    SALES_NAV_CARD_SELECTORS,
+    SALES_NAV_NAME_SELECTORS,
+    SALES_NAV_TITLE_SELECTORS,
+    SALES_NAV_LOCATION_SELECTORS,
+    SALES_NAV_CONNECTION_SELECTORS,
+    SALES_NAV_URL_SELECTORS,
+    SALES_NAV_IMAGE_SELECTORS,
+    REGULAR_CARD_SELECTOR,
+    REGULAR_IMAGE_SELECTORS,
+    SEARCH_INPUT_SELECTORS,
+    SALES_NAV_CARD_SPEC,
+    REGULAR_CARD_SPEC,
+)
+
+SALES_NAV_SEARCH_URL = "https://www.linkedin.com/sales/search/people"
+REGULAR_SEARCH_URL = "https://www.linkedin.com/search/results/people/"
+
+COMPANY_SIZE_OPTIONS = {
+    'self-employed': 'text=Self-employed',
+    '1-10': 'text=1-10',
+    '11-50': 'text=11-50',
+    '51-200': 'text=51-200',
+    '201-500': 'text=201-500',
+    '501-1000': 'text=501-1000'
+}
+
+def split_sub_queries(search_query):
+    """Split an 'A OR B OR C' query into sub-queries that can be searched in parallel."""
+    terms = [t.strip() for t in search_query.split(' OR ') if t.strip()]
+    return terms or [search_query]
+
+class PagePool:
+    """Bounded pool of pages opened in a leased, already-authenticated context."""
+
+    def __init__(self, context, size=3):
+        self.context = context
+        self.size = max(1, size)
+        self.pages = []
+        self._pages = asyncio.Queue()
+
+    async def open(self):
+        """Open the pages up front so leases never wait on page creation."""
+        for _ in range(self.size):
+            page = await self.context.new_page()
+            self.pages.append(page)
+            self._pages.put_nowait(page)
+
+    @asynccontextmanager
+    async def page(self):
+        """Lease a page for the duration of a block."""
+        page = await self._pages.get()
+        try:
+            yield page
+        finally:
+            self._pages.put_nowait(page)
+
+    async def close(self):
+        for page in self.pages:
+            try:
+                await page.close()
+            except Exception as e:
+                print(f"Error closing page: {e}")
+        self.pages = []
+
+async def _first_match(node, selectors):
+    """Return the first element under node matching one of the selectors."""
+    for selector in selectors:
+        elem = await node.query_selector(selector)
+        if elem:
+            return elem
+    return None
+
+async def _first_visible(page, selectors, timeout=1000):
+    """Return the first visible locator for the given selectors, or None."""
+    for selector in selectors:
+        try:
+            locator = page.locator(selector).first
+            if await locator.is_visible(timeout=timeout):
+                return locator
+        except Exception:
+            continue
+    return None
+
+async def _scroll_and_load_more(page, max_scrolls=3, wait_sec=2, card_selector=None):
+    """Scroll until a scroll stops loading new cards, waiting on DOM signals rather than sleeping."""
+    for i in range(max_scrolls):
+        previous = await async_count_elements(page, card_selector) if card_selector else None
+        height = await page.evaluate("document.body.scrollHeight")
+        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        await async_wait_for_results_settled(page, card_selector, previous, timeout=wait_sec * 1000, label=f"scroll #{i+1}")
+
+        grew = await page.evaluate("document.body.scrollHeight") != height
+        if card_selector:
+            grew = grew or await async_count_elements(page, card_selector) != previous
+        if not grew:
+            break
+
+async def _extract_card_url(card):
+    """Same URL resolution as the sync scraper: direct href, lead id, then any profile link."""
+    profile_url = "https://www.linkedin.com/sales/"
+    for url_selector in SALES_NAV_URL_SELECTORS:
+        url_elem = await card.query_selector(url_selector)
+        if url_elem:
+            href = await url_elem.get_attribute('href')
+            if href and 'linkedin.com' in href:
+                profile_url = href
+                break
+
+    if profile_url == "https://www.linkedin.com/sales/":
+        lead_id = None
+        lead_elem = await card.query_selector('[data-lead-id]')
+        if lead_elem:
+            lead_id = await lead_elem.get_attribute('data-lead-id')
+
+        links = await card.query_selector_all('a')
+        if not lead_id:
+            for link in links:
+                href = await link.get_attribute('href')
+                if href and 'lead/' in href:
+                    id_match = re.search(r'lead/([^,]+)', href)
+                    if id_match:
+                        lead_id = id_match.group(1)
+                        break
+
+        if lead_id:
+            profile_url = f"https://www.linkedin.com/sales/lead/{lead_id}"
+        else:
+            for link in links:
+                href = await link.get_attribute('href')
+                if href and ('linkedin.com/in/' in href or 'linkedin.com/sales/lead/' in href):
+                    profile_url = href
+                    break
+
+    if '?' in profile_url and not profile_url.startswith('http'):
+        profile_url = f"https://www.linkedin.com{profile_url}"
+    return profile_url
+
+async def _extract_card_image(card, selectors, index):
+    try:
+        for selector in selectors:
+            img_elem = await card.query_selector(selector)
+            if img_elem:
+                src = await img_elem.get_attribute('src')
+                if src and src.strip() and not src.endswith('ghost_person.png'):
+                    return src
+    except Exception as e:
+        print(f"Error extracting profile image: {e}")
+    return placeholder_image(index)
+
+async def extract_sales_nav_profiles_async(page, max_results=50, mode='bulk', collector=None, selector_stats=None):
+    """Async counterpart of linkedin_scraper.extract_sales_nav_profiles."""
+    if collector:
+        profiles = await collector.drain_async(max_results)
+        if profiles:
+            return profiles
+
+    card_selectors = selector_stats.order('sales_nav_cards', SALES_NAV_CARD_SELECTORS) if selector_stats else SALES_NAV_CARD_SELECTORS
+    await _scroll_and_load_more(page, max_scrolls=5, wait_sec=2, card_selector=card_selectors[0])
+
+    if mode == 'bulk':
+        try:
+            used_selector, profiles = await extract_cards_bulk_async(
+                page, dict(SALES_NAV_CARD_SPEC, card_selectors=card_selectors), max_results
+            )
+            if selector_stats:
+                selector_stats.record('sales_nav_cards', card_selectors, used_selector)
+            if used_selector is None:
+                return extract_profiles_from_html(await page.content(), max_results)
+            return profiles
+        except Exception as e:
+            print(f"Bulk extraction failed, falling back to per-element extraction: {e}")
+
+    cards = []
+    used_selector = None
+    for selector in card_selectors:
+        cards = await page.query_selector_all(selector)
+        if cards:
+            used_selector = selector
+            break
+    if selector_stats:
+        selector_stats.record('sales_nav_cards', card_selectors, used_selector)
+
+    if not cards:
+        return extract_profiles_from_html(await page.content(), max_results)
+
+    profiles = []
+    for i, card in enumerate(cards[:max_results]):
+        try:
+            name_elem = await _first_match(card, SALES_NAV_NAME_SELECTORS)
+            name = (await name_elem.inner_text()).strip() if name_elem else f"Profile #{i+1}"
+
+            title_elem = await _first_match(card, SALES_NAV_TITLE_SELECTORS)
+            headline = (await title_elem.inner_text()).strip() if title_elem else "Sales Professional"
+
+            location_elem = await _first_match(card, SALES_NAV_LOCATION_SELECTORS)
+            location = (await location_elem.inner_text()).strip() if location_elem else "United States"
+
+            connection_elem = await _first_match(card, SALES_NAV_CONNECTION_SELECTORS)
+            connection_level = parse_connection_level(await connection_elem.inner_text()) if connection_elem else "2nd"
+
+            try:
+                profile_url = await _extract_card_url(card)
+            except Exception as e:
+                print(f"Error extracting URL: {e}")
+                profile_url = "https://www.linkedin.com/sales/"
+
+            profiles.append({
+                "name": name,
+                "headline": headline,
+                "location": location,
+                "connection_level": connection_level,
+                "profile_url": profile_url,
+                "profile_image": await _extract_card_image(card, SALES_NAV_IMAGE_SELECTORS, i),
+                "mutual_connections": [],
+                "tnl_connection": False
+            })
+        except Exception as e:
+            print(f"Error extracting profile {i+1}: {e}")
+
+    return profiles
+
+async def extract_regular_profiles_async(page, max_results=50, mode='bulk'):
+    """Async counterpart of the regular-LinkedIn card loop in linkedin_search."""
+    await _scroll_and_load_more(page, max_scrolls=3, wait_sec=2, card_selector=REGULAR_CARD_SELECTOR)
+
+    if mode == 'bulk':
+        try:
+            return (await extract_cards_bulk_async(page, REGULAR_CARD_SPEC, max_results))[1]
+        except Exception as e:
+            print(f"Bulk extraction failed, falling back to per-element extraction: {e}")
+
+    profiles = []
+    for i, card in enumerate((await page.query_selector_all(REGULAR_CARD_SELECTOR))[:max_results]):
+        try:
+            name_elem = await card.query_selector('.entity-result__title-text a span[aria-hidden="true"]')
+            name = (await name_elem.inner_text()).strip() if name_elem else f"LinkedIn User {i + 1}"
+
+            headline_elem = await card.query_selector('.entity-result__primary-subtitle')
+            headline = (await headline_elem.inner_text()).strip() if headline_elem else "Sales Professional"
+
+            location_elem = await card.query_selector('.entity-result__secondary-subtitle')
+            location = (await location_elem.inner_text()).strip() if location_elem else "United States"
+
+            connection_elem = await card.query_selector('.entity-result__badge-text span')
+            connection_level = parse_connection_level((await connection_elem.inner_text()).strip()) if connection_elem else "2nd"
+
+            profile_url = "https://www.linkedin.com/"
+            url_elem = await card.query_selector('.entity-result__title-text a')
+            if url_elem:
+                profile_url = await url_elem.get_attribute('href') or profile_url
+
+            profiles.append({
+                "name": name,
+                "headline": headline,
+                "location": location,
+                "connection_level": connection_level,
+                "profile_url": profile_url,
+                "profile_image": await _extract_card_image(card, REGULAR_IMAGE_SELECTORS, i),
+                "mutual_connections": [],
+                "tnl_connection": False
+            })
+        except Exception as e:
+            print(f"Error processing regular LinkedIn card {i+1}: {e}")
+
+    return profiles
+
+class AsyncSearchEngine:
+    """
+    Runs a LinkedIn search over a bounded pool of pages:
+    1) Split the query into OR sub-queries and seed each one on its own page
+    2) Fan result pages 2..max_pages out across the pool by URL
+    3) Fall back to regular LinkedIn result pages, also in parallel
+    Contexts are leased from the warm BrowserPool. search() must run on the
+    pool's event loop and returns None when no authenticated context is
+    available, so callers can fall back to the sync scraper (which handles login).
+    """
+
+    def __init__(self, browser_pool, concurrency=3, max_pages=10, split_or_terms=True, extraction_mode='bulk',
+                 capture_search_api=True, scheduler=None, lane='interactive', contacted=None, pushdown=True,
+                 filter_encoder=None, selector_stats=None):
+        self.browser_pool = browser_pool
+        self.selector_stats = selector_stats
+        self.contacted = contacted
+        self.pushdown = pushdown
+        self.filter_encoder = filter_encoder
+        self.scheduler = scheduler
+        self.lane = lane
+        self.concurrency = max(1, concurrency)
+        self.max_pages = max_pages
+        self.split_or_terms = split_or_terms
+        self.capture_search_api = capture_search_api
+        self.extract_sales_nav = functools.partial(extract_sales_nav_profiles_async, mode=extraction_mode,
+                                                   selector_stats=selector_stats)
+        self.extract_regular = functools.partial(extract_regular_profiles_async, mode=extraction_mode)
+
+    def _card_selector(self):
+        """The Sales Navigator card selector that matched most recently."""
+        if self.selector_stats:
+            return self.selector_stats.best('sales_nav_cards', SALES_NAV_CARD_SELECTORS)
+        return SALES_NAV_CARD_SELECTORS[0]
+
+    async def _pace(self, kind):
+        """Wait for the shared NavigationScheduler before a LinkedIn action."""
+        if self.scheduler:
+            await self.scheduler.acquire_async(kind, current_account.get(), self.lane)
+
+    async def search(self, search_query, max_results=50, selected_state=None, company_size=None, checkpoint=None,
+                     progress=None):
+        resume = checkpoint.load() if checkpoint else None
+        # Filters run on each page as it is extracted (see SearchPredicates)
+        predicates = SearchPredicates(search_query if self.pushdown else None,
+                                      selected_state if self.pushdown else None,
+                                      self.contacted, sync_contacted=False)
+        await self._sync_contacted()
+        try:
+            async with self.browser_pool.lease() as pooled:
+                # Each search runs in its own task, so the account is scoped to this search
+                current_account.set(pooled.account)
+                pool = PagePool(pooled.context, size=self.concurrency)
+                try:
+                    await pool.open()
+                    profiles = []
+                    if not resume or resume['phase'] == 'sales_nav':
+                        profiles = await self._search_sales_nav(pool, search_query, max_results, selected_state,
+                                                                company_size, checkpoint, resume, progress, predicates)
+                    if profiles is None:
+                        # Stopped by the progress callback
+                        return []
+                    if not profiles:
+                        print("Sales Navigator approach failed. Trying regular LinkedIn...")
+                        regular_resume = resume if resume and resume['phase'] == 'regular' else None
+                        profiles = await self._search_regular(pool, search_query, max_results, checkpoint, regular_resume,
+                                                              progress, predicates)
+                    print(predicates.summary())
+                    return predicates.with_relaxed(profiles)
+                finally:
+                    await pool.close()
+        except SessionUnavailable as e:
+            print(f"{e}, async engine cannot run")
+            return None
+
+    async def _sync_contacted(self):
+        """Pick up newly tracked messages; a rebuild reads message_tracking.json, so it runs off the loop."""
+        if self.contacted:
+            await asyncio.get_running_loop().run_in_executor(None, self.contacted.sync)
+
+    async def search_states(self, search_query, states, per_state_results=25, company_size=None, checkpoints=None,
+                            progress=None):
+        """
+        Run one sub-search per state in parallel. Each shard leases its own pooled
+        context, so the browser pool size bounds how many run at once. Returns a
+        list of per-state results in the order of `states` (None where a shard could not run).
+        """
+        checkpoints = checkpoints or {}
+        print(f"Fanning '{search_query}' out over {len(states)} states")
+        return await asyncio.gather(*[
+            self.search(search_query, per_state_results, state, company_size, checkpoints.get(state), progress)
+            for state in states
+        ])
+
+    async def _search_sales_nav(self, pool, search_query, max_results, selected_state, company_size,
+                                checkpoint=None, resume=None, progress=None, predicates=None):
+        predicates = predicates or SearchPredicates()
+        if resume:
+            # Results URLs carry the query and filters, so seeding can be skipped
+            all_profiles = list(resume['profiles'])
+            pending = list(resume['urls'])
+            page_num = resume['page_num'] + 1
+        else:
+            sub_queries = split_sub_queries(search_query) if self.split_or_terms else [search_query]
+            print(f"Running {len(sub_queries)} Sales Navigator sub-queries with {self.concurrency} pages")
+
+            seeds = await asyncio.gather(*[
+                self._seed_sales_nav(pool, q, max_results, selected_state, company_size)
+                for q in sub_queries
+            ])
+
+            all_profiles = []
+            pending = []
+            await self._sync_contacted()
+            for base_url, first_page in seeds:
+                all_profiles.extend(predicates.apply(first_page))
+                if base_url and first_page:
+                    pending.append(base_url)
+            if checkpoint and all_profiles:
+                checkpoint.save('sales_nav', 1, pending, all_profiles)
+            if not report_progress(progress, 'sales_nav', 1, all_profiles, len(all_profiles), predicates.rejected):
+                return all_profiles or None
+            page_num = 2
+
+        # Each wave loads the next `concurrency` pages of every pending sub-query at once,
+        # like _search_regular; the page pool bounds how many are open together
+        while pending and page_num <= self.max_pages and len(all_profiles) < max_results:
+            last_page = min(page_num + self.concurrency - 1, self.max_pages)
+            wave = [(url, n) for url in pending for n in range(page_num, last_page + 1)]
+            results = await self._run_wave(pool, wave, max_results, self.extract_sales_nav,
+                                           wait_selector=self._card_selector(),
+                                           capture=self.capture_search_api)
+            wave_profiles = []
+            exhausted = set()
+            await self._sync_contacted()
+            for (url, num), profiles in zip(wave, results):
+                if url in exhausted:
+                    continue
+                if not profiles:
+                    # The sub-query ran out of results; later pages of it are ignored
+                    exhausted.add(url)
+                    continue
+                print(f"Found {len(profiles)} profiles on page {num}")
+                # A page whose profiles were all filtered out still has a next page
+                wave_profiles.extend(predicates.apply(profiles))
+            pending = [url for url in pending if url not in exhausted]
+            all_profiles.extend(wave_profiles)
+            if checkpoint:
+                checkpoint.save('sales_nav', last_page, pending, all_profiles)
+            if not report_progress(progress, 'sales_nav', last_page, wave_profiles, len(all_profiles),
+                                   predicates.rejected):
+                return all_profiles or None
+            page_num = last_page + 1
+
+        return all_profiles
+
+    async def _run_wave(self, pool, targets, max_results, extractor, wait_selector=None, capture=False):
+        """Scrape (base_url, page_num) targets concurrently, bounded by the pool size."""
+        async def scrape(base_url, page_num):
+            async with pool.page() as page:
+                collector = SearchResponseCollector().attach(page) if capture else None
+                try:
+                    await self._pace('pagination')
+                    await page.goto(with_page_param(base_url, page_num), timeout=30000)
+                    if wait_selector:
+                        try:
+                            await page.wait_for_selector(wait_selector, timeout=15000)
+                        except Exception:
+                            return []
+                    if collector:
+                        return await extractor(page, max_results=max_results, collector=collector)
+                    return await extractor(page, max_results=max_results)
+                except Exception as e:
+                    print(f"Error processing page {page_num} of {base_url}: {e}")
+                    return []
+                finally:
+                    if collector:
+                        collector.detach(page)
+
+        return await asyncio.gather(*[scrape(url, num) for url, num in targets])
+
+    async def _seed_sales_nav(self, pool, query, max_results, selected_state, company_size):
+        """Run the keyword search (plus filters) and return (results_url, page_1_profiles)."""
+        async with pool.page() as page:
+            collector = SearchResponseCollector().attach(page) if self.capture_search_api else None
+            try:
+                filtered_url = self.filter_encoder.build_url(query, selected_state, company_size) if self.filter_encoder else None
+                if filtered_url:
+                    await self._pace('navigation')
+                    await page.goto(filtered_url, timeout=30000)
+                    try:
+                        await page.wait_for_selector(self._card_selector(), timeout=30000)
+                        await async_wait_for_results_settled(page, timeout=3000, label=f"'{query}' filtered results rendered")
+                        profiles = await self.extract_sales_nav(page, max_results=max_results, collector=collector)
+                        print(f"Sub-query '{query}' page 1 (filtered URL): {len(profiles)} profiles")
+                        return page.url, profiles
+                    except Exception as e:
+                        print(f"Filtered results URL did not load for '{query}', applying filters through the UI: {e}")
+
+                await self._pace('navigation')
+                await page.goto(SALES_NAV_SEARCH_URL, timeout=30000)
+                search_input = None
+                for selector in SEARCH_INPUT_SELECTORS:
+                    try:
+                        search_input = await page.wait_for_selector(selector, timeout=3000)
+                        break
+                    except Exception:
+                        continue
+                if not search_input:
+                    print(f"Search input not found for sub-query: {query}")
+                    return None, []
+
+                await search_input.click()
+                await search_input.fill(query)
+                await self._pace('search')
+                await search_input.press('Enter')
+                await page.wait_for_selector(self._card_selector(), timeout=30000)
+                await async_wait_for_results_settled(page, timeout=3000, label=f"'{query}' results rendered")
+
+                if selected_state or company_size:
+                    await self._apply_filters(page, selected_state, company_size)
+                    if selected_state and self.filter_encoder:
+                        self.filter_encoder.learn_region(selected_state, page.url)
+
+                base_url = page.url
+                profiles = await self.extract_sales_nav(page, max_results=max_results, collector=collector)
+                print(f"Sub-query '{query}' page 1: {len(profiles)} profiles")
+                return base_url, profiles
+            except Exception as e:
+                print(f"Sales Navigator search failed for sub-query '{query}': {e}")
+                return None, []
+            finally:
+                if collector:
+                    collector.detach(page)
+
+    async def _apply_filters(self, page, selected_state, company_size):
+        """Async version of the geography/company size dropdown flow in linkedin_search."""
+        if selected_state:
+            try:
+                button = await _first_visible(page, [
+                    'button:has-text("Geography")',
+                    'button[data-control-name="geographic_facet_toggle"]'
+                ])
+                if button:
+                    await self._pace('filter')
+                    await button.click()
+                    locations_input = await _first_visible(page, [
+                        'input[placeholder="Add locations"]',
+                        '[role="combobox"][placeholder="Add locations"]',
+                        'input.search-filter-typeahead__input',
+                        '.search-filter-typeahead input'
+                    ], timeout=3000)
+                    if locations_input:
+                        await self._pace('filter')
+                        await locations_input.fill(selected_state)
+                        option = await _first_visible(page, [
+                            f'li[role="option"]:has-text("{selected_state}")',
+                            f'ul[role="listbox"] li:has-text("{selected_state}")'
+                        ], timeout=5000)
+                        if option:
+                            await self._pace('filter')
+                            await option.click()
+                        else:
+                            await self._pace('filter')
+                            await locations_input.press("Enter")
+                        include = await _first_visible(page, [f'button:has-text("{t}")' for t in ("Include", "Apply", "Done")])
+                        if include:
+                            await self._pace('filter')
+                            await include.click()
+                        await async_wait_for_results_settled(page, quiet_ms=750, timeout=3000, label="geography results update")
+                else:
+                    print("Geography button not found or not visible")
+            except Exception as e:
+                print(f"Error applying geography filter: {e}")
+
+        if company_size:
+            size_selector = COMPANY_SIZE_OPTIONS.get(company_size)
+            if not size_selector:
+                print(f"Invalid company size value: {company_size}")
+                return
+            try:
+                button = await _first_visible(page, [
+                    'button:has-text("Company headcount")',
+                    'button[data-control-name="company_size_facet_toggle"]'
+                ])
+                if button:
+                    await self._pace('filter')
+                    await button.click()
+                    option = await _first_visible(page, [size_selector], timeout=3000)
+                    if option:
+                        await self._pace('filter')
+                        await option.click()
+                        apply_button = await _first_visible(page, ['button:has-text("Apply")', 'button:has-text("Done")'])
+                        if apply_button:
+                            await self._pace('filter')
+                            await apply_button.click()
+                        await async_wait_for_results_settled(page, quiet_ms=750, timeout=3000, label="company size results update")
+                    else:
+                        print(f"Company size option not found: {company_size}")
+                else:
+                    print("Company size filter button not found")
+            except Exception as e:
+                print(f"Error applying company size filter: {e}")
+
+    async def _search_regular(self, pool, search_query, max_results, checkpoint=None, resume=None, progress=None,
+                              predicates=None):
+        predicates = predicates or SearchPredicates()
+        base_url = f"{REGULAR_SEARCH_URL}?keywords={urllib.parse.quote(search_query)}"
+        all_profiles = list(resume['profiles']) if resume else []
+        page_num = resume['page_num'] + 1 if resume else 1
+        while page_num <= self.max_pages and len(all_profiles) < max_results:
+            wave = [(base_url, n) for n in range(page_num, min(page_num + self.concurrency, self.max_pages + 1))]
+            results = await self._run_wave(pool, wave, max_results, self.extract_regular,
+                                           wait_selector=REGULAR_CARD_SELECTOR)
+            await self._sync_contacted()
+            wave_profiles = predicates.apply([profile for profiles in results for profile in profiles])
+            all_profiles.extend(wave_profiles)
+            if checkpoint:
+                checkpoint.save('regular', wave[-1][1], [base_url], all_profiles)
+            if not report_progress(progress, 'regular', wave[-1][1], wave_profiles, len(all_profiles),
+                                   predicates.rejected):
+                break
+            if not any(results):
+                break
+            page_num += len(wave)
+        return all_profiles
+
+def refine_profiles(profiles, search_query):
+    """Title-filter and dedupe profiles the same way the sync scraper does."""
+    try:
+        filtered = filter_profiles_by_title(profiles, search_query)
+    except Exception as e:
+        print(f"Error filtering profiles by title: {e}")
+        filtered = profiles
+    return merge_profiles_by_best_connection(filtered)
+
+def is_sample_data(profiles, search_query):
+    """True for the create_sample_profiles fallback the sync scraper returns when it found nothing."""
+    return bool(profiles) and profiles == create_sample_profiles(search_query)[:len(profiles)]
+
+def finalize_search_results(profiles, search_query, max_results, data_dir, persist=True):
+    """Refine and persist profiles; sample data only when nothing was found."""
+    final_profiles = index_profiles(refine_profiles(profiles, search_query))[:max_results]
+    if not final_profiles:
+        print("No profiles found, returning sample data")
+        final_profiles = create_sample_profiles(search_query)
+
+    if persist:
+        with open(os.path.join(data_dir, "profiles.json"), "w") as f:
+            json.dump(final_profiles, f)
+
+    print(f"Final result: {len(final_profiles)} unique profiles")
+    return final_profiles
+
+def get_configured_browser_pool():
+    config = current_app.config
+    return get_browser_pool(
+        get_session_store(),
+        size=config.get('BROWSER_POOL_SIZE', 2),
+        max_uses=config.get('BROWSER_POOL_MAX_USES', 20),
+        headless=config.get('BROWSER_HEADLESS', False),
+        resource_blocking=config.get('RESOURCE_BLOCKING', True),
+        blocking_profiles=config.get('RESOURCE_BLOCKING_PROFILES'),
+        scheduler=get_scheduler()
+    )
+
+def get_configured_engine(browser_pool):
+    config = current_app.config
+    return AsyncSearchEngine(
+        browser_pool,
+        concurrency=config.get('SEARCH_CONCURRENCY', 3),
+        max_pages=config.get('SEARCH_MAX_PAGES', 10),
+        extraction_mode=config.get('EXTRACTION_MODE', 'bulk'),
+        capture_search_api=config.get('CAPTURE_SEARCH_API', True),
+        scheduler=get_scheduler(),
+        lane=current_lane(),
+        contacted=get_configured_contacted_screen(),
+        pushdown=config.get('SEARCH_PUSHDOWN', True),
+        filter_encoder=get_configured_filter_encoder(),
+        selector_stats=get_configured_selector_stats()
+    )
+
+def linkedin_search_async(search_query, max_results=50, selected_state=None, company_size=None, progress=None,
+                          persist=True):
+    """Run the concurrent engine on the warm browser pool, falling back to linkedin_search when it cannot run."""
+    config = current_app.config
+    browser_pool = get_configured_browser_pool()
+    engine = get_configured_engine(browser_pool)
+
+    checkpoint = None
+    if config.get('SEARCH_CHECKPOINTS', True):
+        checkpoint = SearchCheckpoint(config['DATA_DIR'], 'async', search_query, selected_state, company_size,
+                                      max_age=config.get('SEARCH_CHECKPOINT_MAX_AGE', 86400))
+
+    tracker = ProgressTracker(progress)
+    try:
+        profiles = browser_pool.run(engine.search(search_query, max_results, selected_state, company_size, checkpoint,
+                                                  tracker))
+    except Exception as e:
+        print(f"Async search engine error: {e}")
+        profiles = None
+
+    if profiles is None:
+        print("Falling back to the sync scraper")
+        return linkedin_search(search_query, max_results, selected_state, company_size, progress, persist=persist)
+
+    # A cancelled search keeps its checkpoint so a retry continues from it, as in linkedin_search
+    if checkpoint and not tracker.stopped:
+        checkpoint.complete()
+
+    return finalize_search_results(profiles, search_query, max_results, config['DATA_DIR'], persist=persist)
+
+def resolve_states(states):
+    """Map 'all' or short names like 'Texas' to entries of US_STATES, dropping unknown ones."""
+    if isinstance(states, str):
+        states = US_STATES if states.lower() == 'all' else [s for s in states.split(';') if s.strip()]
+    resolved = []
+    for state in states:
+        name = state.strip().lower()
+        for us_state in US_STATES:
+            if us_state.lower() == name or us_state.lower().split(',')[0] == name:
+                if us_state not in resolved:
+                    resolved.append(us_state)
+                break
+        else:
+            print(f"Unknown state skipped: {state}")
+    return resolved
+
+def linkedin_search_states(search_query, states, max_results=100, company_size=None, per_state_results=None,
+                           progress=None):
+    """
+    Shard a search by state to get past the per-search pagination ceiling.
+    Shards are served from the search cache when possible, the rest run in
+    parallel on the browser pool; results are merged by best connection.
+    """
+    config = current_app.config
+    states = resolve_states(states)
+    if not states:
+        return []
+    # An even share per state, so the shards together scrape about max_results profiles
+    per_state_results = per_state_results or -(-max_results // len(states))
+
+    cache = get_configured_search_cache() if config.get('SEARCH_CACHE', True) else None
+    shard_results = {}
+    for state in states:
+        if cache:
+            profiles, _ = cache.lookup(search_query, per_state_results, state, company_size)
+            if profiles is not None:
+                shard_results[state] = profiles
+                report_progress(progress, 'cache', 1, profiles, len(profiles))
+    to_run = [state for state in states if state not in shard_results]
+    print(f"State fan-out: {len(shard_results)} shards cached, {len(to_run)} to scrape")
+
+    if to_run:
+        tracker = ProgressTracker(progress)
+        browser_pool = get_configured_browser_pool()
+        engine = get_configured_engine(browser_pool)
+        checkpoints = {}
+        if config.get('SEARCH_CHECKPOINTS', True):
+            checkpoints = {
+                state: SearchCheckpoint(config['DATA_DIR'], 'async', search_query, state, company_size,
+                                        max_age=config.get('SEARCH_CHECKPOINT_MAX_AGE', 86400))
+                for state in to_run
+            }
+        try:
+            results = browser_pool.run(engine.search_states(search_query, to_run, per_state_results, company_size,
+                                                            checkpoints, tracker))
+        except Exception as e:
+            print(f"State fan-out error: {e}")
+            results = [None] * len(to_run)
+
+        for state, profiles in zip(to_run, results):
+            if profiles is None:
+                # No pooled session: the sync scraper can log in, one state at a time
+                # finalize_search_results indexes the merged shards; indexing here too would mark them all seen
+                profiles = linkedin_search(search_query, per_state_results, state, company_size, tracker, index=False)
+                if is_sample_data(profiles, search_query):
+                    # Sample rows must not be merged with real shards (or reach the profile index)
+                    print(f"{state}: sync fallback found nothing")
+                    profiles = []
+            else:
+                if state in checkpoints and not tracker.stopped:
+                    checkpoints[state].complete()
+                profiles = refine_profiles(profiles, search_query)[:per_state_results]
+            shard_results[state] = profiles
+            if cache and is_cacheable_result(profiles, search_query, state, company_size, tracker):
+                cache.store(search_query, per_state_results, state, company_size, profiles)
+
+    all_profiles = []
+    for state in states:
+        print(f"{state}: {len(shard_results[state])} profiles")
+        all_profiles.extend(shard_results[state])
+    return finalize_search_results(all_profiles, search_query, max_results, config['DATA_DIR'])
+
+def run_search(search_query, max_results=50, selected_state=None, company_size=None, progress=None, persist=True):
+    """Pick the search engine configured in SEARCH_ENGINE."""
+    if current_app.config.get('SEARCH_ENGINE', 'async') == 'async':
+        return linkedin_search_async(search_query, max_results, selected_state, company_size, progress, persist)
+    return linkedin_search(search_query, max_results, selected_state, company_size, progress, persist)
+
+def is_cacheable_result(profiles, search_query, selected_state, company_size, tracker):
+    """
+    Whether a finished search may go in the search cache: not the sample-data
+    fallback, nor a search that was cancelled or stopped partway, whose
+    checkpoint is still there so a retry continues from it.
+    """
+    return (bool(profiles) and not is_sample_data(profiles, search_query) and not tracker.stopped
+            and not has_pending_checkpoint(current_app.config['DATA_DIR'], search_query, selected_state, company_size))
+
+def refresh_search(search_query, max_results, selected_state=None, company_size=None):
+    """Re-run a stale cached search for SearchCache.refresh_in_background; None when the result must not be cached."""
+    tracker = ProgressTracker()
+    # A background refresh must not replace the last search the user ran in profiles.json
+    profiles = run_search(search_query, max_results, selected_state, company_size, tracker, persist=False)
+    return profiles if is_cacheable_result(profiles, search_query, selected_state, company_size, tracker) else None
+
+def get_configured_search_cache():
+    config = current_app.config
+    return get_search_cache(
+        config['DATA_DIR'],
+        ttl=config.get('SEARCH_CACHE_TTL', 3600),
+        stale_ttl=config.get('SEARCH_CACHE_STALE_TTL', 0),
+        max_entries=config.get('SEARCH_CACHE_MAX_ENTRIES', 200)
+    )
+
+def search_profiles(search_query, max_results=50, selected_state=None, company_size=None, use_cache=True,
+                    progress=None):
+    """
+    Entry point for the routes: serve repeated searches from the result cache, otherwise run one.
+    progress is called with each page of profiles as it is parsed (see report_progress).
+    """
+    if not use_cache or not current_app.config.get('SEARCH_CACHE', True):
+        return run_search(search_query, max_results, selected_state, company_size, progress)
+
+    cache = get_configured_search_cache()
+    profiles, state = cache.lookup(search_query, max_results, selected_state, company_size)
+    if profiles is not None:
+        print(f"Search cache {state} hit: {len(profiles)} profiles for '{search_query}'")
+        report_progress(progress, 'cache', 1, profiles, len(profiles))
+        # /results reads the last search from profiles.json
+        with open(os.path.join(current_app.config['DATA_DIR'], "profiles.json"), "w") as f:
+            json.dump(profiles, f)
+        if state == 'stale':
+            cache.refresh_in_background(current_app._get_current_object(), refresh_search,
+                                        search_query, max_results, selected_state, company_size)
+        return profiles
+
+    tracker = ProgressTracker(progress)
+    profiles = run_search(search_query, max_results, selected_state, company_size, tracker)
+    if is_cacheable_result(profiles, search_query, selected_state, company_size, tracker):
+        cache.store(search_query, max_results, selected_state, company_size, profiles)
+    return profiles
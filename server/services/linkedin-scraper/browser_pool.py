@@ -0,0 +1,276 @@
+# browser_pool.py - Long-lived Chromium with warm, authenticated contexts shared across searches
+
+import asyncio
+import atexit
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+
+from linkedin_scraper import BROWSER_ARGS, BROWSER_USER_AGENT, BROWSER_VIEWPORT
+from resource_blocking import apply_resource_blocking_async
+
+SALES_NAV_HOME_URL = "https://www.linkedin.com/sales/home"
+SESSION_COOKIE = "li_at"
+
+class SessionUnavailable(Exception):
+    """Raised when no authenticated context can be built from the saved cookies."""
+
+class PooledContext:
+    """A browser context plus the bookkeeping used for health checks and recycling."""
+
+    def __init__(self, context, account, resource_policy=None):
+        self.context = context
+        self.account = account
+        self.resource_policy = resource_policy
+        self.uses = 0
+        self.created_at = time.time()
+
+class BrowserPool:
+    """
+    Keeps one Chromium and up to `size` authenticated contexts alive between searches.
+    Playwright's async objects live on a dedicated event loop thread; Flask worker
+    threads hand coroutines to that loop with run(). Contexts are checked on every
+    lease and return, and recycled after max_uses leases or max_age seconds.
+    Each context is logged in as one account checked out from the SessionStore,
+    so with several accounts the pool spreads searches across them.
+    """
+
+    def __init__(self, session_store, size=2, max_uses=20, max_age=3600, headless=False,
+                 resource_blocking=True, blocking_profiles=None, scheduler=None):
+        self.session_store = session_store
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.headless = headless
+        self.resource_blocking = resource_blocking
+        self.blocking_profiles = blocking_profiles
+        self.scheduler = scheduler
+        self.stats = {'launches': 0, 'contexts_created': 0, 'recycled': 0, 'leases': 0}
+        self._loop = None
+        self._thread = None
+        self._started = threading.Event()
+        self._start_lock = threading.Lock()
+        self._playwright = None
+        self._browser = None
+        self._idle = []
+        self._total = 0
+        self._cond = None
+        self._launch_lock = None
+
+    def start(self):
+        """Start the event loop thread if it is not running yet."""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run_loop, name="browser-pool", daemon=True)
+            self._thread.start()
+        self._started.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._cond = asyncio.Condition()
+        self._launch_lock = asyncio.Lock()
+        self._started.set()
+        self._loop.run_forever()
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the pool's loop from any thread and wait for its result."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    async def _ensure_browser(self):
+        if self._browser and self._browser.is_connected():
+            return self._browser
+        # Leases that arrive together must not each launch a Chromium
+        async with self._launch_lock:
+            if self._browser and self._browser.is_connected():
+                return self._browser
+            if not self._playwright:
+                self._playwright = await async_playwright().start()
+            relaunch = self._browser is not None
+            self._browser = await self._playwright.chromium.launch(headless=self.headless, args=BROWSER_ARGS)
+            self.stats['launches'] += 1
+            print("Browser pool launched Chromium")
+
+        if relaunch:
+            # Idle contexts belonging to the crashed browser are gone with it; leased ones
+            # fail their health check and are discarded when they come back
+            async with self._cond:
+                for pooled in self._idle:
+                    self._total -= 1
+                    self.stats['recycled'] += 1
+                    self.session_store.checkin(pooled.account)
+                self._idle = []
+                self._cond.notify_all()
+        return self._browser
+
+    async def _new_context(self):
+        """Build a context for the least busy valid session, skipping sessions that turn out to be expired."""
+        tried = []
+        while True:
+            account, cookies = self.session_store.checkout(exclude=tried)
+            if not account:
+                raise SessionUnavailable("No valid saved LinkedIn session")
+            try:
+                return await self._open_session(account, cookies)
+            except SessionUnavailable:
+                self.session_store.mark_expired(account)
+                self.session_store.checkin(account)
+                tried.append(account)
+            except Exception:
+                self.session_store.checkin(account)
+                raise
+
+    async def _open_session(self, account, cookies):
+        browser = await self._ensure_browser()
+        context = await browser.new_context(user_agent=BROWSER_USER_AGENT, viewport=BROWSER_VIEWPORT)
+        resource_policy = None
+        try:
+            if self.resource_blocking:
+                resource_policy = await apply_resource_blocking_async(context, self.blocking_profiles)
+            await context.add_cookies(cookies)
+            page = await context.new_page()
+            try:
+                if self.scheduler:
+                    # Contexts are warmed on demand for a waiting search
+                    await self.scheduler.acquire_async('navigation', account, 'interactive')
+                await page.goto(SALES_NAV_HOME_URL, timeout=30000)
+                if 'login' in page.url.lower():
+                    raise SessionUnavailable(f"Saved LinkedIn session for {account} expired")
+            finally:
+                await page.close()
+        except Exception:
+            await context.close()
+            raise
+
+        self.stats['contexts_created'] += 1
+        print(f"Browser pool warmed a new context for {account} ({self._total}/{self.size})")
+        return PooledContext(context, account, resource_policy)
+
+    async def _healthy(self, pooled):
+        """Cheap check without navigation: browser alive, not worn out, session cookie valid."""
+        if not self._browser or not self._browser.is_connected():
+            return False
+        if pooled.uses >= self.max_uses or time.time() - pooled.created_at > self.max_age:
+            return False
+        try:
+            cookies = await pooled.context.cookies("https://www.linkedin.com")
+        except Exception:
+            return False
+        for cookie in cookies:
+            if cookie['name'] == SESSION_COOKIE:
+                expires = cookie.get('expires', -1)
+                return expires == -1 or expires > time.time()
+        return False
+
+    async def _discard(self, pooled):
+        self._total -= 1
+        self.stats['recycled'] += 1
+        if pooled.resource_policy:
+            print(f"Resource blocking: {pooled.resource_policy.blocked} requests aborted over {pooled.uses} searches")
+        self.session_store.checkin(pooled.account)
+        try:
+            await pooled.context.close()
+        except Exception:
+            pass
+
+    async def _acquire(self):
+        async with self._cond:
+            while True:
+                while self._idle:
+                    # Oldest idle context first, so leases rotate across accounts
+                    pooled = self._idle.pop(0)
+                    if await self._healthy(pooled):
+                        return pooled
+                    await self._discard(pooled)
+                if self._total < self.size:
+                    self._total += 1
+                    break
+                await self._cond.wait()
+
+        try:
+            return await self._new_context()
+        except Exception:
+            async with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+    async def _release(self, pooled):
+        # Close pages left behind by the lessee so the next lease starts clean
+        for page in list(pooled.context.pages):
+            try:
+                await page.close()
+            except Exception:
+                pass
+        async with self._cond:
+            if await self._healthy(pooled):
+                self._idle.append(pooled)
+            else:
+                await self._discard(pooled)
+            self._cond.notify()
+
+    @asynccontextmanager
+    async def lease(self):
+        """Lease an authenticated PooledContext; it goes back to the pool when the block exits."""
+        pooled = await self._acquire()
+        pooled.uses += 1
+        self.stats['leases'] += 1
+        try:
+            yield pooled
+        finally:
+            await self._release(pooled)
+
+    async def _close(self):
+        for pooled in self._idle:
+            self.session_store.checkin(pooled.account)
+            try:
+                await pooled.context.close()
+            except Exception:
+                pass
+        self._idle = []
+        self._total = 0
+        if self._browser:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def shutdown(self):
+        """Close the browser and stop the loop thread."""
+        if not self._thread or not self._thread.is_alive():
+            return
+        try:
+            self.run(self._close(), timeout=30)
+        except Exception as e:
+            print(f"Error shutting down browser pool: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_browser_pool(session_store, size=2, max_uses=20, headless=False, resource_blocking=True, blocking_profiles=None,
+                     scheduler=None):
+    """Return the process-wide browser pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(session_store, size=size, max_uses=max_uses, headless=headless,
+                                resource_blocking=resource_blocking, blocking_profiles=blocking_profiles,
+                                scheduler=scheduler)
+            atexit.register(_pool.shutdown)
+        return _pool
+
+def _reset_after_fork():
+    # The loop thread does not survive fork; forked workers build their own pool
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,152 @@
+# card_extraction.py - Read every result card's fields in a single page.evaluate round-trip
+
+import re
+
+# Runs in the page. Picks the first card selector with matches, then reads each
+# field with the same first-match selector order the per-element path uses.
+BULK_CARD_EXTRACTION_JS = """
+(spec) => {
+    let cards = [];
+    let used = null;
+    for (const selector of spec.card_selectors) {
+        const found = document.querySelectorAll(selector);
+        if (found.length) {
+            cards = Array.from(found);
+            used = selector;
+            break;
+        }
+    }
+
+    const firstMatch = (card, selectors) => {
+        for (const selector of selectors) {
+            const el = card.querySelector(selector);
+            if (el) return el;
+        }
+        return null;
+    };
+    const text = (card, selectors) => {
+        const el = firstMatch(card, selectors);
+        return el ? el.innerText.trim() : null;
+    };
+
+    const rows = cards.slice(0, spec.max_results).map((card) => {
+        let url = null;
+        for (const selector of spec.url_selectors) {
+            const el = card.querySelector(selector);
+            if (!el) continue;
+            const href = el.getAttribute('href');
+            if (href && (!spec.url_requires_domain || href.includes('linkedin.com'))) {
+                url = href;
+                break;
+            }
+        }
+
+        let image = null;
+        for (const selector of spec.image_selectors) {
+            const el = card.querySelector(selector);
+            if (!el) continue;
+            const src = el.getAttribute('src');
+            if (src && src.trim() && !src.endsWith('ghost_person.png')) {
+                image = src;
+                break;
+            }
+        }
+
+        const lead = card.querySelector('[data-lead-id]');
+        return {
+            name: text(card, spec.name_selectors),
+            headline: text(card, spec.title_selectors),
+            location: text(card, spec.location_selectors),
+            connection: text(card, spec.connection_selectors),
+            url: url,
+            lead_id: lead ? lead.getAttribute('data-lead-id') : null,
+            hrefs: spec.resolve_lead_urls
+                ? Array.from(card.querySelectorAll('a')).map((a) => a.getAttribute('href')).filter(Boolean)
+                : [],
+            image: image
+        };
+    });
+
+    return {selector: used, rows: rows};
+}
+"""
+
+def placeholder_image(index):
+    """Placeholder profile image used when a card has no usable photo."""
+    gender = "women" if index % 2 else "men"
+    return f"https://randomuser.me/api/portraits/{gender}/{(index % 10) + 20}.jpg"
+
+def parse_connection_level(connection_text, default="2nd"):
+    """Map a degree badge text to our connection level values."""
+    if not connection_text:
+        return default
+    if "1st" in connection_text:
+        return "1st"
+    elif "2nd" in connection_text:
+        return "2nd"
+    elif "3rd" in connection_text:
+        return "3rd+"
+    return default
+
+def resolve_card_url(row, spec):
+    """Apply the per-element URL fallbacks (lead id, any profile link) to a bulk row."""
+    default_url = spec['default_url']
+    profile_url = row.get('url') or default_url
+    if not spec.get('resolve_lead_urls'):
+        return profile_url
+
+    hrefs = row.get('hrefs') or []
+    if profile_url == default_url:
+        lead_id = row.get('lead_id')
+        if not lead_id:
+            for href in hrefs:
+                id_match = re.search(r'lead/([^,]+)', href) if 'lead/' in href else None
+                if id_match:
+                    lead_id = id_match.group(1)
+                    break
+        if lead_id:
+            profile_url = f"https://www.linkedin.com/sales/lead/{lead_id}"
+
+    if profile_url == default_url:
+        for href in hrefs:
+            if 'linkedin.com/in/' in href or 'linkedin.com/sales/lead/' in href:
+                profile_url = href
+                break
+
+    if '?' in profile_url and not profile_url.startswith('http'):
+        profile_url = f"https://www.linkedin.com{profile_url}"
+    return profile_url
+
+def profiles_from_card_rows(rows, spec, index_offset=0):
+    """Turn the JSON rows returned by BULK_CARD_EXTRACTION_JS into profile dicts."""
+    profiles = []
+    for i, row in enumerate(rows):
+        profiles.append({
+            "name": row.get('name') or spec['default_name'].format(n=index_offset + i + 1),
+            "headline": row.get('headline') or "Sales Professional",
+            "location": row.get('location') or "United States",
+            "connection_level": parse_connection_level(row.get('connection')),
+            "profile_url": resolve_card_url(row, spec),
+            "profile_image": row.get('image') or placeholder_image(i),
+            "mutual_connections": [],
+            "tnl_connection": False
+        })
+    return profiles
+
+def _spec_arg(spec, max_results):
+    arg = {k: v for k, v in spec.items() if k.endswith('_selectors') or k in ('url_requires_domain', 'resolve_lead_urls')}
+    arg['max_results'] = max_results
+    return arg
+
+def extract_cards_bulk(page, spec, max_results=50, index_offset=0):
+    """
+    Extract all cards with one page.evaluate call.
+    Returns (used_selector, profiles); used_selector is None when no card selector matched.
+    """
+    result = page.evaluate(BULK_CARD_EXTRACTION_JS, _spec_arg(spec, max_results))
+    return result['selector'], profiles_from_card_rows(result['rows'], spec, index_offset)
+
+async def extract_cards_bulk_async(page, spec, max_results=50, index_offset=0):
+    """Async counterpart of extract_cards_bulk."""
+    result = await page.evaluate(BULK_CARD_EXTRACTION_JS, _spec_arg(spec, max_results))
+    return result['selector'], profiles_from_card_rows(result['rows'], spec, index_offset)
@@ -0,0 +1,236 @@
+# contacted_screen.py - Bloom filter of already-messaged profiles, consulted while search results are extracted
+
+import atexit
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+
+from profile_index import identity_keys, canonical_profile_url
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter sized for `capacity` keys at `error_rate` false
+    positives (about 1.8 MB for a million keys at 0.1%). Positions come from
+    double hashing one 128-bit blake2b digest.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(1, int(capacity))
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / self.capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+def contact_keys(profile_id, profile_data):
+    """Identity keys of a tracked message's profile; profile_id counts when it is a profile URL."""
+    keys = identity_keys(profile_data or {})
+    url = canonical_profile_url(profile_id) if isinstance(profile_id, str) else None
+    if url and f"url:{url}" not in keys:
+        keys.append(f"url:{url}")
+    return keys
+
+class ContactedScreen:
+    """
+    Answers "have we already messaged this person?" for scraped profiles without
+    loading message_tracking.json per search. The filter is built from every
+    tracked message, saved next to it as contacted.bloom, and updated as
+    messages are tracked. A change to the tracking file made by another
+    process triggers a rebuild. Tracked messages only mark the filter dirty;
+    sync() writes it out at most every `save_interval` seconds, and right away
+    after a rebuild. A save that never happens just means the next process
+    rebuilds. False positives (error_rate) skip a lead; there are no false
+    negatives.
+    """
+
+    def __init__(self, data_dir, capacity=1000000, error_rate=0.001, save_interval=30):
+        self.data_dir = os.path.realpath(data_dir)
+        self.tracking_file = os.path.join(self.data_dir, 'message_tracking.json')
+        self.path = os.path.join(self.data_dir, 'contacted.bloom')
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.save_interval = save_interval
+        self.stats = {'checked': 0, 'contacted': 0, 'rebuilds': 0, 'saves': 0}
+        self._lock = threading.Lock()
+        self._filter = None
+        self._signature = None
+        self._dirty = False
+        self._saved_at = 0
+
+    def _tracking_signature(self):
+        try:
+            stat = os.stat(self.tracking_file)
+        except FileNotFoundError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def sync(self):
+        """
+        Bring the filter up to date with the tracking file. A rebuild reads the
+        whole file without holding the lock and swaps the new filter in at the
+        end, so callers on an event loop should run this in an executor.
+        """
+        signature = self._tracking_signature()
+        with self._lock:
+            current = self._filter is not None and signature == self._signature
+            if not current and self._filter is None and self._load(signature):
+                current = True
+        if not current:
+            bloom = self._build()
+            with self._lock:
+                self._install(bloom, signature)
+        self._flush(force=not current)
+
+    def _load(self, signature):
+        """Use the saved filter if it was written for the tracking file as it is now."""
+        try:
+            with open(self.path, 'rb') as f:
+                header = json.loads(f.readline())
+                bits = f.read()
+        except (FileNotFoundError, ValueError):
+            return False
+        if header.get('signature') != signature or header.get('error_rate') != self.error_rate:
+            return False
+        bloom = BloomFilter(header['capacity'], header['error_rate'])
+        if len(bits) != len(bloom.bits):
+            return False
+        bloom.bits = bytearray(bits)
+        bloom.count = header['count']
+        self._filter = bloom
+        self._signature = signature
+        return True
+
+    def _flush(self, force=False):
+        """Write the filter if it changed, unless it was saved less than save_interval seconds ago."""
+        with self._lock:
+            now = time.monotonic()
+            if not self._dirty or (not force and now - self._saved_at < self.save_interval):
+                return
+            header = {
+                'signature': self._signature,
+                'capacity': self._filter.capacity,
+                'error_rate': self._filter.error_rate,
+                'count': self._filter.count,
+            }
+            bits = bytes(self._filter.bits)
+            self._dirty = False
+            self._saved_at = now
+            self.stats['saves'] += 1
+        # Written outside the lock; a unique temp file per writer as other workers save the same file
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.data_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(json.dumps(header).encode('utf-8') + b'\n')
+                    f.write(bits)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            print(f"Error saving contacted filter: {e}")
+
+    def flush(self):
+        """Save pending additions now, e.g. at exit."""
+        self._flush(force=True)
+
+    def _build(self):
+        try:
+            with open(self.tracking_file, 'r') as f:
+                messages = json.load(f).get('messages', [])
+        except (FileNotFoundError, json.JSONDecodeError):
+            messages = []
+        keys = set()
+        for message in messages:
+            keys.update(contact_keys(message.get('profile_id'), message.get('profile_data')))
+        # Leave room to grow; a rebuild doubles the size once it fills up
+        bloom = BloomFilter(max(self.capacity, 2 * len(keys)), self.error_rate)
+        for key in keys:
+            bloom.add(key)
+        print(f"Built contacted filter from {len(messages)} tracked messages ({len(keys)} keys)")
+        return bloom
+
+    def _install(self, bloom, signature):
+        self._filter = bloom
+        self._signature = signature
+        self.stats['rebuilds'] += 1
+        self._dirty = True
+
+    def add(self, profile_id, profile_data):
+        """Add a just-tracked message's profile; call after the tracking file was saved. The next sync() saves it."""
+        with self._lock:
+            if self._filter is None:
+                # Built from the file (including this message) on first use
+                return
+            for key in contact_keys(profile_id, profile_data):
+                self._filter.add(key)
+            if self._filter.count > self._filter.capacity:
+                # Full: the next sync() rebuilds it at twice the size
+                self._signature = None
+                return
+            self._signature = self._tracking_signature()
+            self._dirty = True
+
+    def is_contacted(self, profile, sync=True):
+        """
+        With sync=False the file isn't checked, for callers that already ran sync()
+        off their event loop; before the first sync nothing counts as contacted.
+        """
+        if sync:
+            self.sync()
+        with self._lock:
+            if self._filter is None:
+                return False
+            contacted = any(key in self._filter for key in identity_keys(profile))
+            self.stats['checked'] += 1
+            self.stats['contacted'] += int(contacted)
+        return contacted
+
+    def screen(self, profiles):
+        """Profiles not yet contacted, in order."""
+        return [profile for profile in profiles if not self.is_contacted(profile)]
+
+    def get_stats(self):
+        self.sync()
+        with self._lock:
+            return dict(self.stats, keys=self._filter.count, capacity=self._filter.capacity,
+                        size_bytes=len(self._filter.bits))
+
+_screen = None
+_screen_lock = threading.Lock()
+
+def get_contacted_screen(data_dir, capacity=1000000, error_rate=0.001, save_interval=30):
+    """Return the process-wide contacted screen, creating it on first use."""
+    global _screen
+    with _screen_lock:
+        if _screen is None:
+            _screen = ContactedScreen(data_dir, capacity=capacity, error_rate=error_rate, save_interval=save_interval)
+            atexit.register(_screen.flush)
+        return _screen
+
+def notify_tracked(data_dir, profile_id, profile_data):
+    """Called by MessageTracker.track_message; updates the screen if this process has one for data_dir."""
+    screen = _screen
+    if screen and screen.data_dir == os.path.realpath(data_dir):
+        try:
+            screen.add(profile_id, profile_data)
+        except Exception as e:
+            print(f"Error updating contacted filter: {e}")
@@ -1,6 +1,5 @@
 # linkedin_scraper.py - Improved version that navigates multiple pages of results
 
-import time
 import json
 import os
 import re
@@ -8,6 +7,164 @@ import urllib.parse
 import random
 from playwright.sync_api import sync_playwright
 from flask import current_app
+from wait_strategies import (
+    wait_for_any_selector,
+    wait_for_hidden,
+    wait_for_results_settled,
+    wait_for_page_change,
+    count_elements,
+    first_text,
+)
+from card_extraction import (
+    placeholder_image,
+    parse_connection_level,
+    extract_cards_bulk,
+)
+from search_api_capture import SearchResponseCollector
+from resource_blocking import apply_resource_blocking
+from search_checkpoint import SearchCheckpoint
+from rate_limiter import pace, current_account
+from session_store import get_session_store, DEFAULT_ACCOUNT
+from title_matcher import TitleMatcher, extract_title_components, component_similarity
+from profile_index import get_profile_index, identity_keys, connection_rank
+from contacted_screen import get_contacted_screen
+from search_predicates import SearchPredicates
+from search_filters import get_filter_encoder
+from selector_stats import get_selector_stats
+
+# Selectors shared by the sync scraper and the async search engine
+SALES_NAV_CARD_SELECTORS = [
+    'div[data-x-search-result="LEAD"]',
+    'ol.search-results__result-list > li',
+    'li.search-results__result-item',
+    'div.search-results__result-container',
+    'div.ember-view.artdeco-list__item'  # More generic selector
+]
+
+SALES_NAV_NAME_SELECTORS = [
+    'a[data-anonymize="person-name"]',
+    '.artdeco-entity-lockup__title a',
+    '.artdeco-entity-lockup__title span',
+    'a[data-control-name="view_lead_panel_via_search_lead_name"]',
+    'span[data-anonymize="person-name"]'
+]
+
+SALES_NAV_TITLE_SELECTORS = [
+    'span[data-anonymize="title"]',
+    '.artdeco-entity-lockup__subtitle',
+    '.artdeco-entity-lockup__content .artdeco-entity-lockup__subtitle',
+    '.search-result__info-container .result-lockup__highlight-keyword'
+]
+
+SALES_NAV_LOCATION_SELECTORS = [
+    'span[data-anonymize="location"]',
+    '.artdeco-entity-lockup__caption',
+    '.artdeco-entity-lockup__content .artdeco-entity-lockup__caption',
+    '.search-result__info-container .result-lockup__position-location'
+]
+
+SALES_NAV_CONNECTION_SELECTORS = [
+    '.artdeco-entity-lockup__degree',
+    '.artdeco-entity-lockup__badge',
+    '.search-result__social-proof-status',
+    '.search-result__connection-level',
+    '.result-lockup__badge-text'
+]
+
+SALES_NAV_URL_SELECTORS = [
+    'a[data-anonymize="person-name"]',
+    'a[data-lead-search-result^="profile-link"]',
+    '.artdeco-entity-lockup__title a',
+    'a[data-control-name="view_lead_panel_via_search_lead_name"]'
+]
+
+SALES_NAV_IMAGE_SELECTORS = [
+    'img.artdeco-entity-lockup__image',
+    '.artdeco-entity-lockup__image img',
+    'img.presence-entity__image',
+    '.search-result__image-wrapper img',
+    '.result-lockup__icon-link img',
+    '.profile-photo-edit__preview',
+    'img[data-anonymize="person-photo"]',
+    '.artdeco-entity-lockup__image img[src]'
+]
+
+REGULAR_CARD_SELECTOR = 'li.reusable-search__result-container, div.entity-result__item'
+
+REGULAR_IMAGE_SELECTORS = [
+    '.entity-result__universal-image img',
+    '.presence-entity img',
+    '.ivm-image-view-model img', 
+    '.entity-result__image img',
+    '.evi-image img'
+]
+
+NEXT_BUTTON_SELECTORS = [
+    'button.artdeco-pagination__button--next',
+    'li.artdeco-pagination__button--next button',
+    'button[aria-label="Next"]',
+    '.search-results__pagination-next-button',
+    '.artdeco-pagination__button--next',
+    '.search-results-container .artdeco-pagination__button--next'
+]
+
+SEARCH_INPUT_SELECTORS = [
+    'input[aria-label="Search by keywords"]',
+    'input.search-global-typeahead__input',
+    'input.global-typeahead__input',
+    'input[placeholder*="Search"]'
+]
+
+LOCATION_INPUT_SELECTORS = [
+    'input[placeholder="Add locations"]',
+    '[role="combobox"][placeholder="Add locations"]',
+    'input.search-filter-typeahead__input',
+    '.search-filter-typeahead input'
+]
+
+FILTER_CONFIRM_SELECTORS = [
+    'button:has-text("Include")',
+    'button:has-text("Apply")',
+    'button:has-text("Done")'
+]
+
+BROWSER_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--no-sandbox',
+    '--disable-setuid-sandbox'
+]
+
+# Field selectors handed to card_extraction.BULK_CARD_EXTRACTION_JS
+SALES_NAV_CARD_SPEC = {
+    'card_selectors': SALES_NAV_CARD_SELECTORS,
+    'name_selectors': SALES_NAV_NAME_SELECTORS,
+    'title_selectors': SALES_NAV_TITLE_SELECTORS,
+    'location_selectors': SALES_NAV_LOCATION_SELECTORS,
+    'connection_selectors': SALES_NAV_CONNECTION_SELECTORS,
+    'url_selectors': SALES_NAV_URL_SELECTORS,
+    'image_selectors': SALES_NAV_IMAGE_SELECTORS,
+    'url_requires_domain': True,
+    'resolve_lead_urls': True,
+    'default_name': "Profile #{n}",
+    'default_url': "https://www.linkedin.com/sales/"
+}
+
+REGULAR_CARD_SPEC = {
+    'card_selectors': [REGULAR_CARD_SELECTOR],
+    'name_selectors': ['.entity-result__title-text a span[aria-hidden="true"]'],
+    'title_selectors': ['.entity-result__primary-subtitle'],
+    'location_selectors': ['.entity-result__secondary-subtitle'],
+    'connection_selectors': ['.entity-result__badge-text span'],
+    'url_selectors': ['.entity-result__title-text a'],
+    'image_selectors': REGULAR_IMAGE_SELECTORS,
+    'url_requires_domain': False,
+    'resolve_lead_urls': False,
+    'default_name': "LinkedIn User {n}",
+    'default_url': "https://www.linkedin.com/"
+}
+
+BROWSER_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+BROWSER_VIEWPORT = {"width": 1280, "height": 800}
 
 def save_cookies(context, filename="cookies.json"):
     """Save browser cookies for future sessions."""
@@ -34,6 +191,7 @@ def perform_login(page, email, password):
     """Explicitly login to LinkedIn Sales Navigator."""
     try:
         # Go directly to Sales Navigator login
+        pace('login')
         page.goto("https://www.linkedin.com/sales/login", timeout=30000)
         
         # Wait for page to be fully loaded
@@ -95,6 +253,7 @@ def perform_login(page, email, password):
         
         # Click submit and wait for navigation
         try:
+            pace('login')
             with page.expect_navigation(timeout=30000):
                 submit_button.click()
                 print("Clicked submit button")
@@ -144,6 +303,25 @@ def perform_login(page, email, password):
             pass
         return False
 
+def refresh_session_cookies(email, password):
+    """Log in with a fresh browser and return the session cookies, or None when login fails."""
+    with sync_playwright() as p:
+        browser = p.chromium.launch(
+            headless=current_app.config.get('BROWSER_HEADLESS', False),
+            args=BROWSER_ARGS
+        )
+        try:
+            context = browser.new_context(
+                user_agent=BROWSER_USER_AGENT,
+                viewport=BROWSER_VIEWPORT
+            )
+            page = context.new_page()
+            if perform_login(page, email, password):
+                return context.cookies()
+            return None
+        finally:
+            browser.close()
+
 def create_sample_profiles(search_query):
     """Create sample data if scraping fails."""
     # Create more realistic sample data (12+ profiles)
@@ -202,21 +380,89 @@ def create_sample_profiles(search_query):
     
     return profiles
 
-def scroll_and_load_more(page, max_scrolls=3, wait_sec=2):
+def scroll_and_load_more(page, max_scrolls=3, wait_sec=2, card_selector=None):
     """
     Scroll down multiple times to trigger auto-loading of additional results.
-    Adjust max_scrolls and wait_sec as needed.
+    Each scroll waits until new cards render or the DOM goes quiet (at most
+    wait_sec), and scrolling stops once a scroll loads nothing new.
     """
     for i in range(max_scrolls):
+        previous = count_elements(page, card_selector) if card_selector else None
+        height = page.evaluate("document.body.scrollHeight")
         # Evaluate JS to scroll to bottom
         page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-        time.sleep(wait_sec)
-        print(f"Scroll #{i+1} done, waited {wait_sec} sec")
+        wait_for_results_settled(page, card_selector, previous, timeout=wait_sec * 1000, label=f"scroll #{i+1}")
+        
+        grew = page.evaluate("document.body.scrollHeight") != height
+        if card_selector:
+            grew = grew or count_elements(page, card_selector) != previous
+        if not grew:
+            print(f"Scroll #{i+1} loaded nothing new, stopping")
+            break
+
+def extract_profiles_from_html(html_content, max_results=50):
+    """Regex fallback for Sales Navigator pages where no card selector matched."""
+    profiles = []
+    
+    # Extract profile data using regex
+    # Most commonly used HTML patterns in Sales Navigator
+    name_pattern = r'<a [^>]*data-anonymize="person-name"[^>]*>([^<]+)<\/a>'
+    headline_pattern = r'<span [^>]*data-anonymize="title"[^>]*>([^<]+)<\/span>'
+    location_pattern = r'<span [^>]*data-anonymize="location"[^>]*>([^<]+)<\/span>'
+    # New: Try to extract image URLs using regex
+    image_pattern = r'<img [^>]*src="([^"]+)"[^>]*data-anonymize="person-photo"[^>]*>'
+    
+    names = re.findall(name_pattern, html_content)
+    headlines = re.findall(headline_pattern, html_content)
+    locations = re.findall(location_pattern, html_content)
+    images = re.findall(image_pattern, html_content)
+    
+    print(f"Regex found {len(names)} names, {len(headlines)} headlines, {len(locations)} locations, and {len(images)} images")
+    
+    # Create profiles from matched data
+    count = min(len(names), max_results)
+    for i in range(count):
+        # Use placeholder image as fallback
+        profile_image = images[i] if i < len(images) and images[i] else placeholder_image(i)
+        
+        profile = {
+            "name": names[i] if i < len(names) else f"Profile #{i+1}",
+            "headline": headlines[i] if i < len(headlines) else "Sales Professional",
+            "location": locations[i] if i < len(locations) else "United States",
+            "connection_level": "2nd",  # Default to 2nd connection
+            "profile_url": "https://www.linkedin.com/sales/",
+            "profile_image": profile_image,  # Add profile image
+            "mutual_connections": [],
+            "tnl_connection": False
+        }
+        
+        profiles.append(profile)
+        print(f"Created profile from regex: {profile['name']}")
+    
+    return profiles
 
-def extract_sales_nav_profiles(page, max_results=50):
-    """Extract profiles after scrolling to load more leads."""
+def extract_sales_nav_profiles(page, max_results=50, mode=None, collector=None):
+    """
+    Extract profiles after scrolling to load more leads.
+    With a SearchResponseCollector attached to the page, the captured search API
+    payload is used and the DOM is not touched. Otherwise mode='bulk' (default,
+    EXTRACTION_MODE config) reads all cards in one page.evaluate call;
+    mode='element' or a bulk failure uses per-element queries.
+    """
+    # Structured search API payloads skip the scroll and render work entirely
+    if collector:
+        profiles = collector.drain(max_results)
+        if profiles:
+            print(f"Captured {len(profiles)} profiles from the search API response")
+            return profiles
+        print("No search API payload captured, falling back to the DOM")
+    
+    # Card selectors in the order that last worked
+    selector_stats = get_configured_selector_stats()
+    card_selectors = selector_stats.order('sales_nav_cards', SALES_NAV_CARD_SELECTORS)
+    
     # Attempt to load more leads
-    scroll_and_load_more(page, max_scrolls=5, wait_sec=2)
+    scroll_and_load_more(page, max_scrolls=5, wait_sec=2, card_selector=card_selectors[0])
     
     # Save page content for debugging
     page_text = page.inner_text('body')
@@ -227,16 +473,24 @@ def extract_sales_nav_profiles(page, max_results=50):
         f.write(page_text)
     
     profiles = []
+    screenshots_dir = os.path.join(current_app.config['DATA_DIR'], 'screenshots')
     
-    # Try multiple card selectors
-    card_selectors = [
-        'div[data-x-search-result="LEAD"]',
-        'ol.search-results__result-list > li',
-        'li.search-results__result-item',
-        'div.search-results__result-container',
-        'div.ember-view.artdeco-list__item'  # More generic selector
-    ]
+    mode = mode or current_app.config.get('EXTRACTION_MODE', 'bulk')
+    if mode == 'bulk':
+        try:
+            used_selector, profiles = extract_cards_bulk(page, dict(SALES_NAV_CARD_SPEC, card_selectors=card_selectors),
+                                                         max_results)
+            selector_stats.record('sales_nav_cards', card_selectors, used_selector)
+            page.screenshot(path=os.path.join(screenshots_dir, "sales_nav_results.png"))
+            if used_selector is None:
+                return extract_profiles_from_html(html_content, max_results)
+            print(f"Bulk-extracted {len(profiles)} profiles using selector: {used_selector}")
+            return profiles
+        except Exception as e:
+            print(f"Bulk extraction failed, falling back to per-element extraction: {e}")
+            profiles = []
     
+    # Try multiple card selectors
     cards = []
     used_selector = None
     
@@ -246,70 +500,23 @@ def extract_sales_nav_profiles(page, max_results=50):
             cards = temp_cards
             used_selector = selector
             break
+    selector_stats.record('sales_nav_cards', card_selectors, used_selector)
     
     # Take a screenshot of the results
-    screenshots_dir = os.path.join(current_app.config['DATA_DIR'], 'screenshots')
     page.screenshot(path=os.path.join(screenshots_dir, "sales_nav_results.png"))
     
     print(f"Found {len(cards)} potential lead cards after scrolling using selector: {used_selector}")
     
     # If no cards found, try a direct string search in the HTML
     if not cards:
-        # Extract profile data using regex
-        # Most commonly used HTML patterns in Sales Navigator
-        name_pattern = r'<a [^>]*data-anonymize="person-name"[^>]*>([^<]+)<\/a>'
-        headline_pattern = r'<span [^>]*data-anonymize="title"[^>]*>([^<]+)<\/span>'
-        location_pattern = r'<span [^>]*data-anonymize="location"[^>]*>([^<]+)<\/span>'
-        # New: Try to extract image URLs using regex
-        image_pattern = r'<img [^>]*src="([^"]+)"[^>]*data-anonymize="person-photo"[^>]*>'
-        
-        names = re.findall(name_pattern, html_content)
-        headlines = re.findall(headline_pattern, html_content)
-        locations = re.findall(location_pattern, html_content)
-        images = re.findall(image_pattern, html_content)
-        
-        print(f"Regex found {len(names)} names, {len(headlines)} headlines, {len(locations)} locations, and {len(images)} images")
-        
-        # Create profiles from matched data
-        count = min(len(names), max_results)
-        for i in range(count):
-            # Generate random profile image if none found
-            profile_image = ""
-            if i < len(images) and images[i]:
-                profile_image = images[i]
-            else:
-                # Use placeholder image as fallback
-                gender = "women" if i % 2 else "men"
-                profile_image = f"https://randomuser.me/api/portraits/{gender}/{(i % 10) + 20}.jpg"
-            
-            profile = {
-                "name": names[i] if i < len(names) else f"Profile #{i+1}",
-                "headline": headlines[i] if i < len(headlines) else "Sales Professional",
-                "location": locations[i] if i < len(locations) else "United States",
-                "connection_level": "2nd",  # Default to 2nd connection
-                "profile_url": "https://www.linkedin.com/sales/",
-                "profile_image": profile_image,  # Add profile image
-                "mutual_connections": [],
-                "tnl_connection": False
-            }
-            
-            profiles.append(profile)
-            print(f"Created profile from regex: {profile['name']}")
+        profiles = extract_profiles_from_html(html_content, max_results)
     else:
         # Process cards found using selectors
         for i, card in enumerate(cards[:max_results]):
             try:
                 # Try different selectors for name
                 name_elem = None
-                name_selectors = [
-                    'a[data-anonymize="person-name"]',
-                    '.artdeco-entity-lockup__title a',
-                    '.artdeco-entity-lockup__title span',
-                    'a[data-control-name="view_lead_panel_via_search_lead_name"]',
-                    'span[data-anonymize="person-name"]'
-                ]
-                
-                for selector in name_selectors:
+                for selector in SALES_NAV_NAME_SELECTORS:
                     name_elem = card.query_selector(selector)
                     if name_elem:
                         break
@@ -318,14 +525,7 @@ def extract_sales_nav_profiles(page, max_results=50):
                 
                 # Try different selectors for headline/title
                 title_elem = None
-                title_selectors = [
-                    'span[data-anonymize="title"]',
-                    '.artdeco-entity-lockup__subtitle',
-                    '.artdeco-entity-lockup__content .artdeco-entity-lockup__subtitle',
-                    '.search-result__info-container .result-lockup__highlight-keyword'
-                ]
-                
-                for selector in title_selectors:
+                for selector in SALES_NAV_TITLE_SELECTORS:
                     title_elem = card.query_selector(selector)
                     if title_elem:
                         break
@@ -334,14 +534,7 @@ def extract_sales_nav_profiles(page, max_results=50):
                 
                 # Try different selectors for location
                 location_elem = None
-                location_selectors = [
-                    'span[data-anonymize="location"]',
-                    '.artdeco-entity-lockup__caption',
-                    '.artdeco-entity-lockup__content .artdeco-entity-lockup__caption',
-                    '.search-result__info-container .result-lockup__position-location'
-                ]
-                
-                for selector in location_selectors:
+                for selector in SALES_NAV_LOCATION_SELECTORS:
                     location_elem = card.query_selector(selector)
                     if location_elem:
                         break
@@ -352,27 +545,13 @@ def extract_sales_nav_profiles(page, max_results=50):
                 connection_level = "2nd"  # Default to 2nd connection
                 
                 connection_elem = None
-                connection_selectors = [
-                    '.artdeco-entity-lockup__degree',
-                    '.artdeco-entity-lockup__badge',
-                    '.search-result__social-proof-status',
-                    '.search-result__connection-level',
-                    '.result-lockup__badge-text'
-                ]
-                
-                for selector in connection_selectors:
+                for selector in SALES_NAV_CONNECTION_SELECTORS:
                     connection_elem = card.query_selector(selector)
                     if connection_elem:
                         break
                 
                 if connection_elem:
-                    connection_text = connection_elem.inner_text()
-                    if "1st" in connection_text:
-                        connection_level = "1st"
-                    elif "2nd" in connection_text:
-                        connection_level = "2nd"
-                    elif "3rd" in connection_text or "3rd+" in connection_text:
-                        connection_level = "3rd+"
+                    connection_level = parse_connection_level(connection_elem.inner_text(), connection_level)
                 
                 # Extract profile URL
                 profile_url = "https://www.linkedin.com/sales/"  # Default fallback URL
@@ -380,12 +559,7 @@ def extract_sales_nav_profiles(page, max_results=50):
                     # Try multiple approaches to get the URL
                     
                     # Approach 1: Direct href extraction
-                    for url_selector in [
-                        'a[data-anonymize="person-name"]',
-                        'a[data-lead-search-result^="profile-link"]',
-                        '.artdeco-entity-lockup__title a',
-                        'a[data-control-name="view_lead_panel_via_search_lead_name"]'
-                    ]:
+                    for url_selector in SALES_NAV_URL_SELECTORS:
                         url_elem = card.query_selector(url_selector)
                         if url_elem:
                             href = url_elem.get_attribute('href')
@@ -440,18 +614,7 @@ def extract_sales_nav_profiles(page, max_results=50):
                 profile_image = ""
                 try:
                     # Try different image selectors
-                    img_selectors = [
-                        'img.artdeco-entity-lockup__image',
-                        '.artdeco-entity-lockup__image img',
-                        'img.presence-entity__image',
-                        '.search-result__image-wrapper img',
-                        '.result-lockup__icon-link img',
-                        '.profile-photo-edit__preview',
-                        'img[data-anonymize="person-photo"]',
-                        '.artdeco-entity-lockup__image img[src]'
-                    ]
-                    
-                    for selector in img_selectors:
+                    for selector in SALES_NAV_IMAGE_SELECTORS:
                         img_elem = card.query_selector(selector)
                         if img_elem:
                             src = img_elem.get_attribute('src')
@@ -462,15 +625,13 @@ def extract_sales_nav_profiles(page, max_results=50):
                     
                     # If no image found, use a placeholder
                     if not profile_image:
-                        gender = "women" if i % 2 else "men"
-                        profile_image = f"https://randomuser.me/api/portraits/{gender}/{(i % 10) + 20}.jpg"
+                        profile_image = placeholder_image(i)
                         print(f"Using placeholder image: {profile_image}")
                 
                 except Exception as e:
                     print(f"Error extracting profile image: {e}")
                     # Use a placeholder image if we encounter an error
-                    gender = "women" if i % 2 else "men"
-                    profile_image = f"https://randomuser.me/api/portraits/{gender}/{(i % 10) + 20}.jpg"
+                    profile_image = placeholder_image(i)
                 
                 # Create profile object
                 profile = {
@@ -495,30 +656,37 @@ def extract_sales_nav_profiles(page, max_results=50):
 def navigate_to_next_page(page):
     """Navigate to the next page of search results. Returns True if successful."""
     try:
-        # Try different next page button selectors
-        next_button_selectors = [
-            'button.artdeco-pagination__button--next',
-            'li.artdeco-pagination__button--next button',
-            'button[aria-label="Next"]',
-            '.search-results__pagination-next-button',
-            '.artdeco-pagination__button--next',
-            '.search-results-container .artdeco-pagination__button--next'
-        ]
+        # Remember where we are so we can wait for the page to actually change
+        card_selector = ", ".join(SALES_NAV_CARD_SELECTORS)
+        previous_url = page.url
+        previous_first = first_text(page, card_selector)
         
-        for selector in next_button_selectors:
+        # Try different next page button selectors, the one that worked last time first
+        selector_stats = get_configured_selector_stats()
+        next_selectors = selector_stats.order('next_button', NEXT_BUTTON_SELECTORS)
+        next_button = None
+        next_selector = None
+        for selector in next_selectors:
             next_button = page.query_selector(selector)
             if next_button:
-                # Check if button is disabled
-                is_disabled = next_button.get_attribute('disabled')
-                if is_disabled:
-                    print("Next page button is disabled, reached last page")
-                    return False
-                
-                # Click the button
-                next_button.click()
-                time.sleep(3)  # Wait for page to load
-                print("Navigated to next page")
-                return True
+                next_selector = selector
+                break
+        selector_stats.record('next_button', next_selectors, next_selector)
+        
+        if next_button:
+            # Check if button is disabled
+            is_disabled = next_button.get_attribute('disabled')
+            if is_disabled:
+                print("Next page button is disabled, reached last page")
+                return False
+            
+            # Click the button
+            pace('pagination')
+            next_button.click()
+            wait_for_page_change(page, previous_url, card_selector, previous_first)
+            wait_for_any_selector(page, card_selector, timeout=10000, label="next page cards")
+            print("Navigated to next page")
+            return True
         
         # If no button found, try to find the URL for the next page
         pagination_links = page.query_selector_all('li.artdeco-pagination__indicator a')
@@ -535,8 +703,10 @@ def navigate_to_next_page(page):
             # Look for the next page link
             for link in pagination_links:
                 if link.inner_text().strip() == str(next_page):
+                    pace('pagination')
                     link.click()
-                    time.sleep(3)
+                    wait_for_page_change(page, previous_url, card_selector, previous_first)
+                    wait_for_any_selector(page, card_selector, timeout=10000, label="next page cards")
                     print(f"Navigated to page {next_page} via pagination link")
                     return True
         
@@ -549,22 +719,25 @@ def navigate_to_next_page(page):
                 current_page = int(page_match.group(1))
                 next_page = current_page + 1
                 next_url = current_url.replace(f'page={current_page}', f'page={next_page}')
+                pace('pagination')
                 page.goto(next_url)
-                time.sleep(3)
+                wait_for_any_selector(page, card_selector, timeout=10000, label="next page cards")
                 print(f"Navigated to page {next_page} via URL modification")
                 return True
             
         # If the URL doesn't have a page parameter, add it
         elif '?' in page.url:
             next_url = page.url + '&page=2'
+            pace('pagination')
             page.goto(next_url)
-            time.sleep(3)
+            wait_for_any_selector(page, card_selector, timeout=10000, label="next page cards")
             print("Navigated to page 2 via URL addition")
             return True
         else:
             next_url = page.url + '?page=2'
+            pace('pagination')
             page.goto(next_url)
-            time.sleep(3)
+            wait_for_any_selector(page, card_selector, timeout=10000, label="next page cards")
             print("Navigated to page 2 via URL addition")
             return True
         
@@ -575,26 +748,119 @@ def navigate_to_next_page(page):
         print(f"Error navigating to next page: {e}")
         return False
 
+def with_page_param(url, page_num):
+    """Return the search URL with its page= parameter set to page_num."""
+    parts = urllib.parse.urlsplit(url)
+    query = [(k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True) if k != 'page']
+    query.append(('page', str(page_num)))
+    encoded = urllib.parse.urlencode(query, quote_via=urllib.parse.quote, safe="(),:")
+    return urllib.parse.urlunsplit(parts._replace(query=encoded))
+
+def report_progress(progress, phase, page_num, new_profiles, total, rejected=None):
+    """
+    Hand a finished results page to the optional progress callback.
+    rejected holds the per-filter rejection counts so far (SearchPredicates.rejected).
+    Returns False when the callback asked the search to stop.
+    """
+    if not progress:
+        return True
+    try:
+        return progress({
+            "phase": phase,
+            "page": page_num,
+            "profiles": new_profiles,
+            "total": total,
+            "rejected": dict(rejected or {})
+        }) is not False
+    except Exception as e:
+        print(f"Error reporting search progress: {e}")
+        return True
+
+class ProgressTracker:
+    """Wraps a progress callback and remembers whether it asked the search to stop."""
+
+    def __init__(self, progress=None):
+        self.progress = progress
+        self.stopped = False
+
+    def __call__(self, update):
+        result = self.progress(update) if self.progress else True
+        if result is False:
+            self.stopped = True
+        return result
+
 def merge_profiles_by_best_connection(profiles):
     """
-    If the same name appears multiple times, keep whichever has
+    If the same person appears multiple times, keep whichever has
     the "highest" connection level: 1st outranks 2nd outranks 3rd+.
+    Profiles are the same person when they share a canonical profile URL or
+    normalized name+company; cards with neither fall back to the exact name.
     """
-    level_map = {"1st": 1, "2nd": 2, "3rd": 3, "3rd+": 3}
-    merged = {}
+    merged = []
+    slots = {}
     for p in profiles:
-        nm = p["name"]
-        if nm not in merged:
-            merged[nm] = p
-        else:
-            old_level = merged[nm]["connection_level"]
-            new_level = p["connection_level"]
-            old_num = level_map.get(old_level, 3)
-            new_num = level_map.get(new_level, 3)
-            # 1 < 2 < 3 => keep the "lowest" numeric
-            if new_num < old_num:
-                merged[nm] = p
-    return list(merged.values())
+        keys = identity_keys(p) or [f"exact:{p['name']}"]
+        slot = next((slots[key] for key in keys if key in slots), None)
+        if slot is None:
+            slot = len(merged)
+            merged.append(p)
+        # 1 < 2 < 3 => keep the "lowest" numeric
+        elif connection_rank(p["connection_level"]) < connection_rank(merged[slot]["connection_level"]):
+            merged[slot] = p
+        for key in keys:
+            slots.setdefault(key, slot)
+    return merged
+
+def get_configured_contacted_screen():
+    """The already-contacted screen searches consult, or None when CONTACTED_SCREEN is off."""
+    config = current_app.config
+    if not config.get('CONTACTED_SCREEN', True):
+        return None
+    return get_contacted_screen(
+        config['DATA_DIR'],
+        capacity=config.get('CONTACTED_SCREEN_CAPACITY', 1000000),
+        error_rate=config.get('CONTACTED_SCREEN_ERROR_RATE', 0.001),
+        save_interval=config.get('CONTACTED_SCREEN_SAVE_INTERVAL', 30)
+    )
+
+def get_configured_selector_stats():
+    """Selector hit/miss stats; SELECTOR_LEARNING=False keeps the fixed fallback order."""
+    config = current_app.config
+    return get_selector_stats(config['DATA_DIR'], adaptive=config.get('SELECTOR_LEARNING', True),
+                              demote_after=config.get('SELECTOR_DEMOTE_AFTER', 5))
+
+def get_configured_filter_encoder():
+    """Encoder for filtered results URLs, or None when SEARCH_FILTER_URLS is off."""
+    if not current_app.config.get('SEARCH_FILTER_URLS', True):
+        return None
+    return get_filter_encoder(current_app.config['DATA_DIR'])
+
+def build_search_predicates(search_query, selected_state=None):
+    """
+    Filters every extracted page goes through before its profiles count toward
+    max_results: location and title (SEARCH_PUSHDOWN) and the already-contacted screen.
+    """
+    pushdown = current_app.config.get('SEARCH_PUSHDOWN', True)
+    return SearchPredicates(
+        search_query if pushdown else None,
+        selected_state if pushdown else None,
+        get_configured_contacted_screen()
+    )
+
+def index_profiles(profiles):
+    """
+    Record search results in the cross-run profile index (PROFILE_INDEX), marking
+    each with previously_seen; PROFILE_INDEX_SKIP_SEEN drops leads we already have.
+    """
+    config = current_app.config
+    if not config.get('PROFILE_INDEX', True):
+        return profiles
+    try:
+        index = get_profile_index(config['DATA_DIR'])
+        return index.record(profiles, skip_seen=config.get('PROFILE_INDEX_SKIP_SEEN', False))
+    except Exception as e:
+        print(f"Error updating profile index: {e}")
+        return profiles
 
 def close_saved_searches_popup(page):
     """Close the 'Saved searches' popup if it appears."""
@@ -610,17 +876,22 @@ def close_saved_searches_popup(page):
             '.saved-searches-modal__header button'
         ]
         
+        # Most pages have no popup, so a miss says nothing about drift
+        selector_stats = get_configured_selector_stats()
+        popup_selectors = selector_stats.order('popup_close', popup_selectors)
         for selector in popup_selectors:
             try:
                 close_button = page.locator(selector).first
                 if close_button and close_button.is_visible(timeout=1000):
                     close_button.click()
                     print("Closed 'Saved searches' popup")
-                    page.wait_for_timeout(1000)  # Wait for popup to close
+                    wait_for_hidden(page, close_button, timeout=1000, label="saved searches popup closed")
+                    selector_stats.record('popup_close', popup_selectors, selector, expect_match=False)
                     return True
             except Exception:
                 continue
         
+        selector_stats.record('popup_close', popup_selectors, None, expect_match=False)
         return False
     except Exception as e:
         print(f"Error handling saved searches popup: {e}")
@@ -628,83 +899,17 @@ def close_saved_searches_popup(page):
 
 def calculate_title_similarity(title1, title2):
     """Calculate similarity between two job titles."""
-    # Normalize titles
-    t1 = title1.lower().replace('-', ' ').replace('_', ' ')
-    t2 = title2.lower().replace('-', ' ').replace('_', ' ')
-    
-    # Common seniority levels and their variations
-    seniority_levels = {
-        'chief': ['c-level', 'cxo', 'chief'],
-        'vp': ['vice president', 'vp', 'vice-president', 'vice pres'],
-        'head': ['head', 'head of', 'leader'],
-        'director': ['director', 'dir'],
-        'president': ['president', 'pres'],
-        'lead': ['lead', 'leader', 'leading'],
-        'senior': ['senior', 'sr', 'sr.', 'senior'],
-        'principal': ['principal', 'prin'],
-        'manager': ['manager', 'mgr', 'management'],
-        'executive': ['executive', 'exec']
-    }
-    
-    # Extract core role and seniority
-    def extract_components(title):
-        words = title.split()
-        seniority = ''
-        role = []
-        
-        for word in words:
-            found_seniority = False
-            for level, variations in seniority_levels.items():
-                if any(var in word for var in variations):
-                    seniority = level
-                    found_seniority = True
-                    break
-            if not found_seniority:
-                role.append(word)
-        
-        return seniority, ' '.join(role)
-    
-    # Get components
-    seniority1, role1 = extract_components(t1)
-    seniority2, role2 = extract_components(t2)
-    
-    # Calculate role similarity
-    role_words1 = set(role1.split())
-    role_words2 = set(role2.split())
-    role_similarity = len(role_words1.intersection(role_words2)) / max(len(role_words1), len(role_words2))
-    
-    # Calculate seniority similarity
-    seniority_similarity = 1.0 if seniority1 == seniority2 else 0.5  # Give partial credit for different seniority levels
-    
-    # Weight role similarity more heavily than seniority
-    final_similarity = (role_similarity * 0.7) + (seniority_similarity * 0.3)
-    
-    return final_similarity
+    return component_similarity(extract_title_components(title1), extract_title_components(title2))
 
-def filter_profiles_by_title(profiles, search_query, min_similarity=0.2):
-    """Filter profiles based on job title similarity."""
-    filtered_profiles = []
-    search_terms = search_query.split(' OR ')
-    
-    for profile in profiles:
-        title = profile.get('headline', '') or profile.get('title', '')
-        max_similarity = 0
-        
-        # Check similarity against each search term
-        for term in search_terms:
-            similarity = calculate_title_similarity(term, title)
-            max_similarity = max(max_similarity, similarity)
-        
-        if max_similarity >= min_similarity:
-            filtered_profiles.append(profile)
-    
-    # If we got very few results, try with a lower threshold
-    if len(filtered_profiles) < 10:
-        return filter_profiles_by_title(profiles, search_query, min_similarity=0.1)
-    
-    return filtered_profiles
+def filter_profiles_by_title(profiles, search_query, min_similarity=0.2, batch=None):
+    """
+    Filter profiles based on job title similarity, relaxing to 0.1 if fewer than 10 pass.
+    batch=True forces the vectorized scorer; by default it is used for large lists.
+    """
+    return TitleMatcher(search_query).filter(profiles, min_similarity, batch=batch)
 
-def linkedin_search(search_query, max_results=50, selected_state=None, company_size=None):
+def linkedin_search(search_query, max_results=50, selected_state=None, company_size=None, progress=None,
+                    persist=True, index=True):
     """
     Search LinkedIn for profiles with pagination:
     1) Start with Sales Navigator
@@ -712,6 +917,10 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
     3) Navigate through multiple pages (up to 10)
     4) Fall back to regular LinkedIn if needed
     5) Return sample data only as a last resort
+    progress, if given, is called after every results page (see report_progress)
+    and can stop the search by returning False. persist=False leaves
+    profiles.json alone, for searches that only refresh the cache; index=False
+    skips the profile index for callers that index the merged results themselves.
     """
     data_dir = current_app.config['DATA_DIR']
     screenshots_dir = os.path.join(data_dir, 'screenshots')
@@ -719,77 +928,147 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
     
     all_profiles = []
     
+    # Pick up after the last completed page if an earlier run of this search died
+    checkpoint = None
+    resume = None
+    if current_app.config.get('SEARCH_CHECKPOINTS', True):
+        checkpoint = SearchCheckpoint(data_dir, 'sync', search_query, selected_state, company_size,
+                                      max_age=current_app.config.get('SEARCH_CHECKPOINT_MAX_AGE', 86400))
+        resume = checkpoint.load()
+    
+    # Location, contacted and title filters run as pages are extracted, so paging continues until
+    # max_results profiles have passed them all
+    predicates = build_search_predicates(search_query, selected_state)
+    
     with sync_playwright() as p:
         browser = p.chromium.launch(
             headless=False,
-            slow_mo=100,
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--no-sandbox',
-                '--disable-setuid-sandbox'
-            ]
+            # The scheduler paces LinkedIn actions; keep the fixed per-call delay only without it
+            slow_mo=0 if current_app.config.get('RATE_LIMIT', True) else 100,
+            args=BROWSER_ARGS
         )
         context = browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-            viewport={"width": 1280, "height": 800}
+            user_agent=BROWSER_USER_AGENT,
+            viewport=BROWSER_VIEWPORT
         )
+        # Skip images, media, fonts and trackers; only the markup and XHRs matter
+        resource_policy = None
+        if current_app.config.get('RESOURCE_BLOCKING', True):
+            resource_policy = apply_resource_blocking(context, current_app.config.get('RESOURCE_BLOCKING_PROFILES'))
+        
         page = context.new_page()
         
-        cookie_loaded = load_cookies(context)
-        print(f"Cookie loaded: {cookie_loaded}")
+        # Capture the search API responses that fill the Sales Navigator result list
+        collector = None
+        if current_app.config.get('CAPTURE_SEARCH_API', True):
+            collector = SearchResponseCollector().attach(page)
+        
+        # Use the least busy saved session; log in only when none of them is valid
+        session_store = get_session_store()
+        account, cookies = session_store.checkout()
+        if cookies:
+            context.add_cookies(cookies)
+        account_token = current_account.set(account or DEFAULT_ACCOUNT)
+        print(f"Using LinkedIn session: {account or 'none'}")
         
         try:
             # Go to Sales Nav
+            pace('navigation')
             page.goto("https://www.linkedin.com/sales/home", timeout=30000)
             page.screenshot(path=os.path.join(screenshots_dir, "initial_page.png"))
             
             # Check login
             if 'login' in page.url.lower():
                 print("Login page detected, attempting to login")
-                email = current_app.config['LINKEDIN_EMAIL']
-                password = current_app.config['LINKEDIN_PASSWORD']
+                if account:
+                    session_store.mark_expired(account)
+                email = account if account in session_store.accounts else current_app.config['LINKEDIN_EMAIL']
+                password = session_store.accounts.get(email, current_app.config['LINKEDIN_PASSWORD'])
                 
-                if perform_login(page, email, password):
-                    save_cookies(context)
+                # One login per account at a time across workers; reuse the session if another one just logged in
+                with session_store.login_lock(email):
+                    record = session_store.load(email)
+                    if session_store.is_valid(record):
+                        context.add_cookies(record['cookies'])
+                        logged_in = True
+                    else:
+                        logged_in = perform_login(page, email, password)
+                        if logged_in:
+                            session_store.save(email, context.cookies())
+
+                if logged_in:
+                    pace('navigation')
                     page.goto("https://www.linkedin.com/sales/home", timeout=30000)
-                    time.sleep(2)
                 else:
                     browser.close()
                     # Fallback sample
                     sample = create_sample_profiles(search_query)
                     return sample
             
-            # APPROACH 1: Try Sales Navigator
-            # Navigate to People Search
-            page.goto("https://www.linkedin.com/sales/search/people", timeout=30000)
-            time.sleep(3)
-            
-            # Find search input
+            sales_nav_successful = False
+            cancelled = False
             search_input = None
-            for sel in [
-                'input[aria-label="Search by keywords"]',
-                'input.search-global-typeahead__input',
-                'input.global-typeahead__input',
-                'input[placeholder*="Search"]'
-            ]:
-                node = page.query_selector(sel)
-                if node:
-                    search_input = node
-                    break
+            sales_nav_start_page = 1
+            regular_start_page = 1
             
-            sales_nav_successful = False
+            if resume and resume['phase'] == 'regular':
+                # Sales Navigator already came up empty for this search
+                all_profiles = list(resume['profiles'])
+                regular_start_page = resume['page_num'] + 1
+            elif resume and resume['phase'] == 'sales_nav' and resume['urls']:
+                # The results URL carries the query and filters, so go straight to the next page
+                next_page = resume['page_num'] + 1
+                pace('navigation')
+                page.goto(with_page_param(resume['urls'][0], next_page), timeout=30000)
+                if wait_for_any_selector(page, SALES_NAV_CARD_SELECTORS, timeout=15000, label=f"resumed page {next_page} cards"):
+                    all_profiles = list(resume['profiles'])
+                    sales_nav_start_page = next_page
+                    sales_nav_successful = True
+                else:
+                    print("Could not resume from checkpoint, starting the search over")
+            
+            # With the filters encoded in the results URL the search is a single navigation
+            filter_encoder = get_configured_filter_encoder()
+            filtered_url = None
+            if not sales_nav_successful and regular_start_page == 1 and filter_encoder:
+                filtered_url = filter_encoder.build_url(search_query, selected_state, company_size)
+            if filtered_url:
+                print(f"Opening filtered Sales Navigator results: {filtered_url}")
+                pace('navigation')
+                page.goto(filtered_url, timeout=30000)
+                if wait_for_any_selector(page, SALES_NAV_CARD_SELECTORS, timeout=30000, label="filtered results"):
+                    wait_for_results_settled(page, timeout=3000, label="filtered results rendered")
+                    close_saved_searches_popup(page)
+                    page.screenshot(path=os.path.join(screenshots_dir, "sales_nav_found.png"))
+                    sales_nav_successful = True
+                else:
+                    print("Filtered results URL did not load, applying filters through the UI")
+            
+            # APPROACH 1: Try Sales Navigator
+            if not sales_nav_successful and regular_start_page == 1:
+                # Navigate to People Search
+                pace('navigation')
+                page.goto("https://www.linkedin.com/sales/search/people", timeout=30000)
+                wait_for_any_selector(page, SEARCH_INPUT_SELECTORS, timeout=10000, label="search input")
+                
+                # Find search input
+                for sel in SEARCH_INPUT_SELECTORS:
+                    node = page.query_selector(sel)
+                    if node:
+                        search_input = node
+                        break
             
             if search_input:
                 search_input.click()
                 search_input.fill("")
-                time.sleep(0.5)
                 search_input.fill(search_query)
+                pace('search')
                 search_input.press('Enter')
                 
                 # Wait for results to load
                 try:
                     page.wait_for_selector('div[data-x-search-result="LEAD"]', timeout=30000)
-                    time.sleep(3)  # Give page a moment to fully load
+                    wait_for_results_settled(page, timeout=3000, label="initial results rendered")
                     
                     # Apply filters if selected
                     if selected_state or company_size:
@@ -821,21 +1100,17 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                             
                             if geography_button:
                                 try:
+                                    pace('filter')
                                     geography_button.click()
                                     print("Clicked geography filter button")
-                                    page.wait_for_timeout(2000)  # Wait for dropdown to appear
+                                    wait_for_any_selector(page, LOCATION_INPUT_SELECTORS, timeout=2000, label="geography dropdown")
                                     
                                     # Take a screenshot after clicking the geography button
                                     page.screenshot(path=os.path.join(screenshots_dir, "geography_dropdown_open.png"))
                                     
                                     # Find and focus the locations input
                                     locations_input = None
-                                    for selector in [
-                                        'input[placeholder="Add locations"]',
-                                        '[role="combobox"][placeholder="Add locations"]',
-                                        'input.search-filter-typeahead__input',
-                                        '.search-filter-typeahead input'
-                                    ]:
+                                    for selector in LOCATION_INPUT_SELECTORS:
                                         try:
                                             locations_input = page.locator(selector).first
                                             if locations_input and locations_input.is_visible(timeout=1000):
@@ -857,15 +1132,16 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                                             locations_input.click()
                                             locations_input.press("Control+a")  # Select all text
                                             locations_input.press("Backspace")  # Delete selected text
-                                            page.wait_for_timeout(500)
                                             
                                             print(f"Typing location: {selected_state}")
+                                            # Each keystroke can fire a typeahead request
+                                            pace('filter')
                                             # Type location with deliberate typing
                                             for char in selected_state:
                                                 locations_input.type(char, delay=100)  # 100ms delay between keystrokes
                                             
                                             # Wait for suggestions to appear
-                                            page.wait_for_timeout(2000)
+                                            wait_for_any_selector(page, f'li[role="option"]:has-text("{selected_state}"), ul[role="listbox"] li', timeout=2000, label="location suggestions")
                                             
                                             # Take a screenshot to verify typing 
                                             page.screenshot(path=os.path.join(screenshots_dir, "geography_typing_complete.png"))
@@ -873,6 +1149,7 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                                             # Now try to find and click the appropriate suggestion
                                             dropdown_item = page.locator(f'li[role="option"]:has-text("{selected_state}")').first
                                             if dropdown_item and dropdown_item.is_visible(timeout=1000):
+                                                pace('filter')
                                                 dropdown_item.click()
                                                 print(f"Clicked dropdown item for {selected_state}")
                                             else:
@@ -885,13 +1162,14 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                                                     try:
                                                         dropdown_item = page.locator(selector).first
                                                         if dropdown_item and dropdown_item.is_visible(timeout=1000):
+                                                            pace('filter')
                                                             dropdown_item.click()
                                                             print(f"Clicked dropdown item for {selected_state} with alternative selector")
                                                             break
                                                     except Exception:
                                                         continue
                                             
-                                            page.wait_for_timeout(1000)
+                                            wait_for_any_selector(page, FILTER_CONFIRM_SELECTORS, timeout=1000, label="include button")
                                             
                                             # Look for and click "Include" button after selecting the location
                                             include_button = None
@@ -899,6 +1177,7 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                                                 try:
                                                     include_button = page.locator(f'button:has-text("{button_text}")').first
                                                     if include_button and include_button.is_visible(timeout=1000):
+                                                        pace('filter')
                                                         include_button.click()
                                                         print(f"Clicked {button_text} button")
                                                         break
@@ -906,7 +1185,7 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                                                     continue
                                             
                                             # Wait for results to update
-                                            page.wait_for_timeout(3000)
+                                            wait_for_results_settled(page, quiet_ms=750, timeout=3000, label="geography results update")
                                             
                                             # Check for and close the saved searches popup
                                             close_saved_searches_popup(page)
@@ -917,9 +1196,10 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                                             print(f"Error applying geography filter: {e}")
                                             # Try to press Enter to apply the filter as a last resort
                                             try:
+                                                pace('filter')
                                                 locations_input.press("Enter")
                                                 print("Pressed Enter to apply geography filter")
-                                                page.wait_for_timeout(2000)
+                                                wait_for_results_settled(page, quiet_ms=750, timeout=2000, label="geography results update")
                                                 # Check for and close the saved searches popup
                                                 close_saved_searches_popup(page)
                                             except Exception:
@@ -948,9 +1228,9 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                                         continue
                                 
                                 if company_size_button:
+                                    pace('filter')
                                     company_size_button.click()
                                     print("Clicked company size filter button")
-                                    page.wait_for_timeout(2000)
                                     
                                     # Take screenshot of company size dropdown
                                     page.screenshot(path=os.path.join(screenshots_dir, "company_size_dropdown.png"))
@@ -968,17 +1248,20 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                                     # Find and click the appropriate company size option
                                     size_selector = size_selectors.get(company_size)
                                     if size_selector:
+                                        wait_for_any_selector(page, size_selector, timeout=2000, label="company size options")
                                         size_option = page.locator(size_selector).first
                                         if size_option and size_option.is_visible(timeout=1000):
+                                            pace('filter')
                                             size_option.click()
                                             print(f"Selected company size: {company_size}")
-                                            page.wait_for_timeout(1000)
+                                            wait_for_any_selector(page, FILTER_CONFIRM_SELECTORS[1:], timeout=1000, label="apply button")
                                             
                                             # Look for and click Apply/Done button
                                             for button_text in ["Apply", "Done"]:
                                                 try:
                                                     apply_button = page.locator(f'button:has-text("{button_text}")').first
                                                     if apply_button and apply_button.is_visible(timeout=1000):
+                                                        pace('filter')
                                                         apply_button.click()
                                                         print(f"Clicked {button_text} button")
                                                         break
@@ -986,7 +1269,7 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                                                     continue
                                             
                                             # Wait for results to update
-                                            page.wait_for_timeout(3000)
+                                            wait_for_results_settled(page, quiet_ms=750, timeout=3000, label="company size results update")
                                             
                                             # Check for and close the saved searches popup
                                             close_saved_searches_popup(page)
@@ -1005,6 +1288,10 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                     
                     page.screenshot(path=os.path.join(screenshots_dir, "sales_nav_found.png"))
                     sales_nav_successful = True
+                    
+                    # Next time this state can go straight into the results URL
+                    if selected_state and filter_encoder:
+                        filter_encoder.learn_region(selected_state, page.url)
                 except Exception as e:
                     print(f"Sales Navigator search or filter failed: {e}")
                     page.screenshot(path=os.path.join(screenshots_dir, "sales_nav_error.png"))
@@ -1013,22 +1300,31 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
             if sales_nav_successful:
                 max_pages = 10  # Try up to 10 pages
                 
-                for page_num in range(1, max_pages + 1):
+                for page_num in range(sales_nav_start_page, max_pages + 1):
                     print(f"Processing Sales Navigator page {page_num}")
                     page.screenshot(path=os.path.join(screenshots_dir, f"sales_nav_page_{page_num}.png"))
                     
                     # Extract profiles from current page
-                    profiles_from_page = extract_sales_nav_profiles(page, max_results=max_results)
+                    profiles_from_page = extract_sales_nav_profiles(page, max_results=max_results, collector=collector)
                     
                     # If we found profiles, add them to our list
                     if profiles_from_page:
                         print(f"Found {len(profiles_from_page)} profiles on page {page_num}")
+                        profiles_from_page = predicates.apply(profiles_from_page)
                         all_profiles.extend(profiles_from_page)
-                        
-                        # Check if we have enough profiles
-                        if len(all_profiles) >= max_results:
-                            print(f"Found {len(all_profiles)} profiles, which is enough (target: {max_results})")
-                            break
+                        if checkpoint:
+                            checkpoint.save('sales_nav', page_num, [page.url], all_profiles)
+                    
+                    if not report_progress(progress, 'sales_nav', page_num, profiles_from_page, len(all_profiles),
+                                           predicates.rejected):
+                        print("Search cancelled")
+                        cancelled = True
+                        break
+                    
+                    # Check if we have enough profiles
+                    if len(all_profiles) >= max_results:
+                        print(f"Found {len(all_profiles)} profiles, which is enough (target: {max_results})")
+                        break
                     
                     # Try to navigate to the next page
                     if page_num < max_pages:
@@ -1036,34 +1332,57 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                         if not success:
                             print(f"Could not navigate to page {page_num + 1}, stopping pagination")
                             break
-                        time.sleep(3)  # Wait for the next page to load
             
             # APPROACH 2: If Sales Navigator fails or returns no results, try regular LinkedIn
-            if not all_profiles:
+            if not cancelled and (not all_profiles or regular_start_page > 1):
                 print("Sales Navigator approach failed. Trying regular LinkedIn...")
                 encoded = urllib.parse.quote(search_query)
                 
                 # Try multiple pages of regular LinkedIn results
                 max_pages = 10
                 
-                for page_num in range(1, max_pages + 1):
+                for page_num in range(regular_start_page, max_pages + 1):
+                    if cancelled:
+                        print("Search cancelled")
+                        break
                     regular_url = f"https://www.linkedin.com/search/results/people/?keywords={encoded}&page={page_num}"
+                    page_start = len(all_profiles)
                     
                     try:
+                        pace('navigation')
                         page.goto(regular_url, timeout=30000)
-                        time.sleep(5)  # Wait for page to load
+                        wait_for_any_selector(page, REGULAR_CARD_SELECTOR, timeout=10000, label=f"regular LinkedIn page {page_num} cards")
                         
                         # Take a screenshot
                         page.screenshot(path=os.path.join(screenshots_dir, f"regular_linkedin_page_{page_num}.png"))
                         
                         # Try to scroll and load more
-                        scroll_and_load_more(page, max_scrolls=3, wait_sec=2)
+                        scroll_and_load_more(page, max_scrolls=3, wait_sec=2, card_selector=REGULAR_CARD_SELECTOR)
                         
                         # Extract profiles
                         print(f"Extracting profiles from regular LinkedIn page {page_num}...")
                         
+                        # Read all cards in one round-trip when bulk extraction is enabled
+                        if current_app.config.get('EXTRACTION_MODE', 'bulk') == 'bulk':
+                            try:
+                                # Read the whole page when some cards may be filtered out
+                                used_selector, bulk_profiles = extract_cards_bulk(
+                                    page, REGULAR_CARD_SPEC, max_results if predicates.active else max_results - len(all_profiles),
+                                    index_offset=len(all_profiles)
+                                )
+                                if used_selector is None:
+                                    print(f"No profile cards found on page {page_num}, trying next page")
+                                    continue
+                                print(f"Bulk-extracted {len(bulk_profiles)} profiles from regular LinkedIn page {page_num}")
+                                all_profiles.extend(predicates.apply(bulk_profiles))
+                                if len(all_profiles) >= max_results:
+                                    break
+                                continue
+                            except Exception as e:
+                                print(f"Bulk extraction failed, falling back to per-element extraction: {e}")
+                        
                         # Try to find profile cards
-                        profile_cards = page.query_selector_all('li.reusable-search__result-container, div.entity-result__item')
+                        profile_cards = page.query_selector_all(REGULAR_CARD_SELECTOR)
                         
                         if not profile_cards:
                             print(f"No profile cards found on page {page_num}, trying next page")
@@ -1088,13 +1407,7 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                                 connection_level = "2nd"  # Default
                                 connection_elem = card.query_selector('.entity-result__badge-text span')
                                 if connection_elem:
-                                    connection_text = connection_elem.inner_text().strip()
-                                    if "1st" in connection_text:
-                                        connection_level = "1st"
-                                    elif "2nd" in connection_text:
-                                        connection_level = "2nd"
-                                    elif "3rd" in connection_text:
-                                        connection_level = "3rd+"
+                                    connection_level = parse_connection_level(connection_elem.inner_text().strip(), connection_level)
                                 
                                 # Extract profile URL
                                 profile_url = "https://www.linkedin.com/"
@@ -1107,15 +1420,7 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                                 # NEW: Extract profile image
                                 profile_image = ""
                                 try:
-                                    img_selectors = [
-                                        '.entity-result__universal-image img',
-                                        '.presence-entity img',
-                                        '.ivm-image-view-model img', 
-                                        '.entity-result__image img',
-                                        '.evi-image img'
-                                    ]
-                                    
-                                    for selector in img_selectors:
+                                    for selector in REGULAR_IMAGE_SELECTORS:
                                         img_elem = card.query_selector(selector)
                                         if img_elem:
                                             src = img_elem.get_attribute('src')
@@ -1126,12 +1431,10 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                                     
                                     # If no image found, use a placeholder
                                     if not profile_image:
-                                        gender = "women" if i % 2 else "men" 
-                                        profile_image = f"https://randomuser.me/api/portraits/{gender}/{(i % 10) + 20}.jpg"
+                                        profile_image = placeholder_image(i)
                                 except Exception as e:
                                     print(f"Error extracting regular LinkedIn profile image: {e}")
-                                    gender = "women" if i % 2 else "men"
-                                    profile_image = f"https://randomuser.me/api/portraits/{gender}/{(i % 10) + 20}.jpg"
+                                    profile_image = placeholder_image(i)
                                         
                                 # Create profile object
                                 profile = {
@@ -1145,6 +1448,9 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                                     "tnl_connection": False
                                 }
                                 
+                                if not predicates.accepts(profile):
+                                    continue
+                                
                                 all_profiles.append(profile)
                                 print(f"Added profile from regular LinkedIn: {name} ({connection_level})")
                                 
@@ -1162,9 +1468,26 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
                     
                     except Exception as e:
                         print(f"Error processing regular LinkedIn page {page_num}: {e}")
+                    finally:
+                        if checkpoint:
+                            checkpoint.save('regular', page_num, [regular_url], all_profiles)
+                        if not report_progress(progress, 'regular', page_num, all_profiles[page_start:], len(all_profiles),
+                                               predicates.rejected):
+                            cancelled = True
+            
+            # Every page we meant to visit is done; a retry should start fresh
+            if checkpoint and not cancelled:
+                checkpoint.complete()
+            
+            print(predicates.summary())
             
             # After collecting all profiles, filter by title similarity
-            all_profiles = filter_profiles_by_title(all_profiles, search_query)
+            all_profiles = filter_profiles_by_title(predicates.with_relaxed(all_profiles), search_query)
+            
+            # Dedupe within this search, then against earlier searches
+            all_profiles = merge_profiles_by_best_connection(all_profiles)
+            if index:
+                all_profiles = index_profiles(all_profiles)
             
             # Limit to max_results
             all_profiles = all_profiles[:max_results]
@@ -1179,10 +1502,16 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
         except Exception as e:
             print(f"Comprehensive search error: {e}")
         finally:
+            if resource_policy:
+                print(f"Resource blocking: {resource_policy.blocked} requests aborted, {resource_policy.allowed} allowed")
+            session_store.checkin(account)
+            current_account.reset(account_token)
             browser.close()
     
     # Merge duplicates by best connection
     final_profiles = merge_profiles_by_best_connection(all_profiles)
+    if index:
+        final_profiles = index_profiles(final_profiles)
     
     # If no results, use sample data
     if not final_profiles:
@@ -1190,9 +1519,10 @@ def linkedin_search(search_query, max_results=50, selected_state=None, company_s
         final_profiles = create_sample_profiles(search_query)
     
     # Save to profiles.json
-    outpath = os.path.join(data_dir, "profiles.json")
-    with open(outpath, "w") as f:
-        json.dump(final_profiles, f)
+    if persist:
+        outpath = os.path.join(data_dir, "profiles.json")
+        with open(outpath, "w") as f:
+            json.dump(final_profiles, f)
     
     print(f"Final result: {len(final_profiles)} unique profiles")
     return final_profiles
\ No newline at end of file
@@ -0,0 +1,152 @@
+# llm_cache.py - Disk-backed cache of model responses keyed on a hash of the prompt and model settings
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+def normalize_prompt(prompt):
+    """Collapse whitespace so re-indented prompt templates share a key."""
+    return re.sub(r'\s+', ' ', (prompt or '').strip())
+
+def response_key(kind, prompt, settings):
+    params = {
+        'kind': kind,
+        'prompt': normalize_prompt(prompt),
+        'settings': settings,
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+
+class LLMCache:
+    """
+    Stores each model response as data_dir/llm_cache/<key>.json, where the key
+    hashes the kind of call, the rendered prompt (whitespace-normalized) and
+    the model and its parameters. Only inputs that end up in the prompt text
+    change the key; arguments the prompt doesn't use don't. Entries expire
+    after `ttl` seconds (0 keeps them until evicted); beyond `max_entries`
+    files or `max_bytes` in total the least recently used ones are removed.
+    """
+
+    def __init__(self, data_dir, ttl=604800, max_entries=5000, max_bytes=50000000):
+        self.cache_dir = os.path.join(data_dir, 'llm_cache')
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, kind, prompt, settings):
+        """The cached response, or None."""
+        key = response_key(kind, prompt, settings)
+        try:
+            with open(self._path(key), 'r') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            if self.ttl and time.time() - entry['created_at'] > self.ttl:
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+        try:
+            # mtime doubles as the last-access time for LRU eviction
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return entry['response']
+
+    def put(self, kind, prompt, settings, response):
+        key = response_key(kind, prompt, settings)
+        entry = {
+            'kind': kind,
+            'settings': settings,
+            'created_at': time.time(),
+            'response': response,
+        }
+        # A unique temp file per writer: batch workers may store the same prompt at once
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, self._path(key))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            print(f"Error saving cached model response: {e}")
+            return
+        with self._lock:
+            self.stats['stores'] += 1
+        self._evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(self.cache_dir, name)))
+        return entries
+
+    def _evict(self):
+        with self._lock:
+            entries = self._entries()
+            total_bytes = sum(size for _, size, _ in entries)
+            if len(entries) <= self.max_entries and total_bytes <= self.max_bytes:
+                return
+            entries.sort()
+            count = len(entries)
+            for _, size, path in entries:
+                if count <= self.max_entries and total_bytes <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    self.stats['evictions'] += 1
+                except OSError:
+                    pass
+                count -= 1
+                total_bytes -= size
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            entries = self._entries()
+        lookups = stats['hits'] + stats['misses']
+        stats['entries'] = len(entries)
+        stats['size_bytes'] = sum(size for _, size, _ in entries)
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0
+        return stats
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache(data_dir, ttl=604800, max_entries=5000, max_bytes=50000000):
+    """Return the process-wide model response cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache(data_dir, ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+        return _cache
@@ -0,0 +1,88 @@
+# llm_client.py - One pooled OpenAI client per process, reused by every model call
+
+import atexit
+import importlib.util
+import os
+import threading
+
+import httpx
+from openai import OpenAI
+
+def http2_available():
+    """HTTP/2 needs the optional h2 package (pip install httpx[http2])."""
+    return importlib.util.find_spec('h2') is not None
+
+class LLMClientManager:
+    """
+    Holds a single OpenAI client whose httpx.Client keeps connections to the
+    API alive between calls, so only the first call pays DNS and TLS setup.
+    The pool is shared by request threads and batch workers; max_connections
+    caps how many calls are in flight at once. The client is rebuilt only
+    when the API key changes.
+    """
+
+    def __init__(self, max_connections=20, max_keepalive=10, keepalive_expiry=60, connect_timeout=10,
+                 read_timeout=60, http2=True, max_retries=2):
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive,
+                                   keepalive_expiry=keepalive_expiry)
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.http2 = http2 and http2_available()
+        self.max_retries = max_retries
+        self.stats = {'clients_built': 0, 'requests': 0}
+        self._lock = threading.Lock()
+        self._client = None
+        self._api_key = None
+
+    def client(self, api_key):
+        """The shared client for api_key, built on first use."""
+        with self._lock:
+            self.stats['requests'] += 1
+            if self._client is None or api_key != self._api_key:
+                self._close()
+                http_client = httpx.Client(limits=self.limits, timeout=self.timeout, http2=self.http2)
+                self._client = OpenAI(api_key=api_key, http_client=http_client, timeout=self.timeout,
+                                      max_retries=self.max_retries)
+                self._api_key = api_key
+                self.stats['clients_built'] += 1
+            return self._client
+
+    def _close(self):
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception as e:
+                print(f"Error closing OpenAI client: {e}")
+            self._client = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, http2=self.http2, max_connections=self.limits.max_connections,
+                        max_keepalive=self.limits.max_keepalive_connections)
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_llm_client_manager(max_connections=20, max_keepalive=10, keepalive_expiry=60, connect_timeout=10,
+                           read_timeout=60, http2=True, max_retries=2):
+    """Return the process-wide client manager, creating it on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = LLMClientManager(max_connections=max_connections, max_keepalive=max_keepalive,
+                                        keepalive_expiry=keepalive_expiry, connect_timeout=connect_timeout,
+                                        read_timeout=read_timeout, http2=http2, max_retries=max_retries)
+            atexit.register(_manager.close)
+        return _manager
+
+def _reset_after_fork():
+    # Pooled sockets are shared with the parent after fork; forked workers open their own
+    global _manager, _manager_lock
+    _manager = None
+    _manager_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
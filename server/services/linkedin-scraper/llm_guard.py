@@ -0,0 +1,209 @@
+# llm_guard.py - Latency budget, retries, hedging and circuit breaking around blocking model calls
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class CircuitOpenError(Exception):
+    """The model API is being skipped after repeated failures."""
+
+class BudgetExceededError(TimeoutError):
+    """A model call used up its latency budget."""
+
+def is_retryable(error):
+    """Timeouts, connection errors, rate limits and 5xx are worth another try; other 4xx are not."""
+    status = getattr(error, 'status_code', None)
+    return status is None or status in (408, 409, 429) or status >= 500
+
+class LLMCallGuard:
+    """
+    Runs model calls so that none takes longer than `budget` seconds. A call
+    is attempted up to max_attempts times with full-jitter exponential
+    backoff, each attempt getting the remaining budget as its HTTP timeout.
+    With hedging, a second identical request is sent once an attempt has run
+    longer than the hedge_percentile of recent latencies, and whichever
+    answers first wins. After failure_threshold calls in a row failed (each
+    once its retries ran out) the circuit opens and calls fail at once for
+    reset_after seconds; then one probe call decides whether it closes again.
+    Callers treat every error, including CircuitOpenError and
+    BudgetExceededError, as "use the fallback".
+    """
+
+    def __init__(self, budget=20.0, max_attempts=3, backoff=0.5, failure_threshold=5, reset_after=30.0,
+                 hedging=False, hedge_percentile=95, hedge_min_samples=20, max_workers=32):
+        self.budget = budget
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+        self.stats = {'calls': 0, 'successes': 0, 'failures': 0, 'timeouts': 0, 'retries': 0,
+                      'hedges': 0, 'hedge_wins': 0, 'short_circuits': 0, 'circuit_opened': 0}
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=200)
+        self._state = 'closed'
+        self._failures = 0
+        self._opened_at = 0
+        self._probing = False
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _allow(self):
+        with self._lock:
+            if self._state == 'closed':
+                return True
+            if self._state == 'open' and time.monotonic() - self._opened_at >= self.reset_after:
+                self._state = 'half_open'
+            if self._state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def _record(self, ok, latency=None):
+        with self._lock:
+            self._probing = False
+            if ok:
+                self.stats['successes'] += 1
+                self._latencies.append(latency)
+                self._failures = 0
+                if self._state != 'closed':
+                    print("Model API answering again, closing circuit")
+                    self._state = 'closed'
+                return
+            self.stats['failures'] += 1
+            self._failures += 1
+            if self._state == 'half_open' or (self._state == 'closed' and self._failures >= self.failure_threshold):
+                if self._state == 'closed':
+                    print(f"Model API failed {self._failures} times in a row, skipping it for {self.reset_after}s")
+                self._state = 'open'
+                self._opened_at = time.monotonic()
+                self.stats['circuit_opened'] += 1
+
+    def _latency_percentile(self, percentile):
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+    def _hedge_delay(self):
+        with self._lock:
+            if not self.hedging or self._state != 'closed' or len(self._latencies) < self.hedge_min_samples:
+                return None
+        return self._latency_percentile(self.hedge_percentile)
+
+    def _attempt(self, fn, deadline, budget, hedge):
+        """One attempt, possibly hedged. Returns (result, latency)."""
+        started = time.monotonic()
+        hedge_delay = self._hedge_delay() if hedge else None
+        pending = {self.executor.submit(fn, deadline - started)}
+        hedge_future = None
+        hedged = hedge_delay is None
+        error = None
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                raise BudgetExceededError(f"Model call exceeded its {budget:.1f}s budget")
+            wait_until = deadline if hedged else min(deadline, started + hedge_delay)
+            done, pending = wait(pending, timeout=max(0, wait_until - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge_future:
+                        self._count('hedge_wins')
+                    return future.result(), time.monotonic() - started
+                error = future.exception()
+            now = time.monotonic()
+            if not hedged and pending and now >= started + hedge_delay and now < deadline:
+                hedged = True
+                hedge_future = self.executor.submit(fn, deadline - now)
+                pending.add(hedge_future)
+                self._count('hedges')
+        raise error
+
+    def _run(self, fn, deadline, budget, hedge):
+        """Attempts with backoff until one succeeds. Returns (result, latency)."""
+        last_error = None
+        for attempt in range(self.max_attempts):
+            try:
+                return self._attempt(fn, deadline, budget, hedge)
+            except BudgetExceededError:
+                self._count('timeouts')
+                raise
+            except Exception as e:
+                last_error = e
+                if not is_retryable(e):
+                    raise
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+            if attempt + 1 >= self.max_attempts or time.monotonic() + delay >= deadline:
+                break
+            self._count('retries')
+            time.sleep(delay)
+        raise last_error
+
+    def call(self, fn, budget=None, hedge=True):
+        """
+        Run fn(timeout), where timeout is the seconds left in the budget, and
+        return its result. Raises CircuitOpenError, BudgetExceededError or the
+        last error once the attempts or the budget are used up. hedge=False
+        for calls whose result must not be duplicated, like streams. The
+        circuit sees one success or failure per call, not per attempt.
+        """
+        budget = budget or self.budget
+        deadline = time.monotonic() + budget
+        self._count('calls')
+        if not self._allow():
+            self._count('short_circuits')
+            raise CircuitOpenError("Model API circuit is open after repeated failures")
+        try:
+            result, latency = self._run(fn, deadline, budget, hedge)
+        except Exception:
+            self._record(False)
+            raise
+        self._record(True, latency)
+        return result
+
+    def remaining(self, started, budget=None):
+        """Seconds left of the budget for a call that started at `started` (time.monotonic())."""
+        return (budget or self.budget) - (time.monotonic() - started)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats, circuit=self._state, budget=self.budget, hedging=self.hedging)
+        for percentile in (50, 95, 99):
+            latency = self._latency_percentile(percentile)
+            stats[f'p{percentile}_seconds'] = round(latency, 3) if latency is not None else None
+        return stats
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+_guard = None
+_guard_lock = threading.Lock()
+
+def get_llm_guard(budget=20.0, max_attempts=3, backoff=0.5, failure_threshold=5, reset_after=30.0,
+                  hedging=False, hedge_percentile=95):
+    """Return the process-wide model call guard, creating it on first use."""
+    global _guard
+    with _guard_lock:
+        if _guard is None:
+            _guard = LLMCallGuard(budget=budget, max_attempts=max_attempts, backoff=backoff,
+                                  failure_threshold=failure_threshold, reset_after=reset_after,
+                                  hedging=hedging, hedge_percentile=hedge_percentile)
+        return _guard
+
+def _reset_after_fork():
+    # Executor threads and the circuit state stay with the parent; forked workers start fresh
+    global _guard, _guard_lock
+    _guard = None
+    _guard_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -3,6 +3,8 @@ import json
 import os
 from flask import current_app
 
+from contacted_screen import notify_tracked
+
 class MessageStatus:
     PENDING = 'pending'
     SENT = 'sent'
@@ -78,6 +80,7 @@ class MessageTracker:
         data['messages'].append(message_entry)
         self._update_stats(data, new_status=MessageStatus.PENDING)
         self._save_tracking_data(data)
+        notify_tracked(self.data_dir, profile_id, profile_data)
         
         return message_entry
 
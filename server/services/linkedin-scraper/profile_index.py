@@ -0,0 +1,232 @@
+# profile_index.py - Persistent identity index so the same lead is recognized across searches
+
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+import urllib.parse
+
+# Lower is better: 1st outranks 2nd outranks 3rd+
+CONNECTION_RANK = {"1st": 1, "2nd": 2, "3rd": 3, "3rd+": 3}
+
+# Company suffixes that vary between cards for the same employer
+COMPANY_SUFFIXES = {'inc', 'llc', 'ltd', 'limited', 'corp', 'corporation', 'co', 'company', 'gmbh', 'plc', 'group'}
+
+# Rewrite the log once it holds this many times more lines than live entries
+COMPACT_RATIO = 2
+
+def connection_rank(level):
+    return CONNECTION_RANK.get(level, 3)
+
+def canonical_profile_url(url):
+    """
+    'in/<slug>' for public profiles and 'lead/<id>' for Sales Navigator leads,
+    ignoring host, query string, trailing slash and the auth suffix Sales Navigator
+    appends after a comma. None for placeholder or non-profile URLs.
+    """
+    if not url:
+        return None
+    parsed = urllib.parse.urlparse(url if '//' in url else f"https://www.linkedin.com{url}")
+    if 'linkedin.com' not in parsed.netloc.lower():
+        return None
+    parts = [urllib.parse.unquote(p) for p in parsed.path.split('/') if p]
+    if len(parts) >= 2 and parts[0].lower() == 'in':
+        return f"in/{parts[1].lower()}"
+    if len(parts) >= 3 and parts[0].lower() == 'sales' and parts[1].lower() in ('lead', 'people'):
+        lead_id = parts[2].split(',')[0]
+        return f"lead/{lead_id}" if lead_id else None
+    return None
+
+def _fold(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r'[^a-z0-9 ]+', ' ', text.lower())
+
+def normalize_name(name):
+    """'José Pérez, MBA (he/him)' -> 'jose perez'."""
+    name = re.sub(r'\(.*?\)', ' ', (name or '').split(',')[0])
+    return ' '.join(_fold(name).split())
+
+def normalize_company(company):
+    words = _fold(company).split()
+    while words and words[-1] in COMPANY_SUFFIXES:
+        words.pop()
+    return ' '.join(words)
+
+def headline_company(headline):
+    """'VP Sales at Acme Inc | Speaker' -> 'Acme Inc'; None when the headline names no employer."""
+    match = re.search(r'\s(?:at|@)\s+(.+)$', headline or '', re.IGNORECASE)
+    if not match:
+        return None
+    return re.split(r'\s*[|·,]\s*|\s+-\s+', match.group(1))[0].strip() or None
+
+def profile_company(profile):
+    """
+    The profile's employer: the search API capture sets 'company', DOM and bulk
+    cards only carry it inside a 'Title at Company' headline.
+    """
+    return profile.get('company') or headline_company(profile.get('headline'))
+
+def identity_keys(profile):
+    """Keys that identify a profile: its canonical URL and, when the company is known, name+company."""
+    keys = []
+    url = canonical_profile_url(profile.get('profile_url'))
+    if url:
+        keys.append(f"url:{url}")
+    name = normalize_name(profile.get('name'))
+    company = normalize_company(profile_company(profile))
+    if name and company:
+        keys.append(f"name:{name}|{company}")
+    return keys
+
+class ProfileIndex:
+    """
+    Every profile a search has returned, in data_dir/profile_index.jsonl. Each
+    line is the latest snapshot of one identity (its keys, best connection
+    level, first/last seen and how often). The whole index is held in two dicts
+    (key -> identity id, id -> entry), so checking a profile is O(1); lines
+    appended by other worker processes are read in before each batch.
+    """
+
+    def __init__(self, data_dir):
+        self.path = os.path.join(data_dir, 'profile_index.jsonl')
+        self.stats = {'recorded': 0, 'new': 0, 'seen': 0, 'skipped': 0}
+        self._lock = threading.Lock()
+        self._reset()
+        with self._lock:
+            self._catch_up()
+            if self._lines > COMPACT_RATIO * len(self._entries) + 1000:
+                self._compact()
+
+    def _reset(self):
+        self._keys = {}
+        self._entries = {}
+        self._offset = 0
+        self._inode = None
+        self._lines = 0
+
+    def _apply(self, entry):
+        self._entries[entry['id']] = entry
+        for key in entry['keys']:
+            self._keys[key] = entry['id']
+
+    def _catch_up(self):
+        """Read lines appended since the last call; reload everything if the file was compacted."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._reset()
+            self._inode = stat.st_ino
+        if stat.st_size == self._offset:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # Another process is mid-append; pick the line up next time
+                    break
+                self._offset += len(line)
+                try:
+                    self._apply(json.loads(line))
+                    self._lines += 1
+                except (json.JSONDecodeError, KeyError):
+                    continue
+
+    def _append(self, entries):
+        if not entries:
+            return
+        data = ''.join(json.dumps(entry) + '\n' for entry in entries)
+        with open(self.path, 'a') as f:
+            f.write(data)
+
+    def _compact(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for entry in self._entries.values():
+                f.write(json.dumps(entry) + '\n')
+        os.replace(tmp_path, self.path)
+        print(f"Compacted profile index to {len(self._entries)} identities")
+        self._reset()
+        self._catch_up()
+
+    def lookup(self, profile):
+        """The index entry for a profile, or None if it has never been seen."""
+        with self._lock:
+            self._catch_up()
+            for key in identity_keys(profile):
+                if key in self._keys:
+                    return dict(self._entries[self._keys[key]])
+        return None
+
+    def record(self, profiles, skip_seen=False):
+        """
+        Add profiles to the index and mark each with previously_seen. A profile
+        seen before takes the best connection level ever recorded for it. With
+        skip_seen, previously seen profiles are left out of the returned list.
+        Profiles without a usable URL or name+company pass through unrecorded.
+        """
+        now = time.time()
+        kept = []
+        changed = {}
+        with self._lock:
+            self._catch_up()
+            for profile in profiles:
+                keys = identity_keys(profile)
+                if not keys:
+                    kept.append(profile)
+                    continue
+                entry_id = next((self._keys[key] for key in keys if key in self._keys), None)
+                level = profile.get('connection_level')
+                if entry_id is None:
+                    entry = {'id': keys[0], 'keys': keys, 'connection_level': level,
+                             'first_seen': now, 'last_seen': now, 'seen_count': 1}
+                    profile['previously_seen'] = False
+                    self.stats['new'] += 1
+                else:
+                    entry = self._entries[entry_id]
+                    entry['keys'].extend(key for key in keys if key not in entry['keys'])
+                    if connection_rank(level) < connection_rank(entry['connection_level']):
+                        entry['connection_level'] = level
+                    elif entry['connection_level']:
+                        profile['connection_level'] = entry['connection_level']
+                    entry['last_seen'] = now
+                    entry['seen_count'] += 1
+                    profile['previously_seen'] = True
+                    self.stats['seen'] += 1
+                self._apply(entry)
+                changed[entry['id']] = entry
+                if skip_seen and profile['previously_seen']:
+                    self.stats['skipped'] += 1
+                else:
+                    kept.append(profile)
+            self.stats['recorded'] += len(changed)
+            self._append(list(changed.values()))
+        return kept
+
+    def clear(self):
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self._reset()
+
+    def get_stats(self):
+        with self._lock:
+            self._catch_up()
+            return dict(self.stats, identities=len(self._entries), keys=len(self._keys))
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_profile_index(data_dir):
+    """Return the process-wide profile index, loading it on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ProfileIndex(data_dir)
+        return _index
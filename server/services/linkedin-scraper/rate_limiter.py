@@ -0,0 +1,238 @@
+# rate_limiter.py - Token-bucket scheduler that paces every navigation and UI action sent to LinkedIn
+
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextvars import ContextVar
+from flask import current_app, has_request_context
+
+# Lower number wins: searches a user is waiting on go before jobs and cache refreshes
+LANES = {
+    'interactive': 0,
+    'background': 1,
+}
+
+# LinkedIn account the current search (thread or asyncio task) is using
+current_account = ContextVar('linkedin_account', default='default')
+
+# Full page loads cost more of the budget than clicks inside an already loaded page
+ACTION_COSTS = {
+    'navigation': 1.0,
+    'pagination': 1.0,
+    'search': 1.0,
+    'filter': 0.5,
+    'login': 1.0,
+}
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, cost, now):
+        """Seconds until `cost` tokens are available (0 when they already are)."""
+        self._refill(now)
+        if self.tokens >= cost:
+            return 0
+        return (cost - self.tokens) / self.rate
+
+    def take(self, cost):
+        self.tokens -= cost
+
+class NavigationScheduler:
+    """
+    Every LinkedIn action takes tokens from the global bucket and from its
+    account's bucket. Each account has its own queue served by (lane,
+    arrival); only the head of each queue whose account has tokens competes
+    for the global bucket, again by (lane, arrival). So an interactive search
+    never queues behind background work, and a search waiting on one
+    account's budget doesn't hold up the other accounts. A random jitter
+    after each grant keeps the request pattern from looking machine-timed.
+    Works from plain threads (acquire) and from the browser pool's event loop
+    (acquire_async), which waits on an asyncio event instead of a thread.
+    """
+
+    def __init__(self, global_per_min=60, global_burst=10, account_per_min=30, account_burst=6, jitter=0.5):
+        self.global_bucket = TokenBucket(global_per_min / 60.0, global_burst)
+        self.account_rate = account_per_min / 60.0
+        self.account_burst = account_burst
+        self.jitter = jitter
+        self.account_buckets = {}
+        self.stats = {lane: {'granted': 0, 'waited': 0.0} for lane in LANES}
+        self._lock = threading.Lock()
+        # account -> heap of (lane, seq, cost) tickets
+        self._waiting = {}
+        # seq -> callable that wakes the waiter holding that ticket
+        self._wakers = {}
+        self._seq = itertools.count()
+
+    def _account_bucket(self, account):
+        if account not in self.account_buckets:
+            self.account_buckets[account] = TokenBucket(self.account_rate, self.account_burst)
+        return self.account_buckets[account]
+
+    def _enqueue(self, kind, account, lane, wake):
+        ticket = (LANES.get(lane, 0), next(self._seq), ACTION_COSTS.get(kind, 1.0))
+        with self._lock:
+            heapq.heappush(self._waiting.setdefault(account, []), ticket)
+            self._wakers[ticket[1]] = wake
+        return ticket
+
+    def _wake_all(self):
+        for wake in list(self._wakers.values()):
+            wake()
+
+    def _dequeue(self, account, ticket):
+        queue = self._waiting[account]
+        if queue[0] == ticket:
+            heapq.heappop(queue)
+        else:
+            queue.remove(ticket)
+            heapq.heapify(queue)
+        if not queue:
+            del self._waiting[account]
+        del self._wakers[ticket[1]]
+        self._wake_all()
+
+    def _poll(self, account, ticket):
+        """
+        Take the tokens for ticket if it is its turn, returning 0. Otherwise
+        return the seconds until it may be, or None to sleep until woken.
+        """
+        with self._lock:
+            if self._waiting[account][0] != ticket:
+                return None
+            now = time.monotonic()
+            cost = ticket[2]
+            account_bucket = self._account_bucket(account)
+            wait = account_bucket.delay(cost, now)
+            if wait > 0:
+                return wait
+            for other, queue in self._waiting.items():
+                head = queue[0]
+                if other != account and head < ticket and self._account_bucket(other).delay(head[2], now) <= 0:
+                    return None
+            wait = self.global_bucket.delay(cost, now)
+            if wait > 0:
+                return wait
+            self.global_bucket.take(cost)
+            account_bucket.take(cost)
+            self._dequeue(account, ticket)
+            return 0
+
+    def _abandon(self, account, ticket):
+        with self._lock:
+            if ticket[1] in self._wakers:
+                self._dequeue(account, ticket)
+
+    def _record(self, lane, waited):
+        with self._lock:
+            lane_stats = self.stats.setdefault(lane, {'granted': 0, 'waited': 0.0})
+            lane_stats['granted'] += 1
+            lane_stats['waited'] += waited
+
+    def acquire(self, kind='navigation', account='default', lane='interactive'):
+        """Block until the action is allowed. Returns the seconds spent waiting."""
+        start = time.monotonic()
+        event = threading.Event()
+        ticket = self._enqueue(kind, account, lane, event.set)
+        try:
+            while True:
+                event.clear()
+                wait = self._poll(account, ticket)
+                if wait == 0:
+                    break
+                event.wait(wait)
+        except BaseException:
+            self._abandon(account, ticket)
+            raise
+
+        if self.jitter:
+            time.sleep(random.uniform(0, self.jitter))
+        waited = time.monotonic() - start
+        self._record(lane, waited)
+        return waited
+
+    async def acquire_async(self, kind='navigation', account='default', lane='interactive'):
+        """acquire() for coroutines: waits on the event loop, so no thread is parked per waiter."""
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        event = asyncio.Event()
+
+        def wake():
+            # Grants can happen on other threads (sync scrapers, another loop)
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass
+
+        ticket = self._enqueue(kind, account, lane, wake)
+        try:
+            while True:
+                event.clear()
+                wait = self._poll(account, ticket)
+                if wait == 0:
+                    break
+                try:
+                    await asyncio.wait_for(event.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._abandon(account, ticket)
+            raise
+
+        if self.jitter:
+            await asyncio.sleep(random.uniform(0, self.jitter))
+        waited = time.monotonic() - start
+        self._record(lane, waited)
+        return waited
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'lanes': {lane: dict(s) for lane, s in self.stats.items()},
+                'waiting': sum(len(queue) for queue in self._waiting.values()),
+                'global_tokens': round(self.global_bucket.tokens, 2),
+                'accounts': {name: round(b.tokens, 2) for name, b in self.account_buckets.items()}
+            }
+
+def current_lane():
+    """Searches running inside an HTTP request are interactive; jobs and refresh threads are background."""
+    return 'interactive' if has_request_context() else 'background'
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """Return the process-wide scheduler built from the app config, or None when rate limiting is off."""
+    global _scheduler
+    config = current_app.config
+    if not config.get('RATE_LIMIT', True):
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = NavigationScheduler(
+                global_per_min=config.get('RATE_LIMIT_GLOBAL_PER_MIN', 60),
+                global_burst=config.get('RATE_LIMIT_GLOBAL_BURST', 10),
+                account_per_min=config.get('RATE_LIMIT_ACCOUNT_PER_MIN', 30),
+                account_burst=config.get('RATE_LIMIT_ACCOUNT_BURST', 6),
+                jitter=config.get('RATE_LIMIT_JITTER', 0.5)
+            )
+        return _scheduler
+
+def pace(kind='navigation', account=None, lane=None):
+    """Wait for the scheduler before a LinkedIn action from Flask-side (sync) code."""
+    scheduler = get_scheduler()
+    if scheduler:
+        scheduler.acquire(kind, account or current_account.get(), lane or current_lane())
@@ -0,0 +1,102 @@
+# resource_blocking.py - Abort requests the scraper never uses (images, media, fonts, trackers)
+
+# Third-party and LinkedIn tracking endpoints that never affect the result list
+ANALYTICS_DOMAINS = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'doubleclick.net',
+    'bat.bing.com',
+    'connect.facebook.net',
+    'px.ads.linkedin.com',
+    'snap.licdn.com/li.lms-analytics',
+    'linkedin.com/li/track',
+    'linkedin.com/sensorCollect',
+    'demdex.net',
+    'adsrvr.org',
+    'hotjar.com',
+)
+
+# One profile per search mode. allow_patterns always win, so e.g. login
+# challenges keep their images.
+BLOCKING_PROFILES = {
+    'sales_nav': {
+        'block_types': ['image', 'media', 'font'],
+        'block_domains': ANALYTICS_DOMAINS,
+        'allow_patterns': [],
+    },
+    'regular': {
+        'block_types': ['image', 'media', 'font'],
+        'block_domains': ANALYTICS_DOMAINS,
+        'allow_patterns': [],
+    },
+    'login': {
+        'block_types': ['media', 'font'],
+        'block_domains': ANALYTICS_DOMAINS,
+        'allow_patterns': ['/checkpoint/', 'captcha', 'arkoselabs', 'challenge'],
+    },
+}
+
+def mode_for_url(page_url):
+    """Pick the blocking profile from the URL of the page issuing the request."""
+    url = (page_url or '').lower()
+    if any(x in url for x in ('/login', '/checkpoint', '/uas/', 'authwall')):
+        return 'login'
+    if '/sales/' in url:
+        return 'sales_nav'
+    return 'regular'
+
+class ResourcePolicy:
+    """Decides per request whether to abort it, and counts what it blocked."""
+
+    def __init__(self, profiles=None):
+        self.profiles = profiles or BLOCKING_PROFILES
+        self.blocked = 0
+        self.allowed = 0
+
+    def should_block(self, url, resource_type, page_url=None):
+        profile = self.profiles.get(mode_for_url(page_url))
+        if not profile:
+            return False
+        if any(pattern in url for pattern in profile.get('allow_patterns', [])):
+            return False
+        if resource_type in profile.get('block_types', []):
+            return True
+        return any(domain in url for domain in profile.get('block_domains', []))
+
+    def _decide(self, request):
+        try:
+            page_url = request.frame.url
+        except Exception:
+            page_url = None
+        block = self.should_block(request.url, request.resource_type, page_url)
+        if block:
+            self.blocked += 1
+        else:
+            self.allowed += 1
+        return block
+
+    def handle_route(self, route):
+        """Route handler for the sync API."""
+        if self._decide(route.request):
+            route.abort()
+        else:
+            route.continue_()
+
+    async def handle_route_async(self, route):
+        """Route handler for the async API."""
+        if self._decide(route.request):
+            await route.abort()
+        else:
+            await route.continue_()
+
+def apply_resource_blocking(context, profiles=None):
+    """Install the routing policy on a sync browser context."""
+    policy = ResourcePolicy(profiles)
+    context.route("**/*", policy.handle_route)
+    return policy
+
+async def apply_resource_blocking_async(context, profiles=None):
+    """Install the routing policy on an async browser context."""
+    policy = ResourcePolicy(profiles)
+    await context.route("**/*", policy.handle_route_async)
+    return policy
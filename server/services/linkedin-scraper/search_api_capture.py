@@ -0,0 +1,107 @@
+# search_api_capture.py - Collect Sales Navigator search API responses and map them to profile dicts
+
+import re
+from card_extraction import placeholder_image
+
+# XHR endpoints Sales Navigator uses to fill the lead result list
+SEARCH_API_PATTERNS = (
+    '/sales-api/salesApiLeadSearch',
+    '/sales-api/salesApiPeopleSearch',
+)
+
+DEGREE_LEVELS = {1: "1st", 2: "2nd", 3: "3rd+"}
+
+def is_search_api_url(url, patterns=SEARCH_API_PATTERNS):
+    return any(pattern in url for pattern in patterns)
+
+def lead_id_from_urn(urn):
+    """urn:li:fs_salesProfile:(ACwAAA...,NAME_SEARCH,abcd) -> ACwAAA..."""
+    if not urn:
+        return None
+    match = re.search(r'\(([^,)]+)', urn)
+    return match.group(1) if match else None
+
+def _profile_image(element):
+    picture = element.get('profilePictureDisplayImage') or {}
+    root = picture.get('rootUrl')
+    artifacts = picture.get('artifacts') or []
+    if root and artifacts:
+        largest = max(artifacts, key=lambda a: a.get('width', 0))
+        segment = largest.get('fileIdentifyingUrlPathSegment')
+        if segment:
+            return root + segment
+    return None
+
+def profile_from_search_element(element, index=0):
+    """Map one element of a lead search payload to our profile dict schema."""
+    name = element.get('fullName') or " ".join(
+        part for part in (element.get('firstName'), element.get('lastName')) if part
+    )
+    positions = element.get('currentPositions') or []
+    position = positions[0] if positions else {}
+    lead_id = lead_id_from_urn(element.get('entityUrn') or element.get('objectUrn'))
+
+    return {
+        "name": name or f"Profile #{index + 1}",
+        "headline": position.get('title') or element.get('headline') or "Sales Professional",
+        "company": position.get('companyName', ''),
+        "location": element.get('geoRegion') or element.get('location') or "United States",
+        "connection_level": DEGREE_LEVELS.get(element.get('degree'), "2nd"),
+        "profile_url": f"https://www.linkedin.com/sales/lead/{lead_id}" if lead_id else "https://www.linkedin.com/sales/",
+        "profile_image": _profile_image(element) or placeholder_image(index),
+        "mutual_connections": [],
+        "tnl_connection": False
+    }
+
+def profiles_from_search_payload(payload, max_results=50):
+    elements = payload.get('elements') or []
+    return [profile_from_search_element(element, i) for i, element in enumerate(elements[:max_results])]
+
+class SearchResponseCollector:
+    """
+    Listens to page responses and keeps the search API ones. A results page is
+    backed by one search call, so drain() maps the most recent response and
+    clears the buffer; earlier responses (e.g. before a filter was applied)
+    are dropped.
+    """
+
+    def __init__(self, patterns=SEARCH_API_PATTERNS):
+        self.patterns = patterns
+        self.responses = []
+
+    def _on_response(self, response):
+        if response.status == 200 and is_search_api_url(response.url, self.patterns):
+            self.responses.append(response)
+
+    def attach(self, page):
+        page.on("response", self._on_response)
+        return self
+
+    def detach(self, page):
+        try:
+            page.remove_listener("response", self._on_response)
+        except Exception:
+            pass
+
+    def clear(self):
+        self.responses = []
+
+    def drain(self, max_results=50):
+        """Sync API: return profiles from the latest captured search payload, or []."""
+        responses, self.responses = self.responses, []
+        for response in reversed(responses):
+            try:
+                return profiles_from_search_payload(response.json(), max_results)
+            except Exception as e:
+                print(f"Could not read search API response: {e}")
+        return []
+
+    async def drain_async(self, max_results=50):
+        """Async API counterpart of drain()."""
+        responses, self.responses = self.responses, []
+        for response in reversed(responses):
+            try:
+                return profiles_from_search_payload(await response.json(), max_results)
+            except Exception as e:
+                print(f"Could not read search API response: {e}")
+        return []
@@ -0,0 +1,183 @@
+# search_cache.py - Disk-backed cache of search results keyed on normalized query parameters
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+def normalize_query(search_query):
+    """Lowercase, collapse whitespace and sort OR terms so near-repeats share a key."""
+    query = re.sub(r'\s+', ' ', (search_query or '').strip().lower())
+    terms = [term.strip() for term in re.split(r'\s+or\s+', query) if term.strip()]
+    return " or ".join(sorted(set(terms)))
+
+def normalize_filter(value):
+    value = re.sub(r'\s+', ' ', (value or '').strip().lower())
+    return '' if value in ('all locations', 'any', 'all') else value
+
+def cache_key(search_query, selected_state=None, company_size=None):
+    params = {
+        'query': normalize_query(search_query),
+        'state': normalize_filter(selected_state),
+        'company_size': normalize_filter(company_size),
+    }
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+    return digest, params
+
+class SearchCache:
+    """
+    Stores each search result as data_dir/search_cache/<key>.json.
+    Entries are fresh for `ttl` seconds; for a further `stale_ttl` seconds
+    they are still served while a background refresh runs. When more than
+    `max_entries` files exist the least recently used ones are removed.
+    """
+
+    def __init__(self, data_dir, ttl=3600, stale_ttl=0, max_entries=200):
+        self.cache_dir = os.path.join(data_dir, 'search_cache')
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'refreshes': 0}
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read(self, key):
+        try:
+            with open(self._path(key), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def lookup(self, search_query, max_results, selected_state=None, company_size=None):
+        """
+        Return (profiles, state) where state is 'fresh', 'stale' or 'miss'.
+        An entry answers any request for at most as many results as it was built
+        for, or for more when that search already came back short.
+        """
+        key, _ = cache_key(search_query, selected_state, company_size)
+        entry = self._read(key)
+        usable = entry is not None and (
+            entry['max_results'] >= max_results or len(entry['profiles']) < entry['max_results']
+        )
+        age = time.time() - entry['created_at'] if usable else None
+
+        with self._lock:
+            if usable and age <= self.ttl:
+                self.stats['hits'] += 1
+                state = 'fresh'
+            elif usable and age <= self.ttl + self.stale_ttl:
+                self.stats['stale_hits'] += 1
+                state = 'stale'
+            else:
+                self.stats['misses'] += 1
+                return None, 'miss'
+
+        try:
+            # mtime doubles as the last-access time for LRU eviction
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return entry['profiles'][:max_results], state
+
+    def store(self, search_query, max_results, selected_state, company_size, profiles):
+        key, params = cache_key(search_query, selected_state, company_size)
+        entry = {
+            'params': params,
+            'max_results': max_results,
+            'created_at': time.time(),
+            'profiles': profiles,
+        }
+        # A unique temp file per writer: a background refresh and a live search may store the same key
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, self._path(key))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            print(f"Error saving cached search: {e}")
+            return
+        with self._lock:
+            self.stats['stores'] += 1
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith('.json')]
+            if len(files) <= self.max_entries:
+                return
+            files.sort(key=os.path.getmtime)
+            for path in files[:len(files) - self.max_entries]:
+                try:
+                    os.remove(path)
+                    self.stats['evictions'] += 1
+                except OSError:
+                    pass
+
+    def refresh_in_background(self, app, search_fn, search_query, max_results, selected_state, company_size):
+        """
+        Re-run a stale search on a daemon thread; at most one refresh per key
+        at a time. search_fn returns None for results that must not be cached.
+        """
+        key, _ = cache_key(search_query, selected_state, company_size)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self.stats['refreshes'] += 1
+        # Rebuild the entry at its original size so larger requests keep hitting it
+        entry = self._read(key)
+        if entry:
+            max_results = max(max_results, entry['max_results'])
+
+        def refresh():
+            try:
+                with app.app_context():
+                    profiles = search_fn(search_query, max_results, selected_state, company_size)
+                if profiles:
+                    self.store(search_query, max_results, selected_state, company_size, profiles)
+            except Exception as e:
+                print(f"Error refreshing cached search: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name="search-cache-refresh", daemon=True).start()
+
+    def clear(self):
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.json'):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        pass
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['entries'] = len([name for name in os.listdir(self.cache_dir) if name.endswith('.json')])
+        stats['hit_rate'] = (stats['hits'] + stats['stale_hits']) / lookups if lookups else 0
+        return stats
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_search_cache(data_dir, ttl=3600, stale_ttl=0, max_entries=200):
+    """Return the process-wide search cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SearchCache(data_dir, ttl=ttl, stale_ttl=stale_ttl, max_entries=max_entries)
+        return _cache
@@ -0,0 +1,78 @@
+# search_checkpoint.py - Per-page checkpoints so an interrupted search resumes where it stopped
+
+import json
+import os
+import tempfile
+import time
+
+from search_cache import cache_key
+
+class SearchCheckpoint:
+    """
+    Progress of one search in data_dir/checkpoints/<engine>-<key>.json: the phase
+    ('sales_nav' or 'regular'), the last completed page, the result URLs needed
+    to continue and the profiles collected so far. The key is the same
+    normalized query/filter key the search cache uses, so a retry of the same
+    search finds it. complete() removes the file once the search finished.
+    """
+
+    def __init__(self, data_dir, engine, search_query, selected_state=None, company_size=None, max_age=86400):
+        self.checkpoint_dir = os.path.join(data_dir, 'checkpoints')
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        key, self.params = cache_key(search_query, selected_state, company_size)
+        self.path = os.path.join(self.checkpoint_dir, f"{engine}-{key}.json")
+        self.max_age = max_age
+
+    def load(self):
+        """Return the saved checkpoint, or None when there is none or it is too old to trust."""
+        try:
+            with open(self.path, 'r') as f:
+                checkpoint = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if time.time() - checkpoint.get('updated_at', 0) > self.max_age:
+            print("Discarding expired search checkpoint")
+            self.complete()
+            return None
+
+        print(f"Resuming {checkpoint['phase']} search after page {checkpoint['page_num']} "
+              f"with {len(checkpoint['profiles'])} profiles")
+        return checkpoint
+
+    def save(self, phase, page_num, urls, profiles):
+        checkpoint = {
+            'params': self.params,
+            'phase': phase,
+            'page_num': page_num,
+            'urls': urls,
+            'profiles': profiles,
+            'updated_at': time.time(),
+        }
+        # Write then rename so a crash mid-write never leaves a truncated checkpoint; a unique
+        # temp file per writer so a retry racing the original search can't interleave with it
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.checkpoint_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(checkpoint, f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except Exception as e:
+            print(f"Error saving search checkpoint: {e}")
+
+    def complete(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error removing search checkpoint: {e}")
+
+def has_pending_checkpoint(data_dir, search_query, selected_state=None, company_size=None):
+    """True while either engine holds a checkpoint for this search, i.e. it has not finished yet."""
+    key, _ = cache_key(search_query, selected_state, company_size)
+    return any(os.path.exists(os.path.join(data_dir, 'checkpoints', f"{engine}-{key}.json"))
+               for engine in ('async', 'sync'))
@@ -0,0 +1,119 @@
+# search_filters.py - Encode geography and company size filters straight into the Sales Navigator search URL
+
+import json
+import os
+import re
+import threading
+import urllib.parse
+
+from search_cache import normalize_filter
+
+SALES_NAV_SEARCH_URL = "https://www.linkedin.com/sales/search/people"
+
+# Sales Navigator's COMPANY_HEADCOUNT filter ids for the sizes the search form offers
+COMPANY_HEADCOUNT_IDS = {
+    'self-employed': ('A', 'Self-employed'),
+    '1-10': ('B', '1-10'),
+    '11-50': ('C', '11-50'),
+    '51-200': ('D', '51-200'),
+    '201-500': ('E', '201-500'),
+    '501-1000': ('F', '501-1000'),
+}
+
+# REGION filter as it appears in a results URL after the geography dropdown was used
+REGION_PATTERN = re.compile(r'type:REGION,values:List\(\(id:(\d+)')
+
+def restli_escape(text):
+    """Escape a value for Sales Navigator's Rest.li query syntax, where ( ) , : and ' are structural."""
+    return urllib.parse.quote(text, safe='')
+
+def _filter(filter_type, value_id, text):
+    return (f"(type:{filter_type},values:List((id:{value_id},text:{restli_escape(text)},"
+            f"selectionType:INCLUDED)))")
+
+class FilterEncoder:
+    """
+    Builds a filtered Sales Navigator results URL from the keywords, selected
+    state and company size, so a filtered search is one navigation instead of
+    several dropdown clicks. Company headcount ids are fixed. Region ids are
+    LinkedIn geo ids that we learn from the URL the dropdown flow produces, and
+    they are kept in data_dir/search_filters.json. build_url() returns None
+    when a requested filter can't be encoded yet; the caller then applies it
+    through the UI and calls learn_region() with the resulting URL.
+    """
+
+    def __init__(self, data_dir):
+        self.path = os.path.join(data_dir, 'search_filters.json')
+        self.stats = {'encoded': 0, 'unencodable': 0, 'learned': 0}
+        self._lock = threading.Lock()
+        self.regions = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f).get('regions', {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'regions': self.regions}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def region_id(self, selected_state):
+        with self._lock:
+            return self.regions.get(normalize_filter(selected_state))
+
+    def learn_region(self, selected_state, results_url):
+        """Remember the region id the geography dropdown put into results_url. Returns the id or None."""
+        state = normalize_filter(selected_state)
+        query = urllib.parse.unquote(urllib.parse.urlsplit(results_url).query)
+        match = REGION_PATTERN.search(query)
+        if not state or not match:
+            return None
+        region = match.group(1)
+        with self._lock:
+            if self.regions.get(state) != region:
+                self.regions[state] = region
+                self.stats['learned'] += 1
+                try:
+                    self._save()
+                except OSError as e:
+                    print(f"Error saving search filter ids: {e}")
+                print(f"Learned Sales Navigator region id {region} for {selected_state}")
+        return region
+
+    def build_url(self, search_query, selected_state=None, company_size=None):
+        """The filtered results URL, or None when the state or company size has no known id."""
+        filters = []
+        if normalize_filter(selected_state):
+            region = self.region_id(selected_state)
+            if not region:
+                self.stats['unencodable'] += 1
+                return None
+            filters.append(_filter('REGION', region, selected_state))
+        if normalize_filter(company_size):
+            headcount = COMPANY_HEADCOUNT_IDS.get(normalize_filter(company_size))
+            if not headcount:
+                self.stats['unencodable'] += 1
+                return None
+            filters.append(_filter('COMPANY_HEADCOUNT', *headcount))
+
+        query = f"(spellCorrectionEnabled:true,keywords:{restli_escape(search_query)}"
+        if filters:
+            query += f",filters:List({','.join(filters)})"
+        query += ")"
+        self.stats['encoded'] += 1
+        return f"{SALES_NAV_SEARCH_URL}?query={urllib.parse.quote(query, safe='(),:')}"
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+def get_filter_encoder(data_dir):
+    """Return the process-wide filter encoder, creating it on first use."""
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            _encoder = FilterEncoder(data_dir)
+        return _encoder
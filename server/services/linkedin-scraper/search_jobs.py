@@ -0,0 +1,267 @@
+# search_jobs.py - Background search jobs so scrapes run outside the HTTP request
+
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+class JobStatus:
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+FINISHED_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+def _process_alive(pid):
+    if not pid or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class SearchJobQueue:
+    """
+    Runs searches on a bounded thread pool. Each job is persisted as
+    data_dir/jobs/<job_id>.json, so status and results survive restarts and
+    can be read by any worker process. Cancellation is cooperative: the
+    search checks the flag after every results page. Listeners registered in
+    this process receive 'status', 'page' and 'done' events as they happen.
+    Only queued and running jobs are kept in memory; finished ones, results
+    included, are read back from disk.
+    """
+
+    def __init__(self, app, data_dir, max_workers=2):
+        self.app = app
+        self.jobs_dir = os.path.join(data_dir, 'jobs')
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="search-job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._futures = {}
+        self._listeners = {}
+        self._mark_interrupted()
+
+    def _path(self, job_id):
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job):
+        tmp_path = self._path(job['id']) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(job, f)
+        os.replace(tmp_path, self._path(job['id']))
+
+    def _load(self, job_id):
+        try:
+            with open(self._path(job_id), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _mark_interrupted(self):
+        """Jobs left queued or running by a process that has exited will never finish; fail them."""
+        for name in os.listdir(self.jobs_dir):
+            if not name.endswith('.json'):
+                continue
+            job = self._load(name[:-5])
+            if job and job['status'] not in FINISHED_STATUSES and not _process_alive(job.get('owner_pid')):
+                job['status'] = JobStatus.FAILED
+                job['error'] = 'Interrupted by a server restart; resubmit to resume from the last checkpoint'
+                job['finished_at'] = datetime.now().isoformat()
+                self._save(job)
+
+    def submit(self, kind, params, search_fn, listener=None):
+        """
+        Queue search_fn(progress=..., **params) and return the job record.
+        search_fn runs inside an app context on a worker thread. A listener
+        passed here is registered before the job can start, so it sees every event.
+        """
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'params': params,
+            'status': JobStatus.QUEUED,
+            'owner_pid': os.getpid(),
+            'progress': {'phase': None, 'page': 0, 'profiles_found': 0, 'rejected': {}},
+            'cancel_requested': False,
+            'error': None,
+            'result': None,
+            'created_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None
+        }
+        with self._lock:
+            self._jobs[job['id']] = job
+            if listener:
+                self._listeners[job['id']] = [listener]
+            self._save(job)
+            self._futures[job['id']] = self.executor.submit(self._run, job['id'], search_fn)
+        print(f"Queued {kind} job {job['id']}")
+        return self._public(job)
+
+    def _cancel_requested(self, job_id):
+        with self._lock:
+            job = self._jobs[job_id]
+            if job['cancel_requested']:
+                return True
+        # A cancel may have come in through another worker process
+        on_disk = self._load(job_id)
+        return bool(on_disk and on_disk.get('cancel_requested'))
+
+    def _run(self, job_id, search_fn):
+        with self._lock:
+            job = self._jobs[job_id]
+            cancelled_early = job['cancel_requested']
+            if cancelled_early:
+                job['status'] = JobStatus.CANCELLED
+                job['finished_at'] = datetime.now().isoformat()
+                self._futures.pop(job_id, None)
+                self._jobs.pop(job_id, None)
+            else:
+                job['status'] = JobStatus.RUNNING
+                job['started_at'] = datetime.now().isoformat()
+            self._save(job)
+        if cancelled_early:
+            self._notify(job_id, {'event': 'done', 'status': JobStatus.CANCELLED, 'error': None})
+            return
+        self._notify(job_id, {'event': 'status', 'status': JobStatus.RUNNING})
+
+        collected = []
+
+        def progress(event):
+            collected.extend(event['profiles'])
+            # Read the flag before saving so a cancel written by another process isn't overwritten
+            cancelled = self._cancel_requested(job_id)
+            with self._lock:
+                job['cancel_requested'] = cancelled
+                job['progress'] = {
+                    'phase': event['phase'],
+                    'page': event['page'],
+                    'profiles_found': len(collected),
+                    'rejected': event.get('rejected', {})
+                }
+                self._save(job)
+            self._notify(job_id, dict(event, event='page'))
+            return not cancelled
+
+        try:
+            with self.app.app_context():
+                profiles = search_fn(progress=progress, **job['params'])
+            cancelled = self._cancel_requested(job_id)
+            with self._lock:
+                if cancelled:
+                    # Keep what was scraped before the cancel, not the sample-data fallback
+                    job['status'] = JobStatus.CANCELLED
+                    job['result'] = collected
+                else:
+                    job['status'] = JobStatus.COMPLETED
+                    job['result'] = profiles
+        except Exception as e:
+            print(f"Search job {job_id} failed: {e}")
+            with self._lock:
+                job['status'] = JobStatus.FAILED
+                job['error'] = str(e)
+        finally:
+            with self._lock:
+                job['finished_at'] = datetime.now().isoformat()
+                self._save(job)
+                self._futures.pop(job_id, None)
+                # The saved file now holds the result; don't keep it in memory for the process lifetime
+                self._jobs.pop(job_id, None)
+            print(f"Search job {job_id} {job['status']}")
+            self._notify(job_id, {'event': 'done', 'status': job['status'], 'error': job['error']})
+
+    def cancel(self, job_id):
+        """Request cancellation. Queued jobs never start; running ones stop after the current page."""
+        with self._lock:
+            job = self._jobs.get(job_id) or self._load(job_id)
+            if not job:
+                return None
+            if job['status'] in FINISHED_STATUSES:
+                return self._public(job)
+            job['cancel_requested'] = True
+            future = self._futures.get(job_id)
+            never_started = bool(future and future.cancel())
+            if never_started:
+                job['status'] = JobStatus.CANCELLED
+                job['finished_at'] = datetime.now().isoformat()
+                self._futures.pop(job_id, None)
+                self._jobs.pop(job_id, None)
+            self._save(job)
+        if never_started:
+            self._notify(job_id, {'event': 'done', 'status': JobStatus.CANCELLED, 'error': None})
+        return self._public(job)
+
+    def get(self, job_id, include_result=False):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            job = dict(job) if job else None
+        # The disk copy is authoritative for finished jobs and jobs owned by other processes
+        job = job or self._load(job_id)
+        if not job:
+            return None
+        return job if include_result else self._public(job)
+
+    def list(self, limit=50):
+        jobs = []
+        for name in os.listdir(self.jobs_dir):
+            if name.endswith('.json'):
+                job = self._load(name[:-5])
+                if job:
+                    jobs.append(self._public(job))
+        jobs.sort(key=lambda j: j['created_at'], reverse=True)
+        return jobs[:limit]
+
+    def subscribe(self, job_id, listener):
+        """Call listener(event) for every further event of a job run by this process."""
+        with self._lock:
+            self._listeners.setdefault(job_id, []).append(listener)
+
+    def unsubscribe(self, job_id, listener):
+        with self._lock:
+            listeners = self._listeners.get(job_id, [])
+            if listener in listeners:
+                listeners.remove(listener)
+            if not listeners:
+                self._listeners.pop(job_id, None)
+
+    def _notify(self, job_id, event):
+        with self._lock:
+            listeners = list(self._listeners.get(job_id, []))
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"Error notifying job listener: {e}")
+
+    def _public(self, job):
+        public = {k: v for k, v in job.items() if k != 'result'}
+        public['result_count'] = len(job['result']) if job.get('result') is not None else None
+        return public
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_job_queue(app, data_dir, max_workers=2):
+    """Return the process-wide job queue, creating it on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = SearchJobQueue(app, data_dir, max_workers=max_workers)
+        return _queue
+
+def _reset_after_fork():
+    # Executor threads do not survive fork; forked workers build their own queue
+    global _queue, _queue_lock
+    _queue = None
+    _queue_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,108 @@
+# search_predicates.py - Result filters evaluated on each page as it is extracted, not after paging ends
+
+import re
+from functools import lru_cache
+
+from search_cache import normalize_filter
+from title_matcher import TitleMatcher
+from us_states import US_STATES, US_STATE_ABBREVIATIONS, US_METRO_AREAS
+
+STATE_NAMES = [state.split(',')[0].lower() for state in US_STATES]
+# Longest first, so "west virginia" is taken before "virginia"
+STATE_PATTERN = re.compile(
+    r'\b(' + '|'.join(re.escape(name) for name in sorted(STATE_NAMES, key=len, reverse=True)) + r')\b')
+ABBREVIATION_PATTERN = re.compile(r',\s*(' + '|'.join(US_STATE_ABBREVIATIONS) + r')\b')
+
+@lru_cache(maxsize=4096)
+def location_states(location):
+    """
+    Lowercase names of the US states a profile location points to: a metro label
+    ("Greater Boston"), a state name or a ", CA" style abbreviation. Empty when
+    the location names none of them (e.g. "United States").
+    """
+    text = (location or '').lower()
+    for metro, states in US_METRO_AREAS.items():
+        if metro in text:
+            return frozenset(state.lower() for state in states)
+    if 'district of columbia' in text:
+        return frozenset(['district of columbia'])
+    states = set(STATE_PATTERN.findall(text))
+    states.update(US_STATE_ABBREVIATIONS[code].lower() for code in ABBREVIATION_PATTERN.findall(location or ''))
+    return frozenset(states)
+
+class SearchPredicates:
+    """
+    The filters a scraped profile must pass to count toward max_results:
+    location not in a state other than the selected one, not already
+    contacted, and title similar to one of the query's OR-terms. Metro labels
+    count for the states they span; a location naming no state passes, since
+    LinkedIn's own geography filter returned it. Checked in that order; `rejected`
+    counts profiles by the first filter they failed. Titles scoring between
+    the relaxed and strict similarity are held back, so with_relaxed() can
+    add them when too few profiles passed, as filter_profiles_by_title does.
+    On an event loop pass sync_contacted=False and run contacted.sync() in
+    an executor instead, since it may rebuild the filter from disk.
+    """
+
+    def __init__(self, search_query=None, location=None, contacted=None, min_similarity=0.2,
+                 relaxed_similarity=0.1, sync_contacted=True):
+        self.location = normalize_filter(location).split(',')[0].strip()
+        self.contacted = contacted
+        self.sync_contacted = sync_contacted
+        self.matcher = TitleMatcher(search_query) if search_query else None
+        self.min_similarity = min_similarity
+        self.relaxed_similarity = relaxed_similarity
+        self.rejected = {}
+        if self.location:
+            self.rejected['location'] = 0
+        if self.contacted:
+            self.rejected['contacted'] = 0
+        if self.matcher:
+            self.rejected['title'] = 0
+        self.passed = 0
+        self.held_back = []
+
+    @property
+    def active(self):
+        return bool(self.rejected)
+
+    def _failed(self, profile):
+        """Name of the first filter the profile fails, or None."""
+        if self.location:
+            states = location_states(profile.get('location') or '')
+            if states and self.location not in states:
+                return 'location'
+        if self.contacted and self.contacted.is_contacted(profile, sync=self.sync_contacted):
+            return 'contacted'
+        if self.matcher:
+            score = self.matcher.score(profile.get('headline', '') or profile.get('title', ''))
+            if score < self.min_similarity:
+                if score >= self.relaxed_similarity:
+                    self.held_back.append(profile)
+                return 'title'
+        return None
+
+    def accepts(self, profile):
+        failed = self._failed(profile)
+        if failed:
+            self.rejected[failed] += 1
+            return False
+        self.passed += 1
+        return True
+
+    def apply(self, profiles):
+        """The profiles of one page that pass every filter, in order."""
+        if not self.active or not profiles:
+            return profiles
+        return [profile for profile in profiles if self.accepts(profile)]
+
+    def with_relaxed(self, profiles, min_results=10):
+        """Add the held-back weaker title matches when fewer than min_results profiles passed."""
+        if len(profiles) >= min_results or not self.held_back:
+            return profiles
+        print(f"Only {len(profiles)} profiles passed the title filter, adding {len(self.held_back)} weaker matches")
+        return profiles + self.held_back
+
+    def summary(self):
+        rejected = ", ".join(f"{name}: {count}" for name, count in self.rejected.items())
+        return f"{self.passed} profiles passed search filters (rejected {rejected or 'none'})"
@@ -0,0 +1,129 @@
+# selector_stats.py - Learn which of several fallback selectors currently matches LinkedIn's markup
+
+import json
+import os
+import threading
+import time
+
+class SelectorStats:
+    """
+    Hit/miss counts per selector group (result cards, popup close buttons,
+    next-page buttons), kept in data_dir/selector_stats.json. order() puts the
+    last selector that matched first and moves selectors that missed
+    `demote_after` times in a row to the end, so a page usually costs one
+    lookup instead of walking the whole list. When every candidate of a
+    group that should match misses, the group is flagged as drifted until
+    one matches again. With adaptive=False the order is left alone but
+    counts and drift are still tracked.
+    """
+
+    def __init__(self, data_dir, adaptive=True, demote_after=5, save_interval=30):
+        self.path = os.path.join(data_dir, 'selector_stats.json')
+        self.adaptive = adaptive
+        self.demote_after = demote_after
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._saved_at = 0
+        self._dirty = False
+        self.groups = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self, force=False):
+        if not self._dirty or (not force and time.time() - self._saved_at < self.save_interval):
+            return
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.groups, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self._saved_at = time.time()
+            self._dirty = False
+        except OSError as e:
+            print(f"Error saving selector stats: {e}")
+
+    def order(self, group, candidates):
+        """Candidates in the order to try them."""
+        candidates = list(candidates)
+        if not self.adaptive:
+            return candidates
+        with self._lock:
+            stats = self.groups.get(group)
+            if not stats:
+                return candidates
+            selectors = stats['selectors']
+            last_hit = stats.get('last_hit')
+            return [selector for _, selector in sorted(
+                enumerate(candidates),
+                key=lambda item: (
+                    item[1] != last_hit,
+                    selectors.get(item[1], {}).get('consecutive_misses', 0) >= self.demote_after,
+                    item[0]
+                )
+            )]
+
+    def best(self, group, candidates):
+        return self.order(group, candidates)[0]
+
+    def record(self, group, tried, used, expect_match=True):
+        """
+        Record one lookup: `tried` in the order they were tried, `used` the one
+        that matched (None if none did). expect_match=False is for groups like
+        popups where no match is normal and says nothing about drift.
+        """
+        with self._lock:
+            stats = self.groups.setdefault(group, {'selectors': {}, 'last_hit': None, 'drift': False, 'drift_count': 0})
+            for selector in tried:
+                counts = stats['selectors'].setdefault(selector, {'hits': 0, 'misses': 0, 'consecutive_misses': 0})
+                if selector == used:
+                    counts['hits'] += 1
+                    counts['consecutive_misses'] = 0
+                    break
+                counts['misses'] += 1
+                counts['consecutive_misses'] += 1
+
+            if used:
+                stats['last_hit'] = used
+                if stats['drift']:
+                    stats['drift'] = False
+                    print(f"Selector group '{group}' matches again with: {used}")
+            elif expect_match:
+                stats['drift_count'] += 1
+                if not stats['drift']:
+                    stats['drift'] = True
+                    stats['drift_since'] = time.time()
+                    print(f"Selector drift: none of the {len(tried)} '{group}' selectors matched; "
+                          f"LinkedIn's markup may have changed")
+            self._dirty = True
+            self._save(force=stats['drift'] and not used)
+
+    def drifted(self):
+        with self._lock:
+            return [group for group, stats in self.groups.items() if stats.get('drift')]
+
+    def reset(self):
+        with self._lock:
+            self.groups = {}
+            self._dirty = True
+            self._save(force=True)
+
+    def get_stats(self):
+        with self._lock:
+            self._save(force=True)
+            return {'adaptive': self.adaptive, 'groups': json.loads(json.dumps(self.groups))}
+
+_stats = None
+_stats_lock = threading.Lock()
+
+def get_selector_stats(data_dir, adaptive=True, demote_after=5):
+    """Return the process-wide selector stats, loading them on first use."""
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            _stats = SelectorStats(data_dir, adaptive=adaptive, demote_after=demote_after)
+        return _stats
@@ -0,0 +1,306 @@
+# session_store.py - Cookie jars for several LinkedIn accounts, handed out per search and refreshed before they expire
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from flask import current_app
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process login lock on Windows; each process still refreshes one account at a time
+    fcntl = None
+
+from rate_limiter import current_account
+
+SESSION_COOKIE = "li_at"
+DEFAULT_ACCOUNT = "default"
+# Don't retry a failed background login sooner than this; repeated failures can lock the account
+REFRESH_RETRY_AFTER = 3600
+
+def session_expiry(cookies):
+    """Expiry timestamp of the li_at cookie, or None for a browser-session cookie / no cookie."""
+    for cookie in cookies or []:
+        if cookie.get('name') == SESSION_COOKIE:
+            expires = cookie.get('expires', -1)
+            return expires if expires and expires > 0 else None
+    return None
+
+def configured_accounts(config):
+    """Accounts with credentials: LINKEDIN_ACCOUNTS plus LINKEDIN_EMAIL/LINKEDIN_PASSWORD when set."""
+    accounts = {}
+    for entry in config.get('LINKEDIN_ACCOUNTS') or []:
+        if entry.get('email') and entry.get('password'):
+            accounts[entry['email']] = entry['password']
+    email = config.get('LINKEDIN_EMAIL')
+    password = config.get('LINKEDIN_PASSWORD')
+    if email and password and email != 'your-linkedin-email':
+        accounts.setdefault(email, password)
+    return accounts
+
+class SessionStore:
+    """
+    One JSON file per account in data_dir/sessions holding its cookies and the
+    li_at expiry. checkout() hands out the valid session with the fewest
+    current holders (searches or pooled browser contexts); checkin() gives it back. An existing
+    data_dir/cookies.json is imported once as the first account. The files
+    are read back into memory only when the directory changed, e.g. after
+    another worker logged in, and logins hold a per-account file lock so
+    workers sharing data_dir don't log in to the same account at once.
+    """
+
+    def __init__(self, data_dir, accounts=None, legacy_account=DEFAULT_ACCOUNT):
+        self.data_dir = data_dir
+        self.sessions_dir = os.path.join(data_dir, 'sessions')
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        self.accounts = accounts or {}
+        self.stats = {'checkouts': 0, 'refreshes': 0, 'refresh_failures': 0, 'expired': 0}
+        self._lock = threading.Lock()
+        self._in_use = {}
+        self._last_used = {}
+        self._failed_at = {}
+        self._sessions = {}
+        self._sessions_mtime = None
+        self._refresher = None
+        self._stop = threading.Event()
+        self._import_legacy(legacy_account)
+
+    def _path(self, account, suffix='.json'):
+        digest = hashlib.sha1(account.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.sessions_dir, f"{digest}{suffix}")
+
+    @contextlib.contextmanager
+    def login_lock(self, account, blocking=True):
+        """
+        Hold the account's lock file while logging in to it. Yields False
+        when blocking=False and another process or thread already holds it.
+        """
+        if fcntl is None:
+            yield True
+            return
+        with open(self._path(account, '.lock'), 'a') as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                locked = True
+            except BlockingIOError:
+                locked = False
+            # Closing the file releases the lock
+            yield locked
+
+    def _import_legacy(self, account):
+        legacy_path = os.path.join(self.data_dir, 'cookies.json')
+        if not os.path.exists(legacy_path) or self.load(account):
+            return
+        try:
+            with open(legacy_path, 'r') as f:
+                self.save(account, json.load(f))
+            print(f"Imported cookies.json as session for {account}")
+        except Exception as e:
+            print(f"Error importing cookies.json: {e}")
+
+    def load(self, account):
+        try:
+            with open(self._path(account), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _records(self):
+        records = []
+        for name in os.listdir(self.sessions_dir):
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(self.sessions_dir, name), 'r') as f:
+                        records.append(json.load(f))
+                except (OSError, json.JSONDecodeError):
+                    continue
+        return records
+
+    def _sync_sessions(self):
+        """Re-read the session files when the directory changed since the last read."""
+        try:
+            mtime = os.stat(self.sessions_dir).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._sessions_mtime:
+            return
+        sessions = {record['account']: record for record in self._records()}
+        with self._lock:
+            self._sessions = sessions
+            self._sessions_mtime = mtime
+
+    def save(self, account, cookies):
+        record = {
+            'account': account,
+            'cookies': cookies,
+            'expires_at': session_expiry(cookies),
+            'status': 'active',
+            'updated_at': time.time()
+        }
+        self._write(account, record)
+        return record
+
+    def _write(self, account, record):
+        # A unique temp file per writer: two workers may check the same account back in at once
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.sessions_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(record, f)
+                os.replace(tmp_path, self._path(account))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            print(f"Error saving LinkedIn session for {account}: {e}")
+            return
+        with self._lock:
+            self._sessions[account] = record
+
+    def mark_expired(self, account):
+        record = self.load(account)
+        if record and record['status'] != 'expired':
+            record['status'] = 'expired'
+            self._write(account, record)
+            with self._lock:
+                self.stats['expired'] += 1
+            print(f"LinkedIn session for {account} marked expired")
+
+    @staticmethod
+    def is_valid(record, margin=0):
+        if not record or record.get('status') != 'active':
+            return False
+        if not any(c.get('name') == SESSION_COOKIE for c in record.get('cookies') or []):
+            return False
+        expires_at = record.get('expires_at')
+        return expires_at is None or expires_at > time.time() + margin
+
+    def checkout(self, exclude=()):
+        """Return (account, cookies) for the least busy valid session, or (None, None)."""
+        self._sync_sessions()
+        with self._lock:
+            candidates = [r for r in self._sessions.values() if r['account'] not in exclude and self.is_valid(r)]
+            if not candidates:
+                return None, None
+            record = min(candidates, key=lambda r: (self._in_use.get(r['account'], 0),
+                                                    self._last_used.get(r['account'], 0)))
+            account = record['account']
+            self._in_use[account] = self._in_use.get(account, 0) + 1
+            self._last_used[account] = time.time()
+            self.stats['checkouts'] += 1
+        return account, record['cookies']
+
+    def checkin(self, account):
+        if not account:
+            return
+        with self._lock:
+            self._in_use[account] = max(0, self._in_use.get(account, 0) - 1)
+
+    def accounts_needing_refresh(self, margin):
+        """Accounts we hold credentials for whose session is missing, expired or expiring within margin."""
+        now = time.time()
+        return [
+            account for account in self.accounts
+            if not self.is_valid(self.load(account), margin)
+            and now - self._failed_at.get(account, 0) > REFRESH_RETRY_AFTER
+        ]
+
+    def refresh(self, account, margin=0):
+        """Log in again with the account's credentials and store the new cookies."""
+        # Imported here: linkedin_scraper itself uses the session store
+        from linkedin_scraper import refresh_session_cookies
+
+        password = self.accounts.get(account)
+        if not password:
+            return False
+        with self.login_lock(account, blocking=False) as locked:
+            if not locked:
+                print(f"Another worker is logging in to {account}, skipping refresh")
+                return False
+            # Another worker may have refreshed it just before we took the lock
+            if self.is_valid(self.load(account), margin):
+                return True
+            token = current_account.set(account)
+            try:
+                cookies = refresh_session_cookies(account, password)
+            finally:
+                current_account.reset(token)
+            with self._lock:
+                self.stats['refreshes' if cookies else 'refresh_failures'] += 1
+            if not cookies:
+                self._failed_at[account] = time.time()
+                print(f"Background login failed for {account}")
+                return False
+            self.save(account, cookies)
+        print(f"Refreshed LinkedIn session for {account}")
+        return True
+
+    def start_refresher(self, app, interval=900, margin=86400):
+        """Refresh sessions that expire within `margin` seconds, checking every `interval` seconds."""
+        if self._refresher and self._refresher.is_alive():
+            return
+
+        def run():
+            while not self._stop.is_set():
+                for account in self.accounts_needing_refresh(margin):
+                    try:
+                        with app.app_context():
+                            self.refresh(account, margin)
+                    except Exception as e:
+                        print(f"Error refreshing session for {account}: {e}")
+                self._stop.wait(interval)
+
+        self._refresher = threading.Thread(target=run, name="session-refresh", daemon=True)
+        self._refresher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def summary(self):
+        """Per-account status without the cookies."""
+        with self._lock:
+            in_use = dict(self._in_use)
+            stats = dict(self.stats)
+        sessions = []
+        for record in self._records():
+            sessions.append({
+                'account': record['account'],
+                'status': 'active' if self.is_valid(record) else 'expired',
+                'expires_at': record.get('expires_at'),
+                'updated_at': record.get('updated_at'),
+                'in_use': in_use.get(record['account'], 0),
+                'can_refresh': record['account'] in self.accounts
+            })
+        return {'sessions': sessions, 'stats': stats}
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_session_store():
+    """Return the process-wide session store, starting the background refresher on first use."""
+    global _store
+    config = current_app.config
+    with _store_lock:
+        if _store is None:
+            accounts = configured_accounts(config)
+            email = config.get('LINKEDIN_EMAIL')
+            legacy_account = email if email in accounts else DEFAULT_ACCOUNT
+            _store = SessionStore(config['DATA_DIR'], accounts=accounts, legacy_account=legacy_account)
+            if config.get('SESSION_BACKGROUND_REFRESH', True) and accounts:
+                _store.start_refresher(current_app._get_current_object(),
+                                       interval=config.get('SESSION_REFRESH_INTERVAL', 900),
+                                       margin=config.get('SESSION_REFRESH_MARGIN', 86400))
+        return _store
+
+def _reset_after_fork():
+    # The refresher thread does not survive fork; forked workers build their own store
+    global _store, _store_lock
+    _store = None
+    _store_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,163 @@
+# title_matcher.py - Score job titles against the OR-terms of a search query
+
+import re
+from functools import lru_cache
+
+import numpy as np
+
+# Common seniority levels and their variations. A word belongs to the first
+# level that has a variation contained in it (so 'sr.' and 'senior' both mean senior).
+SENIORITY_LEVELS = (
+    ('chief', ('c-level', 'cxo', 'chief')),
+    ('vp', ('vice president', 'vp', 'vice-president', 'vice pres')),
+    ('head', ('head', 'head of', 'leader')),
+    ('director', ('director', 'dir')),
+    ('president', ('president', 'pres')),
+    ('lead', ('lead', 'leader', 'leading')),
+    ('senior', ('senior', 'sr', 'sr.')),
+    ('principal', ('principal', 'prin')),
+    ('manager', ('manager', 'mgr', 'management')),
+    ('executive', ('executive', 'exec')),
+)
+
+# Any variation at all; most words are role words and are rejected by this alone
+SENIORITY_PATTERN = re.compile('|'.join(
+    re.escape(var) for _, variations in SENIORITY_LEVELS for var in variations
+))
+
+ROLE_WEIGHT = 0.7
+SENIORITY_WEIGHT = 0.3
+# Partial credit when both titles carry different (or no) seniority levels
+SENIORITY_MISMATCH = 0.5
+# score_profiles() switches to the NumPy path at this many profiles
+BATCH_THRESHOLD = 5000
+
+def normalize_title(title):
+    return (title or '').lower().replace('-', ' ').replace('_', ' ')
+
+@lru_cache(maxsize=65536)
+def seniority_of_word(word):
+    """Seniority level of a single word, or '' for a role word. Cached: titles reuse few words."""
+    if not SENIORITY_PATTERN.search(word):
+        return ''
+    for level, variations in SENIORITY_LEVELS:
+        if any(var in word for var in variations):
+            return level
+    return ''
+
+@lru_cache(maxsize=65536)
+def extract_title_components(title):
+    """Split a title into (seniority, set of role words); the last seniority word wins."""
+    seniority = ''
+    role = set()
+    for word in normalize_title(title).split():
+        level = seniority_of_word(word)
+        if level:
+            seniority = level
+        else:
+            role.add(word)
+    return seniority, frozenset(role)
+
+def component_similarity(components1, components2):
+    seniority1, role1 = components1
+    seniority2, role2 = components2
+    longest = max(len(role1), len(role2))
+    # Two titles made only of seniority words share no role to compare
+    role_similarity = len(role1 & role2) / longest if longest else 0.0
+    seniority_similarity = 1.0 if seniority1 == seniority2 else SENIORITY_MISMATCH
+    return role_similarity * ROLE_WEIGHT + seniority_similarity * SENIORITY_WEIGHT
+
+class TitleMatcher:
+    """
+    Tokenizes the search query's OR-terms once, then scores each title in a
+    single pass. filter() applies the strict threshold and, when too few
+    profiles pass, the relaxed one using the same scores.
+    """
+
+    def __init__(self, search_query):
+        self.terms = search_query.split(' OR ')
+        self.term_components = [extract_title_components(term) for term in self.terms]
+
+    def score(self, title):
+        """Best similarity between the title and any OR-term."""
+        components = extract_title_components(title)
+        return max(component_similarity(term, components) for term in self.term_components)
+
+    def score_profiles(self, profiles, batch=None):
+        """Score each profile's headline (or title). batch=None picks the NumPy path for large lists."""
+        titles = [profile.get('headline', '') or profile.get('title', '') for profile in profiles]
+        if batch is None:
+            batch = len(titles) >= BATCH_THRESHOLD
+        if batch:
+            return self.score_batch(titles).tolist()
+        return [self.score(title) for title in titles]
+
+    def score_batch(self, titles):
+        """
+        Score many titles with array operations; returns a float array equal to
+        [self.score(t) for t in titles]. Titles are tokenized into word ids in
+        one pass, each distinct word is classified once, and role overlap with
+        every OR-term is a single product of 0/1 title x term-word matrices.
+        Role-set sizes and seniority levels are compared by broadcasting.
+        """
+        if not titles:
+            return np.zeros(0)
+        levels = {'': 0}
+        for level, _ in SENIORITY_LEVELS:
+            levels[level] = len(levels)
+        # Only role words that appear in some term can contribute to an overlap
+        vocab = {}
+        for _, role in self.term_components:
+            for word in role:
+                vocab.setdefault(word, len(vocab))
+
+        term_roles = np.zeros((len(vocab), len(self.term_components)))
+        for j, (_, role) in enumerate(self.term_components):
+            for word in role:
+                term_roles[vocab[word], j] = 1
+        term_sizes = term_roles.sum(axis=0)
+        term_levels = np.array([levels[seniority] for seniority, _ in self.term_components])
+
+        # Scraped headlines repeat a lot; tokenize each distinct one once
+        index = {title: i for i, title in enumerate(dict.fromkeys(titles))}
+        inverse = np.fromiter(map(index.__getitem__, titles), dtype=np.int64, count=len(titles))
+        normalized = [normalize_title(title) for title in index]
+        counts = np.fromiter(map(len, map(str.split, normalized)), dtype=np.int64, count=len(normalized))
+        # Joining with spaces keeps word boundaries, so one split tokenizes every title
+        words = ' '.join(normalized).split()
+        word_ids = {word: i for i, word in enumerate(dict.fromkeys(words))}
+        flat = np.fromiter(map(word_ids.__getitem__, words), dtype=np.int64, count=len(words))
+        owners = np.repeat(np.arange(len(index)), counts)
+        word_levels = np.array([levels[seniority_of_word(word)] for word in word_ids], dtype=np.int64)
+        word_columns = np.array([vocab.get(word, -1) for word in word_ids], dtype=np.int64)
+
+        # The last seniority word of a title wins
+        token_levels = word_levels[flat]
+        is_seniority = token_levels > 0
+        last_position = np.full(len(index), -1, dtype=np.int64)
+        np.maximum.at(last_position, owners[is_seniority], np.flatnonzero(is_seniority))
+        # -1 (no seniority word) picks the appended 0
+        title_levels = np.append(token_levels, 0)[last_position]
+
+        # Role words are a set: drop repeats of a word within the same title
+        pairs = np.sort(owners[~is_seniority] * len(word_ids) + flat[~is_seniority])
+        pairs = pairs[np.diff(pairs, prepend=-1) != 0]
+        pair_rows, pair_words = np.divmod(pairs, len(word_ids))
+        title_sizes = np.bincount(pair_rows, minlength=len(index))
+        title_roles = np.zeros((len(index), len(vocab)))
+        in_vocab = word_columns[pair_words] >= 0
+        title_roles[pair_rows[in_vocab], word_columns[pair_words[in_vocab]]] = 1
+
+        overlap = title_roles @ term_roles
+        longest = np.maximum(title_sizes[:, None], term_sizes[None, :])
+        role_similarity = np.divide(overlap, longest, out=np.zeros_like(overlap), where=longest > 0)
+        seniority_similarity = np.where(title_levels[:, None] == term_levels[None, :], 1.0, SENIORITY_MISMATCH)
+        scores = role_similarity * ROLE_WEIGHT + seniority_similarity * SENIORITY_WEIGHT
+        return scores.max(axis=1)[inverse]
+
+    def filter(self, profiles, min_similarity=0.2, relaxed_similarity=0.1, min_results=10, batch=None):
+        scores = self.score_profiles(profiles, batch)
+        filtered = [profile for profile, score in zip(profiles, scores) if score >= min_similarity]
+        if len(filtered) < min_results and min_similarity > relaxed_similarity:
+            filtered = [profile for profile, score in zip(profiles, scores) if score >= relaxed_similarity]
+        return filtered
@@ -49,4 +49,52 @@ US_STATES = [
     "West Virginia, United States",
     "Wisconsin, United States",
     "Wyoming, United States"
-] 
\ No newline at end of file
+]
+
+US_STATE_ABBREVIATIONS = {
+    "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas", "CA": "California",
+    "CO": "Colorado", "CT": "Connecticut", "DE": "Delaware", "FL": "Florida", "GA": "Georgia",
+    "HI": "Hawaii", "ID": "Idaho", "IL": "Illinois", "IN": "Indiana", "IA": "Iowa",
+    "KS": "Kansas", "KY": "Kentucky", "LA": "Louisiana", "ME": "Maine", "MD": "Maryland",
+    "MA": "Massachusetts", "MI": "Michigan", "MN": "Minnesota", "MS": "Mississippi", "MO": "Missouri",
+    "MT": "Montana", "NE": "Nebraska", "NV": "Nevada", "NH": "New Hampshire", "NJ": "New Jersey",
+    "NM": "New Mexico", "NY": "New York", "NC": "North Carolina", "ND": "North Dakota", "OH": "Ohio",
+    "OK": "Oklahoma", "OR": "Oregon", "PA": "Pennsylvania", "RI": "Rhode Island", "SC": "South Carolina",
+    "SD": "South Dakota", "TN": "Tennessee", "TX": "Texas", "UT": "Utah", "VT": "Vermont",
+    "VA": "Virginia", "WA": "Washington", "WV": "West Virginia", "WI": "Wisconsin", "WY": "Wyoming"
+}
+
+# Metro labels LinkedIn shows instead of "<City>, <State>", and the states each spans
+US_METRO_AREAS = {
+    "san francisco bay area": ["California"],
+    "los angeles metropolitan area": ["California"],
+    "greater san diego": ["California"],
+    "greater sacramento": ["California"],
+    "new york city metropolitan area": ["New York", "New Jersey", "Connecticut"],
+    "greater boston": ["Massachusetts"],
+    "greater chicago area": ["Illinois"],
+    "greater seattle area": ["Washington"],
+    "dallas-fort worth metroplex": ["Texas"],
+    "greater houston": ["Texas"],
+    "washington dc-baltimore area": ["Maryland", "Virginia"],
+    "greater philadelphia": ["Pennsylvania", "New Jersey", "Delaware"],
+    "atlanta metropolitan area": ["Georgia"],
+    "miami-fort lauderdale area": ["Florida"],
+    "greater tampa bay area": ["Florida"],
+    "greater orlando": ["Florida"],
+    "greater phoenix area": ["Arizona"],
+    "denver metropolitan area": ["Colorado"],
+    "greater minneapolis-st. paul area": ["Minnesota"],
+    "detroit metropolitan area": ["Michigan"],
+    "greater st. louis": ["Missouri", "Illinois"],
+    "kansas city metropolitan area": ["Missouri", "Kansas"],
+    "salt lake city metropolitan area": ["Utah"],
+    "charlotte metro": ["North Carolina", "South Carolina"],
+    "raleigh-durham-chapel hill area": ["North Carolina"],
+    "nashville metropolitan area": ["Tennessee"],
+    "greater pittsburgh region": ["Pennsylvania"],
+    "cleveland/akron metropolitan area": ["Ohio"],
+    "greater cincinnati": ["Ohio", "Kentucky"],
+    "greater indianapolis": ["Indiana"],
+    "las vegas metropolitan area": ["Nevada"],
+}
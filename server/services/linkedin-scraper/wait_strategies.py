@@ -0,0 +1,116 @@
+# wait_strategies.py - Wait on concrete page signals instead of fixed sleeps
+
+import time
+
+# Installs a MutationObserver once per document and reports whether the DOM has
+# been quiet for quietMs, or whether the count of `selector` differs from `previous`.
+RESULTS_SETTLED_JS = """
+([selector, previous, quietMs]) => {
+    if (!window.__scraperLastMutation) {
+        window.__scraperLastMutation = performance.now();
+        new MutationObserver(() => { window.__scraperLastMutation = performance.now(); })
+            .observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+    }
+    if (selector && previous !== null && document.querySelectorAll(selector).length !== previous) {
+        return true;
+    }
+    return performance.now() - window.__scraperLastMutation >= quietMs;
+}
+"""
+
+COUNT_JS = "(selector) => document.querySelectorAll(selector).length"
+
+PAGE_CHANGED_JS = """
+([previousUrl, selector, previousFirst]) => {
+    if (location.href !== previousUrl) return true;
+    const first = document.querySelector(selector);
+    return !!first && first.innerText !== previousFirst;
+}
+"""
+
+FIRST_TEXT_JS = "(selector) => { const el = document.querySelector(selector); return el ? el.innerText : null; }"
+
+def _log_wait(label, start, ready):
+    elapsed = time.monotonic() - start
+    if ready:
+        print(f"[wait] {label}: ready after {elapsed:.2f}s")
+    else:
+        print(f"[wait] {label}: gave up after {elapsed:.2f}s")
+    return ready
+
+def _selector_list(selectors):
+    return selectors if isinstance(selectors, str) else ", ".join(selectors)
+
+def wait_for_any_selector(page, selectors, timeout=10000, state='visible', label=None):
+    """Wait until any of the selectors is present. Returns True when one appeared."""
+    start = time.monotonic()
+    try:
+        page.wait_for_selector(_selector_list(selectors), timeout=timeout, state=state)
+        ready = True
+    except Exception:
+        ready = False
+    return _log_wait(label or f"selector {_selector_list(selectors)[:60]}", start, ready)
+
+def wait_for_hidden(page, locator, timeout=2000, label="element hidden"):
+    """Wait until a locator is detached or hidden, e.g. a dismissed modal."""
+    start = time.monotonic()
+    try:
+        locator.wait_for(state='hidden', timeout=timeout)
+        ready = True
+    except Exception:
+        ready = False
+    return _log_wait(label, start, ready)
+
+def count_elements(page, selector):
+    try:
+        return page.evaluate(COUNT_JS, selector)
+    except Exception:
+        return 0
+
+def wait_for_results_settled(page, selector=None, previous_count=None, quiet_ms=500, timeout=3000, label="DOM quiet"):
+    """
+    Wait until the result count changes from previous_count or the DOM has had
+    no mutations for quiet_ms, whichever comes first, capped at timeout.
+    """
+    start = time.monotonic()
+    try:
+        page.wait_for_function(RESULTS_SETTLED_JS, arg=[selector, previous_count, quiet_ms],
+                               timeout=timeout, polling=100)
+        ready = True
+    except Exception:
+        ready = False
+    return _log_wait(label, start, ready)
+
+def first_text(page, selector):
+    try:
+        return page.evaluate(FIRST_TEXT_JS, selector)
+    except Exception:
+        return None
+
+def wait_for_page_change(page, previous_url, selector, previous_first, timeout=10000, label="next results page"):
+    """After a pagination click, wait for the URL or the first result card to change."""
+    start = time.monotonic()
+    try:
+        page.wait_for_function(PAGE_CHANGED_JS, arg=[previous_url, selector, previous_first],
+                               timeout=timeout, polling=100)
+        ready = True
+    except Exception:
+        ready = False
+    return _log_wait(label, start, ready)
+
+async def async_wait_for_results_settled(page, selector=None, previous_count=None, quiet_ms=500, timeout=3000, label="DOM quiet"):
+    """Async counterpart of wait_for_results_settled for the async engine."""
+    start = time.monotonic()
+    try:
+        await page.wait_for_function(RESULTS_SETTLED_JS, arg=[selector, previous_count, quiet_ms],
+                                     timeout=timeout, polling=100)
+        ready = True
+    except Exception:
+        ready = False
+    return _log_wait(label, start, ready)
+
+async def async_count_elements(page, selector):
+    try:
+        return await page.evaluate(COUNT_JS, selector)
+    except Exception:
+        return 0